@@ -1,60 +1,194 @@
+import json
+import os
 import dash
-import pandas as pd
-from dash import dcc, html
-from dash.dependencies import Input, Output
+import flask
+import numpy as np
+from dash import dcc, html, Patch
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import folium
 import plotly.express as px
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import io
-import base64
+import plotly.graph_objects as go
 from collections import Counter
 from flask_caching import Cache
+from geo_store import GeoStore, COMPILED_GEOMETRY_FILE, GEOMETRY_FILE, VALUES_FILE
+from render_cache import RenderCache, configure_backend, data_fingerprint
+from word_cloud import WordCloudRenderer, frequency_hash
+from insights import InsightsEngine
+from data_loader import load_country_year_mean
+from data_index import CountrySeriesIndex, YearCategoryIndex
+from monthly_store import MONTHLY_FILE, MONTH_NAMES, MONTHS, QUARTERS, MonthlyStore, period_label
+from metrics import CallbackMetrics, instrument_callbacks
+from http_cache import HashedFiles, enable_compression
+from render_jobs import RenderJobs, SharedGenerations, Superseded
+from artifacts import ARTIFACT_DIR, ArtifactStore
+from export_api import DataExport
+from bands import InflationBands
+from figures import FigureSkeleton, plain_figure
 
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 server = app.server
-# Set up cache configuration
-cache = Cache(app.server, config={
-    'CACHE_TYPE': 'SimpleCache',  # For production, switch to Redis or other types
-    'CACHE_DEFAULT_TIMEOUT': 300  # Cache timeout (in seconds)
-})
 
-# Load the data into the country_year_mean DataFrame
-country_year_mean = pd.read_csv('country_year_mean.csv')
+# Render cache settings (environment variables)
+# Max number of cached renders per process; 0 sizes the cache for every map and word cloud state (see below)
+RENDER_CACHE_SIZE = int(os.environ.get('RENDER_CACHE_SIZE', 0))
+WARM_RENDER_CACHE = os.environ.get('WARM_RENDER_CACHE', '0') == '1'  # Pre-render every map state at startup
+# 'memory' (per process), 'sqlite' (one file shared by every worker on the machine) or 'redis'
+RENDER_CACHE_BACKEND = os.environ.get('RENDER_CACHE_BACKEND', 'memory')
+RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR', os.path.join('.cache', 'renders'))  # sqlite backend
+RENDER_CACHE_REDIS_URL = os.environ.get('RENDER_CACHE_REDIS_URL', 'redis://localhost:6379/0')  # redis backend
 
-# Helper function to create the category bar plot
-    
-def create_category_bar_plot():
-    # Define the custom order for the inflation categories
-    custom_order = [
-        'Deflation',
-        'Very Low Inflation', 
-        'Target Inflation', 
-        'Low Inflation', 
-        'Moderate Inflation', 
-        'High Inflation', 
-        'Very High Inflation', 
-        'Hyperinflation'
-    ]
+# Map engine: 'folium' sends a full Leaflet page (with the GeoJSON) on every change,
+# 'plotly' sends the geometry once and then patches only the colors and values
+MAP_ENGINE = os.environ.get('MAP_ENGINE', 'folium')
 
-    # Calculate category counts and ensure they are in the correct order
-    category_counts = country_year_mean['Inflation_Category'].value_counts().reindex(custom_order)
+# Monthly values written by preprocess.py; without this file the dashboard shows annual data only
+MONTHLY_DATA_FILE = os.environ.get('MONTHLY_DATA_FILE', MONTHLY_FILE)
 
-    # Calculate inflation range for each category
-    inflation_ranges = country_year_mean.groupby('Inflation_Category')['Value'].agg(['min', 'max']).reindex(custom_order)
+# Per-callback instrumentation and the Prometheus /metrics route; 0 turns both off
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
 
-    # Fill missing values (NaN) with 'N/A' or a default value
-    inflation_ranges = inflation_ranges.fillna({'min': 'N/A', 'max': 'N/A'})
+# Import the heavy renderers (folium, wordcloud) on first use; 0 loads them at startup,
+# e.g. in a gunicorn --preload master so the workers share them (see gunicorn.conf.py)
+LAZY_IMPORTS = os.environ.get('LAZY_IMPORTS', '1') == '1'
 
-    # Create new labels with inflation range, handle cases where 'N/A' is present
-    category_labels = [
-        f"{category}\n({inflation_ranges.loc[category, 'min']:.1f}% - {inflation_ranges.loc[category, 'max']:.1f}%)"
-        if inflation_ranges.loc[category, 'min'] != 'N/A'
-        else f"{category}\n(N/A)"
-        for category in custom_order
-    ]
+# Delay between two years of the client-side map playback, in milliseconds
+PLAYBACK_INTERVAL_MS = int(os.environ.get('PLAYBACK_INTERVAL_MS', 800))
+
+# Word cloud image encoding: 'png', 'palette' (256-color PNG) or 'webp'
+WORDCLOUD_FORMAT = os.environ.get('WORDCLOUD_FORMAT', 'png')
+
+# Threads per process that run the map and word cloud renders as jobs; a newer request of the
+# same browser session supersedes its queued or running job. 0 renders in the request thread.
+RENDER_JOBS = int(os.environ.get('RENDER_JOBS', 2))
+
+# Pre-rendered outputs written by bake.py: 'read' serves every map, word cloud and bar plot from
+# them and never renders (the period dropdown is off, periods are not baked); 'off' renders on demand
+ARTIFACT_MODE = os.environ.get('ARTIFACT_MODE', 'off')
+ARTIFACTS_DIR = os.environ.get('ARTIFACTS_DIR', ARTIFACT_DIR)
+
+# Upper bounds (%) of the inflation bands, comma-separated, one per category but Hyperinflation;
+# empty keeps the bounds of bands.py (0,2,3,4,10,50,100)
+INFLATION_BOUNDS = os.environ.get('INFLATION_BOUNDS', '')
+
+# Compress the Dash JSON responses (brotli if installed, else gzip); 0 sends them uncompressed,
+# e.g. behind a proxy that already compresses
+HTTP_COMPRESSION = os.environ.get('HTTP_COMPRESSION', '1') == '1'
+
+if HTTP_COMPRESSION:
+    enable_compression(server)
+
+# Immutable data served from content-hashed URLs with long-lived cache headers (see http_cache.py)
+hashed_files = HashedFiles(server)
+
+# Load the data into the country_year_mean DataFrame (compact dtypes, binary cache of the CSV)
+country_year_mean = load_country_year_mean('country_year_mean.csv')
+
+# Inflation bands: the one definition every category, color and range below is derived from
+bands = (
+    InflationBands.with_bounds([float(bound) for bound in INFLATION_BOUNDS.split(',')])
+    if INFLATION_BOUNDS else InflationBands()
+)
+category_colors = bands.colors
+inflation_ranges = bands.ranges()
+
+
+# Category of every row from the bands (the CSV column follows the default bands only)
+def categorize_rows(data):
+    data['Inflation_Category'] = bands.categorize(data['Value'].round(1))
+
+
+categorize_rows(country_year_mean)
+
+# Cleaned rows and their positions per year/category, so callbacks slice without scanning
+data_index = YearCategoryIndex(country_year_mean)
+
+# Read-only CSV/JSON/Arrow export of filtered rows at /api/export.<format>, from the same index
+data_export = DataExport(server, data_index)
+
+# Dense country x year matrix for the trend view: any set of series is a row slice
+country_series = CountrySeriesIndex(country_year_mean)
+
+# Load the shared map geometry and the per-year values once, joined in memory.
+# Prefer the compiled geometry (see geo_compiler.py) when it has been built.
+map_geometry_file = COMPILED_GEOMETRY_FILE if os.path.exists(COMPILED_GEOMETRY_FILE) else GEOMETRY_FILE
+geo_store = GeoStore.load(map_geometry_file)
+
+# Version of the input files and the bands: retires render cache entries and selects the baked artifacts
+input_version = data_fingerprint('country_year_mean.csv', map_geometry_file, VALUES_FILE)
+data_version = f"{input_version}-{bands.version}"
+
+# Default cache size: every state of the annual views, i.e. a map and a word cloud per year and
+# category (or none), the two bar plots, and a quarter more for period maps and other bands.
+# WARM_RENDER_CACHE fills the map half of it; in a smaller cache the word clouds evict warmed maps.
+render_states = len(geo_store.years) * (len(bands.names) + 1) * 2 + 2
+render_cache_size = RENDER_CACHE_SIZE or render_states + render_states // 4
+
+# Set up cache configuration; the locks let only one thread or worker render a missing entry
+cache_config, render_locks = configure_backend(
+    RENDER_CACHE_BACKEND, render_cache_size, RENDER_CACHE_DIR, RENDER_CACHE_REDIS_URL
+)
+cache = Cache(app.server, config=dict(
+    cache_config,
+    CACHE_DEFAULT_TIMEOUT=300,  # Cache timeout (in seconds)
+))
+
+# Settings that change the rendered outputs: the artifacts must have been baked with the same ones
+render_settings = {'wordcloud_format': WORDCLOUD_FORMAT}
+
+artifacts = None
+if ARTIFACT_MODE == 'read':
+    artifacts = ArtifactStore(ARTIFACTS_DIR, data_version, render_settings)
+    if not artifacts.load():
+        raise RuntimeError(f"No artifacts baked for data version {data_version} in {ARTIFACTS_DIR}: run python bake.py")
+    mismatched = artifacts.mismatched_settings()
+    if mismatched:
+        details = ', '.join(f"{name} {baked!r} baked, {current!r} set" for name, (baked, current) in mismatched.items())
+        raise RuntimeError(f"Artifacts in {ARTIFACTS_DIR} were baked with other render settings ({details}): "
+                           f"run python bake.py with the app's settings")
+
+# Memoize rendered outputs (or read them from the artifacts in artifact mode)
+renders = RenderCache(cache, data_version, locks=render_locks, artifacts=artifacts)
+
+
+# Hit/miss counters of the render cache
+@server.route('/cache-stats')
+def cache_stats():
+    return flask.jsonify(renders.stats())
+
+
+# With the shared sqlite cache (several gunicorn workers) the newest job of every session is kept next
+# to it, so a request in one worker supersedes the same session's jobs in the others
+render_jobs = RenderJobs(
+    RENDER_JOBS,
+    SharedGenerations(os.path.join(RENDER_CACHE_DIR, 'jobs.sqlite3')) if RENDER_CACHE_BACKEND == 'sqlite' else None,
+) if RENDER_JOBS > 0 else None
+
+
+# Queue depth, running jobs, outcomes and latency of the render jobs
+@server.route('/jobs-stats')
+def jobs_stats():
+    return flask.jsonify(render_jobs.stats() if render_jobs else {})
+
+
+# Run a heavy render as a job of the browser session; a superseded job updates nothing
+def run_render_job(session_id, name, function, *args):
+    if render_jobs is None:
+        return function(*args)
+    try:
+        return render_jobs.run(session_id, name, function, *args)
+    except Superseded:
+        raise PreventUpdate
+
+# Helper function to create the category bar plot
+    
+def create_category_bar_plot():
+    # Count the rows of every category, in band order
+    category_counts = country_year_mean['Inflation_Category'].value_counts().reindex(bands.names, fill_value=0)
+
+    # Label every category with its range from the bands
+    category_labels = [f"{category}\n({inflation_ranges[category]})" for category in bands.names]
 
     # Create a bar plot using Plotly
     fig = px.bar(
@@ -77,11 +211,13 @@ def create_category_bar_plot():
     return fig
 
 
-# helper function for continent plot   
-continent_inflation_periods_counts = country_year_mean.groupby(['Region', 'Inflation_Category']).size().unstack(fill_value=0)
-continent_inflation_periods_counts = continent_inflation_periods_counts[['Deflation', 'Very Low Inflation', 'Target Inflation', 'Low Inflation', 'Moderate Inflation', 'High Inflation', 'Very High Inflation', 'Hyperinflation']]
-inflation_categories = ['Deflation', 'Very Low Inflation','Target Inflation', 'Low Inflation', 'Moderate Inflation', 'High Inflation', 'Very High Inflation', 'Hyperinflation']
-colors = ['#1f77b4', '#53b5a3', '#2ca02c', '#98df8a', '#ffcc00', '#ff7f0e', '#d62728', '#7F00FF']
+# helper function for continent plot: rows per continent and category, in band order
+def build_continent_counts(data):
+    counts = data.groupby(['Region', 'Inflation_Category'], observed=True).size().unstack(fill_value=0)
+    return counts.reindex(columns=bands.names, fill_value=0)
+
+
+continent_inflation_periods_counts = build_continent_counts(country_year_mean)
    
     
 def update_stacked_barplot():  # Add parameters as needed
@@ -91,10 +227,10 @@ def update_stacked_barplot():  # Add parameters as needed
     # Use plotly.express for stacked bar plot
     fig = px.bar(df, 
                  x='Region', 
-                 y=inflation_categories, 
+                 y=bands.names, 
                  title='Total Distribution of Inflation Types',
                  labels={'value': 'Number of Countries', 'Region': 'Continent'},
-                 color_discrete_sequence=colors)
+                 color_discrete_sequence=[category_colors[category] for category in bands.names])
 
     fig.update_layout(barmode='stack',  # Stacked bar chart
                       legend_title_text='Inflation Type',
@@ -102,39 +238,289 @@ def update_stacked_barplot():  # Add parameters as needed
                       yaxis_title='Number of Countries')
 
     return fig
-    
-# Helper function to generate word cloud from frequencies
+
+
+# Both bar plots only depend on the data and the bands: build them once and reuse them as plain figure data
+def build_bar_figures():
+    return (
+        renders.get_or_render('figure', ('category_bar',), lambda: plain_figure(create_category_bar_plot())),
+        renders.get_or_render('figure', ('continent_bar',), lambda: plain_figure(update_stacked_barplot())),
+    )
+
+
+category_bar_figure, continent_bar_figure = build_bar_figures()
+
+# Word cloud renderer, configured once and reused for every render
+word_clouds = WordCloudRenderer(width=800, height=400, background_color="white", image_format=WORDCLOUD_FORMAT)
+if not LAZY_IMPORTS:
+    word_clouds.load()
+
+
+# Helper function to generate word cloud from frequencies (memoized on the frequencies);
+# returns the image as a data URI
 def generate_word_cloud(frequencies):
-    wordcloud = WordCloud(width=800, height=400, background_color="white").generate_from_frequencies(frequencies)
-    image = io.BytesIO()
-    wordcloud.to_image().save(image, format='PNG')
-    image.seek(0)
-    return base64.b64encode(image.read()).decode('utf-8')
+    return renders.get_or_render(
+        'wordcloud', (frequency_hash(frequencies), WORDCLOUD_FORMAT), lambda: word_clouds.render(frequencies)
+    )
     
     
-# Color mapping for inflation categories
-category_colors = {
-    'Deflation': '#1f77b4',  # Blue
-    'Very Low Inflation': '#53b5a3', # light bluegreen
-    'Target Inflation': '#2ca02c',  # Green
-    'Low Inflation': '#98df8a',            # Light Green
-    'Moderate Inflation': '#ffcc00',       # Yellow
-    'High Inflation': '#ff7f0e',           # Orange
-    'Very High Inflation': '#d62728',      # Red
-    'Hyperinflation': '#7F00FF'            # Violet
-}
+# Default fill color for countries without data for the selected year/category
+DEFAULT_FILL_COLOR = '#808080'  # Gray
+
+# Country codes of the map features, in GeoJSON feature order (identical for every year)
+map_feature_iso3 = geo_store.feature_iso3
+
+
+# Colors indexed by category code; the last code marks features without data
+map_category_colors = list(category_colors.values()) + [DEFAULT_FILL_COLOR]
+NO_DATA_CODE = len(category_colors)
+
+
+# Precompute the category code of every map feature for every (year, category) state
+def build_map_feature_codes(data, feature_iso3):
+    # Join the value of every (country, year) onto the feature order in one step and band them all at once
+    feature_values = data.pivot(index='Area Code (ISO3)', columns='Year', values='Value').reindex(feature_iso3)
+    codes = bands.codes(np.round(feature_values.to_numpy(dtype=float), 1))
+    codes = np.where(codes < 0, NO_DATA_CODE, codes)
+
+    feature_codes = {}
+    for column, year in enumerate(feature_values.columns):
+        year_codes = codes[:, column]
+        # No category selected: every country keeps its own category
+        feature_codes[(year, None)] = year_codes.tolist()
+        # Category selected: keep only the countries in that category, gray out the rest
+        for code, category in enumerate(bands.names):
+            feature_codes[(year, category)] = np.where(year_codes == code, code, NO_DATA_CODE).tolist()
+    return feature_codes
+
+
+# Turn the feature codes into ISO3 -> fill color dicts, so the folium style
+# function is a plain dict lookup instead of a DataFrame scan
+def build_map_fill_colors(feature_codes, feature_iso3):
+    return {
+        state: dict(zip(feature_iso3, [map_category_colors[code] for code in codes]))
+        for state, codes in feature_codes.items()
+    }
+
+
+map_feature_codes = build_map_feature_codes(country_year_mean, map_feature_iso3)
+map_fill_colors = build_map_fill_colors(map_feature_codes, map_feature_iso3)
+
 
-# Corresponding inflation value ranges for each category
-inflation_ranges = {
-    'Deflation': 'Below 0%',
-    'Very Low Inflation': '0% - 2%',
-    'Target Inflation': '2% - 3%',
-    'Low Inflation': '3% - 4%',
-    'Moderate Inflation': '4% - 10%',
-    'High Inflation': '10% - 50%',
-    'Very High Inflation': '50% - 100%',
-    'Hyperinflation': 'Above 100%'
+# Monthly store: month, quarter and year means as dense country x period arrays (None without monthly data)
+monthly_store = (
+    MonthlyStore.load(MONTHLY_DATA_FILE)
+    if os.path.exists(MONTHLY_DATA_FILE) and ARTIFACT_MODE != 'read' else None
+)
+category_codes = {category: code for code, category in enumerate(category_colors)}
+
+
+# Category code of every value of a country x period matrix, by the same rules as the annual data
+def build_period_codes(matrix):
+    codes = bands.codes(np.round(matrix, 1))
+    return np.where(codes < 0, NO_DATA_CODE, codes)
+
+
+if monthly_store is not None:
+    # Store row of every map feature (-1 for features without monthly data)
+    period_feature_rows = np.array([monthly_store.row_of.get(iso3, -1) for iso3 in map_feature_iso3])
+    # Category codes per granularity, in store row order
+    period_codes = {granularity: build_period_codes(matrix) for granularity, matrix in monthly_store.matrices.items()}
+    # Country name of every store row, for the word cloud
+    area_names = country_year_mean.drop_duplicates('Area Code (ISO3)').set_index('Area Code (ISO3)')['Area']
+    period_areas = np.array([str(area_names.get(iso3, iso3)) for iso3 in monthly_store.iso3])
+
+
+# Category codes of the map features for a year, period and category; period None is the annual data
+def map_state_codes(year, selected_category, period=None):
+    if period is None or monthly_store is None:
+        return map_feature_codes.get((year, selected_category), [NO_DATA_CODE] * len(map_feature_iso3))
+    location = monthly_store.locate(year, period)
+    if location is None:
+        return [NO_DATA_CODE] * len(map_feature_iso3)
+    granularity, column = location
+    codes = np.where(period_feature_rows >= 0, period_codes[granularity][period_feature_rows, column], NO_DATA_CODE)
+    if selected_category:
+        codes = np.where(codes == category_codes[selected_category], codes, NO_DATA_CODE)
+    return codes.tolist()
+
+
+# Values of the map features for a year and period (None where missing); period None is the annual data
+def map_state_values(year, period=None):
+    if period is None or monthly_store is None:
+        return geo_store.year_values(year) if year in geo_store.years else [None] * len(map_feature_iso3)
+    values = monthly_store.values(year, period)[period_feature_rows]
+    return [None if row < 0 or np.isnan(value) else float(value) for row, value in zip(period_feature_rows, values)]
+
+
+# Options of the period dropdown: quarters and months (no selection = whole year)
+def create_period_options():
+    return (
+        [{'label': quarter, 'value': quarter} for quarter in QUARTERS]
+        + [{'label': name, 'value': month} for name, month in zip(MONTH_NAMES, MONTHS)]
+    )
+
+
+# Geometry for the plotly choropleth: only the shapes and a feature id
+choropleth_geojson = {
+    'type': 'FeatureCollection',
+    'features': [
+        {'type': 'Feature', 'id': str(index), 'properties': {}, 'geometry': feature['geometry']}
+        for index, feature in enumerate(geo_store.geometry['features'])
+    ]
 }
+# The browser fetches it from a content-hashed URL and caches it, so figures only carry the URL
+choropleth_geojson_url = app.get_relative_path(hashed_files.add(
+    'choropleth.geojson', json.dumps(choropleth_geojson, separators=(',', ':')).encode(), 'application/geo+json'
+))
+
+
+# Step colorscale so that each category code gets exactly its own color
+def create_discrete_colorscale(colors):
+    colorscale = []
+    for code, color in enumerate(colors):
+        colorscale.append([code / len(colors), color])
+        colorscale.append([(code + 1) / len(colors), color])
+    return colorscale
+
+
+# The plotly choropleth of a year and category, built and validated by plotly
+def build_choropleth_figure(year, selected_category):
+    fig = go.Figure(go.Choropleth(
+        geojson=choropleth_geojson_url,
+        locations=[feature['id'] for feature in choropleth_geojson['features']],
+        z=map_state_codes(year, selected_category),
+        zmin=-0.5,
+        zmax=len(map_category_colors) - 0.5,
+        colorscale=create_discrete_colorscale(map_category_colors),
+        showscale=False,
+        text=[feature['properties']['name'] for feature in geo_store.geometry['features']],
+        customdata=geo_store.year_values(year),
+        hovertemplate='<b>%{text}</b><br>Inflation Rate: %{customdata:.2f}%<extra></extra>',
+        marker_line_color='gray',
+        marker_line_width=0.5,
+        marker_opacity=0.7,
+    ))
+    fig.update_geos(projection_type='natural earth', showframe=False, showcoastlines=False)
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=300)
+    return fig
+
+
+# The choropleth is built by plotly once; every figure copies it with the codes and values of its year
+choropleth_skeleton = FigureSkeleton(build_choropleth_figure(geo_store.years[-1], None))
+
+
+# Initial plotly choropleth; later changes only patch its z (category codes) and customdata (values)
+def create_choropleth_map(year, selected_category):
+    return choropleth_skeleton.build({
+        'z': map_state_codes(year, selected_category),
+        'customdata': geo_store.year_values(year),
+    })
+
+
+# Playback codes of every year (see build_playback_frames)
+def build_playback_codes():
+    return [''.join(map(str, map_feature_codes[(year, None)])) for year in geo_store.years]
+
+
+# Every year's category codes and values for the client-side playback, sent to the browser once.
+# Codes are one digit per feature and year (the no-data code is 8), values are rounded to 2 decimals.
+def build_playback_frames():
+    return {
+        'years': geo_store.years,
+        'codes': build_playback_codes(),
+        'values': [
+            [None if value is None else round(value, 2) for value in geo_store.year_values(year)]
+            for year in geo_store.years
+        ],
+        'categories': list(category_colors),
+        'noData': NO_DATA_CODE,
+    }
+
+
+playback_frames = build_playback_frames()
+
+
+# Playback view: its own choropleth, a play button and a year slider; the map is
+# filled on first use and then redrawn in the browser (assets/clientside.js)
+def create_playback_view():
+    return html.Div(id='playback-view', style={'display': 'none', 'height': '300px', 'width': '90%'}, children=[
+        dcc.Graph(id='playback-map', style={'height': '250px'}),
+        html.Div(style={'display': 'flex', 'align-items': 'center'}, children=[
+            html.Button('Play', id='playback-button', n_clicks=0, className='inactive'),
+            html.Div(dcc.Slider(
+                id='playback-slider',
+                min=geo_store.years[0],
+                max=geo_store.years[-1],
+                step=1,
+                value=geo_store.years[-1],
+                marks={year: str(year) for year in geo_store.years if year % 5 == 0 or year == geo_store.years[-1]},
+                updatemode='drag',  # Scrubbing redraws the map while dragging
+                tooltip={'placement': 'bottom'},
+            ), style={'flex': '1'}),
+        ]),
+        dcc.Interval(id='playback-interval', interval=PLAYBACK_INTERVAL_MS, disabled=True),
+        dcc.Store(id='playback-frames'),
+    ])
+
+
+# Countries shown in the trend view until the user picks others
+DEFAULT_TREND_COUNTRIES = [code for code in ['USA', 'DEU', 'IND', 'BRA'] if code in country_series.row_of]
+
+
+# Trend view: a multi-country dropdown and a line plot of the selected countries over the years
+def create_trend_view():
+    return html.Div(id='trend-view', style={'display': 'none', 'height': '300px', 'width': '90%'}, children=[
+        dcc.Dropdown(
+            id='country-dropdown',
+            options=country_series.options(),
+            value=DEFAULT_TREND_COUNTRIES,
+            multi=True,
+            placeholder="Select countries",
+        ),
+        dcc.Graph(id='trend-graph', style={'height': '260px'}),
+    ])
+
+
+# Line plot of the inflation series of the selected countries. The figure is built as a
+# plain dict: with many countries, plotly's per-trace validation would dominate the callback.
+def create_trend_figure(codes):
+    _, names, values = country_series.series(codes or [])
+    years = country_series.years
+    traces = [
+        {
+            'type': 'scatter',
+            'mode': 'lines+markers',
+            'name': name,
+            'x': years,
+            'y': [None if value != value else value for value in row],  # NaN (no value) -> gap
+            'hovertemplate': f'<b>{name}</b><br>%{{x}}: %{{y:.2f}}%<extra></extra>',
+        }
+        for name, row in zip(names, np.round(values, 2).tolist())
+    ]
+    return {
+        'data': traces,
+        'layout': {
+            'margin': {'l': 40, 'r': 10, 't': 10, 'b': 30},
+            'height': 260,
+            'xaxis': {'dtick': 2},
+            'yaxis': {'title': {'text': 'Inflation (%)'}},
+            'showlegend': len(traces) <= 10,  # The hover labels name the countries beyond that
+            'uirevision': 'trend',  # Keep zoom and hidden traces when the selection changes
+        },
+    }
+
+
+# Initial content of the plot area: the folium engine fills it from a callback,
+# the plotly engine keeps both views in the layout and toggles their visibility
+def create_plot_area():
+    if MAP_ENGINE != 'plotly':
+        return "Map will appear here"
+    return [
+        html.Div(dcc.Graph(id='choropleth-map', figure=create_choropleth_map(2024, None), style={'height': '300px'}), id='map-view'),
+        html.Div(dcc.Graph(id='continent-bar-graph', figure=continent_bar_figure), id='bar-view', style={'display': 'none'}),
+    ]
+
 
 # Function to generate a separate HTML-based legend next to the map with inflation ranges
 def create_custom_legend():
@@ -250,7 +636,7 @@ app.layout = html.Div([
 									]),
 									html.Li([
 										html.Strong("Country-wise Inflation Trends:"),
-										" Users can select a country from the dropdown to explore its inflation trend over time in an interactive line plot."
+										" Users can open the Country trends view and select one or more countries from the dropdown to compare their inflation over time in an interactive line plot."
 									]),
 									html.Li([
 										html.Strong("Inflation Categories:"),
@@ -285,6 +671,9 @@ app.layout = html.Div([
 	], style={'background-color': '#e7ecef', 'margin-left': '10PX'}),
 	# Store to keep track of the currently active plot
     dcc.Store(id='active-plot', data='map'),  # Default to 'map'
+    # Random id of the page load, so a newer render request supersedes the older ones. Kept in memory:
+    # a duplicated tab copies sessionStorage, and two tabs with one id would supersede each other's renders
+    dcc.Store(id='session-id', storage_type='memory'),
 
     # Left section for information in an accordion
     html.Div([
@@ -308,7 +697,7 @@ app.layout = html.Div([
 					[
 						dbc.AccordionItem(
 							[
-								dcc.Graph(id='frequency-bar-graph', figure=create_category_bar_plot(), style={'height': '50%', 'width': '100%'}),
+								dcc.Graph(id='frequency-bar-graph', figure=category_bar_figure, style={'height': '50%', 'width': '100%'}),
 							],
 							title="Expand to see how frequently each inflation category occurred— Moderate Inflation occured most frequently.",
 							item_id="accordion-item-barplot",
@@ -337,16 +726,20 @@ app.layout = html.Div([
     html.Div([
         html.Button('Map', id='btn-map', n_clicks=0, className='inactive'),
         html.Button('Continents - Bar Plot', id='btn-bar', n_clicks=0, className='inactive'),
+        html.Button('Year playback', id='btn-playback', n_clicks=0, className='inactive'),
+        html.Button('Country trends', id='btn-trend', n_clicks=0, className='inactive'),
     ], style={'display': 'flex', 'justify-content': 'space-around', 'padding': '10px'}),
 
     # Placeholder for the plots
     html.Div(style={'display': 'flex', 'justify-content': 'space-between', 'margin-left': '10px'}, children=[
         # Plot area
-        html.Div(id='plot-area', children="Map will appear here",  
+        html.Div(id='plot-area', children=create_plot_area(),  
                  style={'height': '300px', 'padding': '0px', 'width': '90%'}),
+        create_playback_view(),
+        create_trend_view(),
         
     # Legend placed outside the plot area on the right
-    html.Div(create_custom_legend(), style={'width': '10%', 'margin-left': '10px', 'margin-right': '30px', 'margin-top': '10px'})  # Legend container
+    html.Div(create_custom_legend(), id='category-legend', style={'width': '10%', 'margin-left': '10px', 'margin-right': '30px', 'margin-top': '10px'})  # Legend container
     ]),
 
     # Container for side-by-side dropdowns
@@ -367,19 +760,21 @@ app.layout = html.Div([
         html.Div([
             html.H5("Inflation Categories:", style={'text-align': 'left', 'font-size': '12px', 'margin-top': '10px', 'margin-left':'10px'}),
             dcc.Dropdown(id='category-dropdown', options=[
-                {'label': 'Deflation', 'value': 'Deflation'},
-                {'label': 'Very Low Inflation', 'value': 'Very Low Inflation'},
-                {'label': 'Low Inflation', 'value': 'Low Inflation'},
-                {'label': 'Target Inflation', 'value': 'Target Inflation'},
-                {'label': 'Moderate Inflation', 'value': 'Moderate Inflation'},
-                {'label': 'High Inflation', 'value': 'High Inflation'},
-                {'label': 'Very High Inflation', 'value': 'Very High Inflation'},
-                {'label': 'Hyperinflation', 'value': 'Hyperinflation'},
+                {'label': category, 'value': category} for category in bands.names  # In band order
             ], 
             placeholder="Select an inflation category", 
             value=None,  # Automatically select None as default
             style={'width': '50%', 'margin-bottom': '10px', 'margin-left': '0px'}),
         ], style={'width': '40%'}),
+
+        # Period Dropdown (only with monthly data): a quarter or month of the selected year
+        html.Div([
+            html.H5("Period:", style={'text-align': 'left', 'font-size': '12px', 'margin-top': '10px', 'margin-left':'10px'}),
+            dcc.Dropdown(id='period-dropdown', options=create_period_options(),
+                         placeholder="Whole year",
+                         value=None,  # Whole year by default
+                         style={'width': '100%', 'margin-bottom': '10px'}),
+        ], style={'width': '20%', 'display': 'block' if monthly_store is not None else 'none'}),
     ]),  # Closing container for side-by-side dropdowns
 ], style={'width': '55%', 'display': 'inline-block', 'padding': '10px'}),
 
@@ -400,100 +795,145 @@ app.layout = html.Div([
         }
     )
 
-], style={'margin-left': '10px','margin-right': '10px'}),
+], style={'margin-left': '10px','margin-right': '10px'})
 
 
 
 
-# control the display of dropdowns
-@app.callback(
-    [Output('year-dropdown', 'style'), 
-     Output('category-dropdown', 'style')],
-    [Input('btn-map', 'n_clicks'), 
-     Input('btn-bar', 'n_clicks')]
+# Give the page a new session id on every load
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='sessionId'),
+    Output('session-id', 'data'),
+    [Input('session-id', 'modified_timestamp')],
+    [State('session-id', 'data')]
 )
-def toggle_dropdown_visibility(map_clicks, bar_clicks):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        # Default: Show map-related dropdowns by default
-        return {'display': 'block'}, {'display': 'block'}
-
-    # Determine which button was clicked
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    if button_id == 'btn-map':
-        # Show year and category dropdowns for the map, hide country dropdown
-        return {'display': 'block'}, {'display': 'block'}
-    elif button_id == 'btn-bar':
-        # Only show the year dropdown for the bar plot
-        return {'display': 'none'}, {'display': 'none'}
-
-    # Default case
-    return {'display': 'block'}, {'display': 'block'}
-
-# callback to color active plot button
-# Define button style change callback
-@app.callback(
-    [Output('btn-map', 'className'),
-     Output('btn-bar', 'className')],
+
+# Dropdown visibility, button styles and the active plot only depend on which
+# button was clicked: computed in the browser (assets/clientside.js), no server round-trip
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='selectPlot'),
+    [Output('year-dropdown', 'style'),
+     Output('category-dropdown', 'style'),
+     Output('period-dropdown', 'style'),
+     Output('btn-map', 'className'),
+     Output('btn-bar', 'className'),
+     Output('btn-playback', 'className'),
+     Output('btn-trend', 'className'),
+     Output('active-plot', 'data')],
     [Input('btn-map', 'n_clicks'),
-     Input('btn-bar', 'n_clicks')]
+     Input('btn-bar', 'n_clicks'),
+     Input('btn-playback', 'n_clicks'),
+     Input('btn-trend', 'n_clicks')]
 )
-def set_button_style(map_clicks, bar_clicks):
-    ctx = dash.callback_context
-
-    # Check which button triggered the callback
-    if ctx.triggered:
-        clicked_button = ctx.triggered[0]['prop_id'].split('.')[0]
-    else:
-        clicked_button = None
-
-    # Set className for each button based on the clicked one
-    if clicked_button == 'btn-map':
-        return 'active', 'inactive'
-    elif clicked_button == 'btn-bar':
-        return 'inactive', 'active'
 
-    # Default: no button is active
-    return 'active', 'inactive'
+# Show the playback or trend view instead of the plot area while it is active
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='toggleViews'),
+    [Output('plot-area', 'style'),
+     Output('playback-view', 'style'),
+     Output('trend-view', 'style')],
+    [Input('active-plot', 'data')]
+)
 
 
-# Callback to store the active plot based on button clicks
+# Series of the selected countries in the trend view
 @app.callback(
-    Output('active-plot', 'data'),
-    [Input('btn-map', 'n_clicks'), 
-     Input('btn-bar', 'n_clicks')]
+    Output('trend-graph', 'figure'),
+    [Input('country-dropdown', 'value')]
 )
-def update_active_plot(map_clicks, bar_clicks):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return 'map'  # Default to map
-    triggered_button = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    if triggered_button == 'btn-map':
-        return 'map'
-    elif triggered_button == 'btn-bar':
-        return 'bar'
+def update_trend_graph(countries):
+    return create_trend_figure(countries)
 
-    return 'map'  # Default to map if no button is pressed
 
-# Update plot area based on dropdowns and the active plot
+# Fill the playback map and frames the first time playback is opened; after that it runs in the browser
 @app.callback(
-    Output('plot-area', 'children'),
-    [Input('year-dropdown', 'value'), 
+    [Output('playback-frames', 'data'),
+     Output('playback-map', 'figure')],
+    [Input('btn-playback', 'n_clicks')],
+    [State('playback-frames', 'data')],
+    prevent_initial_call=True
+)
+def load_playback(n_clicks, frames):
+    if frames:
+        raise PreventUpdate
+    return playback_frames, create_choropleth_map(geo_store.years[-1], None)
+
+
+# Play/pause, advance one year per interval tick, stop when leaving playback
+app.clientside_callback(
+    ClientsideFunction(namespace='playback', function_name='control'),
+    [Output('playback-interval', 'disabled'),
+     Output('playback-button', 'children'),
+     Output('playback-slider', 'value')],
+    [Input('playback-button', 'n_clicks'),
+     Input('playback-interval', 'n_intervals'),
+     Input('active-plot', 'data')],
+    [State('playback-interval', 'disabled'),
+     State('playback-slider', 'value'),
+     State('playback-frames', 'data')]
+)
+
+# Redraw the playback map for the slider year and the selected category from the preloaded frames
+app.clientside_callback(
+    ClientsideFunction(namespace='playback', function_name='frame'),
+    Output('playback-map', 'figure', allow_duplicate=True),
+    [Input('playback-slider', 'value'),
      Input('category-dropdown', 'value'),
-     Input('active-plot', 'data')]
+     Input('playback-frames', 'data')],
+    [State('playback-map', 'figure')],
+    prevent_initial_call=True
 )
-def update_plot_area(year, selected_category, active_plot):
+
+# Update plot area based on dropdowns and the active plot
+def update_plot_area(year, selected_category, active_plot, period=None, session_id=None):
     if year is None:
         year = 2024
     
-    if active_plot == 'map':
-        return update_map(year, selected_category)
-    elif active_plot == 'bar':
-        return dcc.Graph(figure=update_stacked_barplot())
+    if active_plot in ('playback', 'trend'):
+        raise PreventUpdate  # These views replace the plot area
 
-    return update_map(year, selected_category)  # Default to map
+    if active_plot == 'bar':
+        return dcc.Graph(figure=continent_bar_figure)
+
+    return run_render_job(session_id, 'map', update_map, year, selected_category, period)  # Default to map
+
+
+# Patch only the category codes (and the values when the year or period changes) of the choropleth
+def update_choropleth(year, selected_category, period=None):
+    if year is None:
+        year = 2024
+
+    patched_figure = Patch()
+    patched_figure['data'][0]['z'] = map_state_codes(year, selected_category or None, period)
+    if dash.callback_context.triggered_id != 'category-dropdown':
+        patched_figure['data'][0]['customdata'] = map_state_values(year, period)
+    return patched_figure
+
+
+if MAP_ENGINE == 'plotly':
+    app.callback(
+        Output('choropleth-map', 'figure'),
+        [Input('year-dropdown', 'value'),
+         Input('category-dropdown', 'value'),
+         Input('period-dropdown', 'value')],
+        prevent_initial_call=True
+    )(update_choropleth)
+    # Show the map or the bar plot, in the browser
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='togglePlotViews'),
+        [Output('map-view', 'style'),
+         Output('bar-view', 'style')],
+        [Input('active-plot', 'data')]
+    )
+else:
+    app.callback(
+        Output('plot-area', 'children'),
+        [Input('year-dropdown', 'value'), 
+         Input('category-dropdown', 'value'),
+         Input('active-plot', 'data'),
+         Input('period-dropdown', 'value')],
+        [State('session-id', 'data')]
+    )(update_plot_area)
 
     
     
@@ -502,9 +942,15 @@ def update_plot_area(year, selected_category, active_plot):
 
 # Callback for the Folium Map
 
+# folium is imported by the first map render unless LAZY_IMPORTS=0
+if MAP_ENGINE != 'plotly' and not LAZY_IMPORTS:
+    import folium
+
 # color mapping and custom_legend creation function at the top of script
 # Function to add a custom legend to the map
 def add_custom_legend(m, category_colors):
+    import folium
+
     legend_html = '''
      <div style="
      position: absolute; 
@@ -524,112 +970,109 @@ def add_custom_legend(m, category_colors):
 
 
 
-def update_map(year, selected_category):
-    # Filter data based on the selected year and category
-    filtered_data = country_year_mean[country_year_mean['Year'] == year]
-    
-    if selected_category:
-        filtered_data = filtered_data[filtered_data['Inflation_Category'] == selected_category]
+# Render the folium map for a year, category and period to HTML (memoized per state)
+@renders.memoize('map')
+def render_map_html(year, selected_category, period=None):
+    import folium
+
+    if period is None:
+        # Look up the precomputed fill colors and GeoJSON for the selected year and category
+        fill_colors = map_fill_colors.get((year, selected_category), {})
+        feature_collection = geo_store.feature_collection(year)
+    else:
+        codes = map_state_codes(year, selected_category, period)
+        fill_colors = dict(zip(map_feature_iso3, [map_category_colors[code] for code in codes]))
+        feature_collection = geo_store.join(map_state_values(year, period))
 
     # Initialize the map
     m = folium.Map(location=[20, 0], zoom_start=1)
 
-    # Construct the GeoJSON file path
-    try:
-        geojson_file = f'Inflation_data/inflation_{year}.geojson'
-
-        # Add GeoJson layer for category-based coloring
-        folium.GeoJson(
-            geojson_file,
-            style_function=lambda feature: {
-                'fillColor': category_colors.get(
-                    filtered_data.loc[
-                        filtered_data['Area Code (ISO3)'] == feature['properties']['combined_iso_a3'],
-                        'Inflation_Category'
-                    ].values[0] if not filtered_data.loc[
-                        filtered_data['Area Code (ISO3)'] == feature['properties']['combined_iso_a3']
-                    ].empty else None, '#808080'  # Default to gray if category is missing
-                ),
-                'color': 'gray',
-                'weight': 0.5,
-                'fillOpacity': 0.7,
-                'lineOpacity': 0.2
-            },
-            highlight_function=lambda feature: {
-                'weight': 3,
-                'color': 'blue',
-                'fillOpacity': 0.7,
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=['name'],
-                aliases=['Country:'],
+    # Add GeoJson layer for category-based coloring, using the in-memory GeoJSON for the year
+    folium.GeoJson(
+        feature_collection,
+        style_function=lambda feature: {
+            'fillColor': fill_colors.get(
+                feature['properties']['combined_iso_a3'], DEFAULT_FILL_COLOR  # Default to gray if category is missing
             ),
-            popup=folium.GeoJsonPopup(
-                fields=['name_long', 'Value'],
-                aliases=['Country:', 'Inflation Rate:'],
-                localize=True,
-                labels=True,
-                sticky=False
-            )
-        ).add_to(m)
-
-        # Add the custom legend outside of the plot area
-        #add_custom_legend(m, category_colors)
+            'color': 'gray',
+            'weight': 0.5,
+            'fillOpacity': 0.7,
+            'lineOpacity': 0.2
+        },
+        highlight_function=lambda feature: {
+            'weight': 3,
+            'color': 'blue',
+            'fillOpacity': 0.7,
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=['name'],
+            aliases=['Country:'],
+        ),
+        popup=folium.GeoJsonPopup(
+            fields=['name_long', 'Value'],
+            aliases=['Country:', 'Inflation Rate:'],
+            localize=True,
+            labels=True,
+            sticky=False
+        )
+    ).add_to(m)
+
+    # Add the custom legend outside of the plot area
+    #add_custom_legend(m, category_colors)
+
+    # Generate the map's HTML representation
+    return m._repr_html_()
+
 
+def update_map(year, selected_category, period=None):
+    try:
+        map_html = render_map_html(year, selected_category or None, period or None)
     except Exception as e:
         print(f"Error: {e}")
         return html.Div(f"An error occurred while creating the map: {str(e)}")
 
-    # Generate the map's HTML representation
-    map_html = m._repr_html_()
-
     # Return the map
     return html.Div([
         html.Div(html.Iframe(srcDoc=map_html, width='100%', height='300px')),
     ], style={'padding-bottom': '0px'})
 
+
+# Pre-render every (year, category) map into the render cache
+def warm_render_cache():
+    for year in geo_store.years:
+        for category in [None] + list(category_colors):
+            render_map_html(year, category, None)
+
         
+# Precomputed aggregates for the insight panels (call insights.rebuild() if the data changes)
+insights = InsightsEngine(country_year_mean, bands)
+
+
 # Global insights
 def default_insights():
-    # Top countries maintaining target inflation
-    target_data = country_year_mean[country_year_mean['Inflation_Category'] == 'Target Inflation']
-    target_countries = target_data['Area'].value_counts().head(5)
-    
-    # Regions most affected by high to hyperinflation (2001–2024)
-    high_inflation_regions = country_year_mean[
-        country_year_mean['Inflation_Category'].isin(['High Inflation', 'Very High Inflation', 'Hyperinflation'])
-    ]['Region'].value_counts().head(5)
-    
-    # Countries experiencing high inflation, very high inflation, and hyperinflation most frequently
-    high_inflation_countries = country_year_mean[
-        country_year_mean['Inflation_Category'].isin(['High Inflation', 'Very High Inflation', 'Hyperinflation'])
-    ]['Area'].value_counts().head(5)
-    
-    # Global deflation and hyperinflation years
-    deflationary_years = country_year_mean[country_year_mean['Inflation_Category'] == 'Deflation']['Year'].value_counts().head(5)
-    hyperinflationary_years = country_year_mean[country_year_mean['Inflation_Category'] == 'Hyperinflation']['Year'].value_counts().head(5)
+    stats = insights.global_stats
     
     # Prepare insights for display
-    insights = html.Div([
+    insights_div = html.Div([
         html.H4("Global Inflation Insights"),
         
         html.P("Top 5 hyperinflationary years globally:"),
-        html.Ul([html.Li(f"{year}: {count} countries") for year, count in hyperinflationary_years.items()]),
+        html.Ul([html.Li(f"{year}: {count} countries") for year, count in stats['hyperinflationary_years']]),
         
         html.P("Top 5 deflationary years globally:"),
-        html.Ul([html.Li(f"{year}: {count} countries") for year, count in deflationary_years.items()]),
+        html.Ul([html.Li(f"{year}: {count} countries") for year, count in stats['deflationary_years']]),
         
         html.P("Top 5 countries maintaining target inflation the most frequently:"),
-        html.Ul([html.Li(f"{country}: {count} times") for country, count in target_countries.items()]),
+        html.Ul([html.Li(f"{country}: {count} times") for country, count in stats['target_countries']]),
         
         html.P("Top 5 regions most affected by high to hyperinflation (2001–2024):"),
-        html.Ul([html.Li(f"{region}: {count} occurrences") for region, count in high_inflation_regions.items()]),
+        html.Ul([html.Li(f"{region}: {count} occurrences") for region, count in stats['high_inflation_regions']]),
         
         html.P("Top 5 countries experiencing high inflation, very high inflation, and hyperinflation most frequently:"),
-        html.Ul([html.Li(f"{country}: {count} occurrences") for country, count in high_inflation_countries.items()])    
+        html.Ul([html.Li(f"{country}: {count} occurrences") for country, count in stats['high_inflation_countries']])    
     ])
     
-    return insights
+    return insights_div
 
 # Insight for a selected inflation category
 def update_category_insights(selected_category):
@@ -644,39 +1087,22 @@ def update_category_insights(selected_category):
 
 # Helper function to avoid duplicating insight generation logic
 def generate_insight_for_category(category):
-    # Filter data for the selected category
-    filtered_data = country_year_mean[country_year_mean['Inflation_Category'] == category]
-    
-    # Apply additional filter if the category is 'Target Inflation'
-    #if category == 'Target Inflation':
-    #    filtered_data = filtered_data[(filtered_data['Value'] >= 1.5) & (filtered_data['Value'] <= 2)]
+    # Look up the precomputed aggregates for the selected category
+    stats = insights.category(category)
     
-    if filtered_data.empty:
+    if stats is None:
         return [html.P("No insights available for this category.")]
 
-    # Top 3 countries most frequently experiencing the selected category
-    top_countries = filtered_data['Area'].value_counts().head(3)
-    
-    # Average inflation for this category
-    avg_inflation = filtered_data['Value'].mean()
-    
-    # Find years with the most occurrences of the selected inflation category
-    top_years = filtered_data['Year'].value_counts().head(3)
-    
-    # Minimum and maximum inflation in the category
-    min_inflation = filtered_data['Value'].min()
-    max_inflation = filtered_data['Value'].max()
-
     # Prepare insights for display
     return [
         html.H4(f"Insights for {category}"),
         html.P(f"Top 3 countries most frequently experiencing {category}:"),
-        html.Ul([html.Li(f"{country}: {count} times") for country, count in top_countries.items()]),
-        html.P(f"Average inflation in this category: {avg_inflation:.2f}%"),
-        html.P(f"Minimum inflation in this category: {min_inflation:.2f}%"),
-        html.P(f"Maximum inflation in this category: {max_inflation:.2f}%"),
+        html.Ul([html.Li(f"{country}: {count} times") for country, count in stats['top_countries']]),
+        html.P(f"Average inflation in this category: {stats['mean']:.2f}%"),
+        html.P(f"Minimum inflation in this category: {stats['min']:.2f}%"),
+        html.P(f"Maximum inflation in this category: {stats['max']:.2f}%"),
         html.P(f"Top 3 years with the most occurrences of {category}:"),
-        html.Ul([html.Li(f"{year}: {count} occurrences") for year, count in top_years.items()])
+        html.Ul([html.Li(f"{year}: {count} occurrences") for year, count in stats['top_years']])
     ]
 
 
@@ -689,29 +1115,101 @@ def update_insight(selected_category):
     return update_category_insights(selected_category)  # Show insights for the selected category
 
     
-# update global insight (info text)
-@app.callback(
-    Output('info-text', 'children'),
-    [Input('category-dropdown', 'value')]
-)
-def update_info_text(selected_category):
-    return  default_insights()
+# global insight (info text): it does not depend on any input, so it is rendered into the layout once
+app.layout['info-text'].children = default_insights()
+
+
+# Re-band the data with new bounds (an InflationBands with the same categories and colors) and
+# rebuild everything derived from the categories: the category column, the row index, the insights,
+# the map codes and colors, the playback frames and both bar plots, then the layout of new page loads.
+# Open pages keep what they show until their next callback or reload. This only changes the calling
+# process (a development server, a benchmark); no route calls it. Under gunicorn the bands are a
+# startup setting: set INFLATION_BOUNDS and restart, so that every worker serves the same bands.
+def set_inflation_bands(new_bands):
+    global bands, inflation_ranges, continent_inflation_periods_counts, category_bar_figure, continent_bar_figure
+    global map_feature_codes, map_fill_colors, period_codes, playback_frames
+    if artifacts is not None:
+        raise RuntimeError("ARTIFACT_MODE=read serves the bands the artifacts were baked with")
+    # The legend, the map and bar colors and the category codes are built from the names and colors once
+    if new_bands.names != bands.names or new_bands.colors != bands.colors:
+        raise ValueError(f"The bands must keep the categories and colors {bands.colors}; restart to change them")
+
+    bands = new_bands
+    inflation_ranges = bands.ranges()
+    categorize_rows(country_year_mean)
+    data_index.rebuild(country_year_mean)
+    insights.bands = bands
+    insights.rebuild(country_year_mean)
+    continent_inflation_periods_counts = build_continent_counts(country_year_mean)
+    map_feature_codes = build_map_feature_codes(country_year_mean, map_feature_iso3)
+    map_fill_colors = build_map_fill_colors(map_feature_codes, map_feature_iso3)
+    if monthly_store is not None:
+        period_codes = {granularity: build_period_codes(matrix) for granularity, matrix in monthly_store.matrices.items()}
+    # The values do not depend on the bands
+    playback_frames = dict(playback_frames, codes=build_playback_codes())
+
+    # Renders of the previous bands are no longer looked up
+    renders.data_version = f"{input_version}-{bands.version}"
+    category_bar_figure, continent_bar_figure = build_bar_figures()
+
+    app.layout['category-legend'].children = create_custom_legend()
+    app.layout['frequency-bar-graph'].figure = category_bar_figure
+    app.layout['info-text'].children = default_insights()
+    if MAP_ENGINE == 'plotly':
+        app.layout['choropleth-map'].figure = create_choropleth_map(2024, None)
+        app.layout['continent-bar-graph'].figure = continent_bar_figure
 
 
 # wordcloud update callback
+# Word cloud and inflation range for a quarter or month, read from the precomputed period arrays
+def period_word_cloud_and_range(selected_category, selected_year, selected_period):
+    location = monthly_store.locate(selected_year, selected_period)
+    if location is None:
+        return None, "No inflation range available for the selected category/period."
+    granularity, column = location
+    values = monthly_store.matrices[granularity][:, column]
+    selected = ~np.isnan(values)
+    if selected_category:
+        selected &= period_codes[granularity][:, column] == category_codes[selected_category]
+    if not selected.any():
+        return None, "No inflation range available for the selected category/period."
+
+    period_values = values[selected]
+    # Countries with more deflation (further from zero) are larger
+    sizes = np.abs(period_values) if selected_category == bands.names[0] else period_values
+    word_cloud_image = generate_word_cloud(dict(zip(period_areas[selected], sizes.tolist())))
+
+    label = period_label(selected_year, selected_period)
+    if selected_category:
+        inflation_range = f"Inflation rates for inflation category '{selected_category}' in {label} ranged from {period_values.min():.2f}% to {period_values.max():.2f}%."
+    else:
+        inflation_range = f"Inflation rates for {label} ranged from {period_values.min():.2f}% to {period_values.max():.2f}%."
+    return word_cloud_image, inflation_range
+
+
 # Callback for category chart/word cloud, top years, and inflation range
 @app.callback(
     [Output('wordcloud-graph', 'src'),  # Word cloud as image
      Output('inflation-range', 'children')],  # Inflation range text
-    [Input('category-dropdown', 'value'), Input('year-dropdown', 'value')]
+    [Input('category-dropdown', 'value'), Input('year-dropdown', 'value'), Input('period-dropdown', 'value')],
+    [State('session-id', 'data')]
 )
-def update_category_graph_top_years_and_range(selected_category, selected_year):
+def update_category_graph_top_years_and_range(selected_category, selected_year, selected_period=None, session_id=None):
+    return run_render_job(session_id, 'word_cloud', word_cloud_and_range,
+                          selected_category, selected_year, selected_period)
+
+
+# Word cloud and inflation range text for a category, year and period
+def word_cloud_and_range(selected_category, selected_year, selected_period=None):
+    # A quarter or month of the selected year (monthly data only)
+    if selected_period and selected_year and monthly_store is not None:
+        return period_word_cloud_and_range(selected_category, selected_year, selected_period)
+
     # If no category or year is selected, show the default word cloud based on average inflation
     if selected_category is None and selected_year:
         # Calculate average inflation for each country from 2001–2024
-        default_data = country_year_mean.dropna(subset=['Area', 'Value'])
-        default_data = default_data[default_data['Year'] == selected_year]
-        country_avg_inflation = default_data.groupby('Area')['Value'].mean().to_dict()  # Mean inflation by country
+        default_data = data_index.slice(year=selected_year)
+        country_avg_inflation = default_data.groupby('Area', observed=True)['Value'].mean().to_dict()  # Mean inflation by country
 
         # Generate word cloud sized by average inflation
         word_cloud_image = generate_word_cloud(country_avg_inflation)
@@ -722,16 +1220,12 @@ def update_category_graph_top_years_and_range(selected_category, selected_year):
         inflation_range = f"Inflation rates for {selected_year} ranged from {min_inflation:.2f}% to {max_inflation:.2f}%."
 
         return (
-            f'data:image/png;base64,{word_cloud_image}',  # Update src for html.Img
+            word_cloud_image,  # Update src for html.Img
             inflation_range  # Update inflation range text
         )
     
     # Filter data based on category and year
-    filtered_data = country_year_mean.dropna(subset=['Area', 'Value'])
-    if selected_category:
-        filtered_data = filtered_data[filtered_data['Inflation_Category'] == selected_category]
-    if selected_year:
-        filtered_data = filtered_data[filtered_data['Year'] == selected_year]
+    filtered_data = data_index.slice(year=selected_year or None, category=selected_category or None)
 
     # If no data after filtering, return appropriate message
     if filtered_data.empty:
@@ -742,7 +1236,7 @@ def update_category_graph_top_years_and_range(selected_category, selected_year):
 
     # Generate word cloud for the selected category and year based on inflation values
     # Generate word cloud for the selected category and year based on inflation values
-    if selected_category == "Deflation":
+    if selected_category == bands.names[0]:
         # Adjust the values so countries with more deflation (further from zero) are larger
         country_inflation = {country: abs(value) for country, value in zip(filtered_data['Area'], filtered_data['Value'])}
     else:
@@ -760,11 +1254,60 @@ def update_category_graph_top_years_and_range(selected_category, selected_year):
     inflation_range = f"Inflation rates for inflation category '{selected_category}' in {selected_year} ranged from {min_inflation:.2f}% to {max_inflation:.2f}%."
 
     return (
-        f'data:image/png;base64,{word_cloud_image}',  # Update word cloud src
+        word_cloud_image,  # Update word cloud src
         inflation_range  # Update inflation range
     )
 
 
 
+# Instrument every server callback registered above and expose the metrics
+if METRICS_ENABLED:
+    callback_metrics = CallbackMetrics()
+    renders.observers.append(callback_metrics.observe_cache)
+    callback_metrics.add_collector(
+        'render_cache_hits_total', 'counter', 'Render cache hits per rendered output.',
+        lambda: [({'render': name}, count) for name, count in sorted(renders.hits.items())]
+    )
+    callback_metrics.add_collector(
+        'render_cache_misses_total', 'counter', 'Render cache misses per rendered output.',
+        lambda: [({'render': name}, count) for name, count in sorted(renders.misses.items())]
+    )
+    callback_metrics.add_collector(
+        'render_cache_entries', 'gauge', 'Entries in the render cache.',
+        lambda: [({}, renders.stats()['entries'] or 0)]
+    )
+    if render_jobs is not None:
+        callback_metrics.add_collector(
+            'render_jobs_queued', 'gauge', 'Render jobs waiting for a worker.',
+            lambda: [({}, render_jobs.queued)]
+        )
+        callback_metrics.add_collector(
+            'render_jobs_running', 'gauge', 'Render jobs running.',
+            lambda: [({}, render_jobs.running)]
+        )
+        callback_metrics.add_collector(
+            'render_jobs_total', 'counter', 'Render jobs per outcome (completed, failed, cancelled, dropped).',
+            lambda: [({'job': name, 'outcome': outcome}, count)
+                     for (name, outcome), count in sorted(render_jobs.outcomes.items())]
+        )
+        callback_metrics.add_collector(
+            'render_job_latency_seconds_total', 'counter', 'Time from submission to result of finished render jobs.',
+            lambda: [({'job': name}, seconds) for name, seconds in sorted(render_jobs.latency_sum.items())]
+        )
+        callback_metrics.add_collector(
+            'render_job_wait_seconds_total', 'counter', 'Time render jobs spent queued before starting.',
+            lambda: [({'job': name}, seconds) for name, seconds in sorted(render_jobs.wait_sum.items())]
+        )
+    instrument_callbacks(app, callback_metrics)
+
+    @server.route('/metrics')
+    def prometheus_metrics():
+        return flask.Response(callback_metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+if WARM_RENDER_CACHE:
+    warm_render_cache()
+
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,113 @@
+# Content-addressed store of pre-rendered outputs, written by bake.py.
+#
+# .cache/artifacts/
+#   objects/<sha256>               one pickled output per distinct content
+#   manifests/<data version>.json  render key -> object hash
+# A render key is the render name and its arguments, as memoized by the render
+# cache ('map', (2020, 'High Inflation', None)). The manifest is named by the
+# data version (hash of the CSV, geometry and value files, see
+# render_cache.data_fingerprint), so changing an input makes the app look for
+# a manifest that does not exist yet: old artifacts are never served for new
+# data. The manifest also records the render settings of the bake (e.g. the word
+# cloud image format), which are part of the render keys: the app checks them
+# at startup instead of missing every artifact. Objects are shared by every
+# manifest that references them.
+import hashlib
+import json
+import os
+import pickle
+
+
+ARTIFACT_DIR = os.path.join('.cache', 'artifacts')
+
+
+class MissingArtifact(KeyError):
+    pass
+
+
+def artifact_key(name, args):
+    return f"{name}:{args!r}"
+
+
+class ArtifactStore:
+    # `settings`: the render settings of the outputs (name -> value), written to the manifest
+    def __init__(self, directory, data_version, settings=None):
+        self.directory = directory
+        self.data_version = data_version
+        self.settings = settings or {}
+        self.entries = None  # render key -> object hash, once loaded
+        self.baked_settings = None  # render settings of the loaded manifest
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, 'manifests', f"{self.data_version}.json")
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest)
+
+    # Read the manifest of the data version; False if nothing was baked for it
+    def load(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            self.entries = manifest['entries']
+            self.baked_settings = manifest.get('settings', {})
+        except (OSError, ValueError, KeyError):
+            self.entries = self.baked_settings = None
+        return self.entries is not None
+
+    # Render settings that differ between the loaded manifest and this store: name -> (baked, current)
+    def mismatched_settings(self):
+        baked = self.baked_settings or {}
+        return {
+            name: (baked.get(name), value) for name, value in self.settings.items() if baked.get(name) != value
+        }
+
+    def get(self, name, args):
+        digest = self.entries.get(artifact_key(name, args)) if self.entries is not None else None
+        if digest is None:
+            raise MissingArtifact(artifact_key(name, args))
+        with open(self.object_path(digest), 'rb') as f:
+            return pickle.load(f)
+
+    # Store a value (once per content) and return its hash
+    def put(self, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            staging_path = f"{path}.tmp-{os.getpid()}"
+            with open(staging_path, 'wb') as f:
+                f.write(data)
+            os.replace(staging_path, path)
+        return digest
+
+    def write_manifest(self, entries):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        staging_path = f"{self.manifest_path}.tmp-{os.getpid()}"
+        with open(staging_path, 'w') as f:
+            json.dump({'data_version': self.data_version, 'settings': self.settings, 'entries': entries},
+                      f, indent=1, sort_keys=True)
+        os.replace(staging_path, self.manifest_path)
+        self.entries, self.baked_settings = entries, dict(self.settings)
+
+    # Remove the manifests of other data versions and the objects no manifest references
+    def prune(self):
+        manifests_dir = os.path.dirname(self.manifest_path)
+        referenced = set()
+        removed = 0
+        for filename in os.listdir(manifests_dir):
+            path = os.path.join(manifests_dir, filename)
+            if path == self.manifest_path:
+                with open(path) as f:
+                    referenced.update(json.load(f)['entries'].values())
+            else:
+                os.remove(path)
+                removed += 1
+        objects_dir = os.path.join(self.directory, 'objects')
+        for digest in os.listdir(objects_dir):
+            if digest not in referenced:
+                os.remove(os.path.join(objects_dir, digest))
+                removed += 1
+        return removed
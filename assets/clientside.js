@@ -0,0 +1,113 @@
+// Clientside callbacks: UI state that only depends on which button was clicked.
+// They run in the browser, so switching between the map and the bar plot does
+// not send a request to the Python server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    ui: {
+        // Id of the component that triggered the callback, or null on the initial call
+        triggeredId: function () {
+            const triggered = window.dash_clientside.callback_context.triggered;
+            if (!triggered || !triggered.length) {
+                return null;
+            }
+            return triggered[0].prop_id.split('.')[0];
+        },
+
+        // Random id of the page load (a memory store: every load, reload or duplicated tab gets a new one)
+        sessionId: function (modified, sessionId) {
+            if (sessionId) {
+                return window.dash_clientside.no_update;
+            }
+            return Date.now().toString(36) + Math.random().toString(36).slice(2);
+        },
+
+        // Dropdown visibility, button classes and the active plot for the clicked button
+        selectPlot: function (mapClicks, barClicks, playbackClicks, trendClicks) {
+            const shown = {'display': 'block'};
+            const hidden = {'display': 'none'};
+            const triggered = window.dash_clientside.ui.triggeredId();
+            if (triggered === 'btn-bar') {
+                // Only the map uses the year, category and period dropdowns
+                return [hidden, hidden, hidden, 'inactive', 'active', 'inactive', 'inactive', 'bar'];
+            }
+            if (triggered === 'btn-playback') {
+                // The slider replaces the year dropdown; the category still filters the map
+                return [hidden, shown, hidden, 'inactive', 'inactive', 'active', 'inactive', 'playback'];
+            }
+            if (triggered === 'btn-trend') {
+                // The trend view has its own country dropdown
+                return [hidden, hidden, hidden, 'inactive', 'inactive', 'inactive', 'active', 'trend'];
+            }
+            // Default: map
+            return [shown, shown, shown, 'active', 'inactive', 'inactive', 'inactive', 'map'];
+        },
+
+        // Show the plot area, the playback view or the trend view
+        toggleViews: function (activePlot) {
+            const display = function (shown) {
+                return {'display': shown ? 'block' : 'none'};
+            };
+            const plotArea = Object.assign({'height': '300px', 'padding': '0px', 'width': '90%'},
+                activePlot === 'playback' || activePlot === 'trend' ? display(false) : {});
+            const view = {'height': '300px', 'width': '90%'};
+            return [
+                plotArea,
+                Object.assign({}, view, display(activePlot === 'playback')),
+                Object.assign({}, view, display(activePlot === 'trend'))
+            ];
+        },
+
+        // Show the map or the bar plot (plotly engine)
+        togglePlotViews: function (activePlot) {
+            if (activePlot === 'bar') {
+                return [{'display': 'none'}, {'display': 'block'}];
+            }
+            return [{'display': 'block'}, {'display': 'none'}];
+        }
+    },
+
+    playback: {
+        // Play/pause button, interval ticks and leaving playback: [interval disabled, button label, slider year]
+        control: function (clicks, ticks, activePlot, disabled, year, frames) {
+            const noUpdate = window.dash_clientside.no_update;
+            const triggered = window.dash_clientside.ui.triggeredId();
+            if (activePlot !== 'playback' || !frames) {
+                return [true, 'Play', noUpdate];
+            }
+            const years = frames.years;
+            const last = years[years.length - 1];
+            if (triggered === 'playback-button') {
+                if (!disabled) {
+                    return [true, 'Play', noUpdate];
+                }
+                // Start again from the first year when the slider is at the end
+                return [false, 'Pause', year >= last ? years[0] : noUpdate];
+            }
+            if (triggered === 'playback-interval' && !disabled) {
+                const next = year + 1;
+                if (next >= last) {
+                    return [true, 'Play', last];
+                }
+                return [false, 'Pause', next];
+            }
+            return [noUpdate, noUpdate, noUpdate];
+        },
+
+        // Playback map for a year and category, from the preloaded frames
+        frame: function (year, category, frames, figure) {
+            if (!frames || !figure || !figure.data) {
+                return window.dash_clientside.no_update;
+            }
+            const index = frames.years.indexOf(year);
+            if (index < 0) {
+                return window.dash_clientside.no_update;
+            }
+            const selected = category ? frames.categories.indexOf(category) : -1;
+            const z = Array.from(frames.codes[index], function (digit) {
+                const code = Number(digit);
+                return selected < 0 || code === selected ? code : frames.noData;
+            });
+            const trace = Object.assign({}, figure.data[0], {z: z, customdata: frames.values[index]});
+            return Object.assign({}, figure, {data: [trace].concat(figure.data.slice(1))});
+        }
+    }
+});
@@ -0,0 +1,104 @@
+# Offline bake: pre-renders every output of the dashboard into the artifact store.
+#
+# The state space is small: the folium map and the word cloud for each year
+# (and no year, for the word cloud) times the 9 category states, plus the two
+# bar plots. Years are rendered in parallel by a pool of processes that import
+# the app once, write their outputs to .cache/artifacts/objects/ by content
+# hash, and return the keys. The manifest of the current data version is then
+# written (see artifacts.py). Start the app with ARTIFACT_MODE=read to serve
+# only these artifacts.
+#
+# Rendering settings come from the same environment variables as the app
+# (e.g. WORDCLOUD_FORMAT) and are recorded in the manifest. Baking is skipped
+# when the manifest of the current data version exists with the same settings.
+#
+# Usage:
+#   python bake.py [--jobs N] [--force] [--prune] [--directory .cache/artifacts]
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from artifacts import ARTIFACT_DIR, ArtifactStore, artifact_key
+from figures import plain_figure
+
+
+dashboard = None  # The app module, imported once per process
+
+
+def load_dashboard():
+    global dashboard
+    if dashboard is None:
+        # Render everything (no artifacts, no jobs); import folium and wordcloud before forking
+        os.environ.update(ARTIFACT_MODE='off', METRICS_ENABLED='0', RENDER_JOBS='0', LAZY_IMPORTS='0')
+        import Visual_Food_Inflation_app
+        dashboard = Visual_Food_Inflation_app
+    return dashboard
+
+
+# Stands in for the app's render cache in a bake process: renders every lookup and keeps it
+class RecordingRenders:
+    def __init__(self):
+        self.records = []
+
+    def get_or_render(self, name, args, render):
+        value = render()
+        self.records.append((name, args, value))
+        return value
+
+
+# Render the maps and word clouds of one year (None: the word clouds of every year)
+def bake_year(directory, data_version, year):
+    store = ArtifactStore(directory, data_version)
+    # generate_word_cloud looks the render cache up through this module global
+    recorder = dashboard.renders = RecordingRenders()
+    entries = {}
+    for category in [None] + list(dashboard.category_colors):
+        if year is not None:
+            args = (year, category, None)
+            entries[artifact_key('map', args)] = store.put(dashboard.render_map_html.uncached(*args))
+        dashboard.word_cloud_and_range(category, year)
+    for name, args, value in recorder.records:
+        entries[artifact_key(name, args)] = store.put(value)
+    return entries
+
+
+def bake(directory=ARTIFACT_DIR, jobs=None, force=False):
+    app = load_dashboard()
+    data_version = app.renders.data_version
+    store = ArtifactStore(directory, data_version, app.render_settings)
+    if store.load() and not store.mismatched_settings() and not force:
+        return store, False
+
+    entries = {
+        artifact_key('figure', ('category_bar',)): store.put(plain_figure(app.create_category_bar_plot())),
+        artifact_key('figure', ('continent_bar',)): store.put(plain_figure(app.update_stacked_barplot())),
+    }
+    years = list(app.geo_store.years) + [None]
+    # Forked workers share the imported app; elsewhere each worker imports it once
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=load_dashboard) as pool:
+        for year_entries in pool.map(bake_year, [directory] * len(years), [data_version] * len(years), years):
+            entries.update(year_entries)
+    store.write_manifest(entries)
+    return store, True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-render every map, word cloud and bar plot of the dashboard.")
+    parser.add_argument('--directory', default=ARTIFACT_DIR)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="render processes")
+    parser.add_argument('--force', action='store_true', help="bake even if the data version is already baked")
+    parser.add_argument('--prune', action='store_true', help="remove artifacts of other data versions")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store, baked = bake(args.directory, args.jobs, args.force)
+    if baked:
+        print(f"Baked {len(store.entries)} artifacts for data version {store.data_version} "
+              f"in {time.perf_counter() - start:.1f} s with {args.jobs} processes")
+    else:
+        print(f"Artifacts for data version {store.data_version} are up to date (--force to bake again)")
+    if args.prune:
+        print(f"Pruned {store.prune()} files")
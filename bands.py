@@ -0,0 +1,85 @@
+# Inflation bands: the one definition of the inflation categories.
+#
+# Each band has a name, a map color and the upper bound of its range of
+# rounded annual values (Value rounded to 1 decimal), and says whether that
+# bound belongs to it; the last band has no upper bound. InflationBands turns
+# whole arrays of values into band codes at once with np.digitize, and
+# describes the range of every band for the legend and the bar plot.
+# preprocess.py and the dashboard (category column, map colors, bar plots,
+# insights) both categorize through it.
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Bands whose range starts at or above this annual inflation (%) count as high inflation in the insights
+HIGH_INFLATION_BOUND = 10
+
+# (category, color, upper bound, bound included), in increasing order; the last band is open-ended
+DEFAULT_BANDS = [
+    ('Deflation', '#1f77b4', 0, False),             # Blue
+    ('Very Low Inflation', '#53b5a3', 2, False),    # Light bluegreen
+    ('Target Inflation', '#2ca02c', 3, True),       # Green
+    ('Low Inflation', '#98df8a', 4, True),          # Light green
+    ('Moderate Inflation', '#ffcc00', 10, True),    # Yellow
+    ('High Inflation', '#ff7f0e', 50, True),        # Orange
+    ('Very High Inflation', '#d62728', 100, True),  # Red
+    ('Hyperinflation', '#7F00FF', None, False),     # Violet
+]
+
+
+def _percent(bound):
+    return f"{bound:g}%"
+
+
+class InflationBands:
+    def __init__(self, bands=DEFAULT_BANDS):
+        self.bands = [tuple(band) for band in bands]
+        bounds = [bound for _, _, bound, _ in self.bands[:-1]]
+        if self.bands[-1][2] is not None or any(bound is None for bound in bounds):
+            raise ValueError("Every band but the last needs an upper bound")
+        if any(lower >= upper for lower, upper in zip(bounds, bounds[1:])):
+            raise ValueError(f"Band bounds must increase: {bounds}")
+
+        self.names = [name for name, _, _, _ in self.bands]
+        self.colors = {name: color for name, color, _, _ in self.bands}
+        self.bounds = bounds
+        # np.digitize moves a value to the next band once it reaches an edge, so a bound
+        # that belongs to its band moves up by one unit in the last place
+        self._edges = np.array([
+            np.nextafter(float(bound), np.inf) if included else float(bound)
+            for _, _, bound, included in self.bands[:-1]
+        ])
+        # Identifies the definition, e.g. in render cache keys
+        self.version = hashlib.sha1(json.dumps(self.bands).encode('utf-8')).hexdigest()[:8]
+
+    # The default bands with other upper bounds (one per band but the last)
+    @classmethod
+    def with_bounds(cls, bounds, bands=DEFAULT_BANDS):
+        if len(bounds) != len(bands) - 1:
+            raise ValueError(f"Expected {len(bands) - 1} bounds, got {len(bounds)}")
+        return cls([(name, color, bound, included) for (name, color, _, included), bound
+                    in zip(bands, list(bounds) + [None])])
+
+    # Band code (index into names) of every value; -1 where the value is missing
+    def codes(self, values):
+        values = np.asarray(values, dtype=float)
+        return np.where(np.isnan(values), -1, np.digitize(values, self._edges))
+
+    # Category of every value as a categorical in band order (missing values stay missing)
+    def categorize(self, values):
+        return pd.Categorical.from_codes(self.codes(values), categories=self.names)
+
+    # Names of the bands whose range starts at or above `bound` (the first band has no lower bound)
+    def from_bound(self, bound=HIGH_INFLATION_BOUND):
+        return [name for name, lower in zip(self.names[1:], self.bounds) if lower >= bound]
+
+    # Range of every band, e.g. 'Below 0%', '2% - 3%', 'Above 100%'
+    def ranges(self):
+        ranges = {self.names[0]: f"Below {_percent(self.bounds[0])}"}
+        for name, lower, upper in zip(self.names[1:-1], self.bounds, self.bounds[1:]):
+            ranges[name] = f"{_percent(lower)} - {_percent(upper)}"
+        ranges[self.names[-1]] = f"Above {_percent(self.bounds[-1])}"
+        return ranges
@@ -0,0 +1,88 @@
+# Baked artifacts against rendering on demand.
+#
+# Bakes the artifacts into a temporary directory (bake.py, --jobs processes),
+# then starts the dashboard in a fresh process per mode and requests every map
+# and word cloud state once, cold:
+#   off   renders each state (folium, wordcloud)
+#   read  reads each state from the artifacts (ARTIFACT_MODE=read)
+# and reports the bake time, the artifact size, and per mode the import time,
+# the time for all states, the slowest state and the peak RSS. Then it starts
+# the read mode with another WORDCLOUD_FORMAT than the bake's and checks that
+# the app refuses to start. Exits non-zero if it starts.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_bake.py [--jobs N]
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from dash_session import ROOT, load_dashboard
+
+
+# Child process: import the app in `mode` and request every state once
+def serve_all_states(mode, directory):
+    start = time.perf_counter()
+    dashboard = load_dashboard(ARTIFACT_MODE=mode, ARTIFACTS_DIR=directory, METRICS_ENABLED='0', RENDER_JOBS='0')
+    import_s = time.perf_counter() - start
+    slowest = 0
+    start = time.perf_counter()
+    for year in dashboard.geo_store.years + [None]:
+        for category in [None] + list(dashboard.category_colors):
+            state_start = time.perf_counter()
+            if year is not None:
+                dashboard.update_map(year, category)
+            dashboard.word_cloud_and_range(category, year)
+            slowest = max(slowest, time.perf_counter() - state_start)
+    return {
+        'import_s': import_s,
+        'states_s': time.perf_counter() - start,
+        'slowest_ms': slowest * 1000,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'renders': sum(dashboard.renders.misses.values()),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare baked artifacts with rendering on demand.")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--serve', nargs=2, metavar=('MODE', 'DIRECTORY'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        print(json.dumps(serve_all_states(*args.serve)))
+        sys.exit(0)
+
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, 'bake.py', '--directory', directory, '--jobs', str(args.jobs)],
+                                cwd=ROOT, check=True, capture_output=True, text=True)
+        bake_s = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(directory, 'objects', name))
+                   for name in os.listdir(os.path.join(directory, 'objects')))
+        print(result.stdout.strip())
+        print(f"bake: {bake_s:.1f} s with {args.jobs} processes, {size / 1e6:.1f} MB of artifacts\n")
+
+        print(f"{'mode':<6} {'import':>8} {'all states':>11} {'slowest':>9} {'renders':>8} {'peak RSS':>9}")
+        for mode in ('off', 'read'):
+            output = subprocess.run([sys.executable, __file__, '--serve', mode, directory],
+                                    cwd=ROOT, check=True, capture_output=True, text=True).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<6} {stats['import_s']:>6.2f} s {stats['states_s']:>9.2f} s {stats['slowest_ms']:>6.0f} ms"
+                  f" {stats['renders']:>8} {stats['max_rss_mb']:>6.0f} MB")
+
+        # Artifacts baked with this environment's word cloud format, app set to another one
+        other_format = 'palette' if os.environ.get('WORDCLOUD_FORMAT', 'png') != 'palette' else 'png'
+        mismatch = subprocess.run([sys.executable, __file__, '--serve', 'read', directory], cwd=ROOT,
+                                  env=dict(os.environ, WORDCLOUD_FORMAT=other_format), capture_output=True, text=True)
+        refused = mismatch.returncode != 0 and 'other render settings' in mismatch.stderr
+        print(f"\nread with WORDCLOUD_FORMAT={other_format}: {'refused to start' if refused else 'STARTED'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    sys.exit(0 if refused else 1)
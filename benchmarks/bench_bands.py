@@ -0,0 +1,113 @@
+# Inflation bands: re-banding the data against reloading the app.
+#
+# Checks that the default bands reproduce the categories of country_year_mean.csv,
+# and that after switching to other bounds the category column, the category and
+# continent bar counts and the map codes all agree with a plain comparison of the
+# rounded values against those bounds, and that bands with other colors are
+# rejected. Then times:
+#   - the vectorized re-band of every row (bands.categorize)
+#   - set_inflation_bands() to bounds whose figures are cached (re-band and re-aggregation)
+#   - set_inflation_bands() to new bounds (also builds both bar plots)
+#   - importing the app, i.e. what a restart with new bounds costs
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_bands.py [--repeat 20]
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dash_session import load_dashboard
+
+parser = argparse.ArgumentParser(description="Time re-banding the dashboard data.")
+parser.add_argument('--repeat', type=int, default=20)
+args = parser.parse_args()
+
+start = time.perf_counter()
+dashboard = load_dashboard(METRICS_ENABLED='0', RENDER_JOBS='0')
+import_ms = (time.perf_counter() - start) * 1000
+InflationBands = dashboard.InflationBands
+data = dashboard.country_year_mean
+OTHER_BOUNDS = [0, 1, 2, 3, 8, 40, 80]
+
+
+def timed(call, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+# Category of every value by comparing it with each bound in turn
+def reference_categories(values, bands):
+    categories = np.full(len(values), bands.names[-1], dtype=object)
+    for name, _, bound, included in reversed(bands.bands[:-1]):
+        categories[(values <= bound) if included else (values < bound)] = name
+    return categories
+
+
+def check(bands):
+    rounded = data['Value'].round(1).to_numpy()
+    expected = reference_categories(rounded, bands)
+    ok = (np.asarray(data['Inflation_Category'], dtype=object) == expected).all()
+    counts = pd.Series(expected).value_counts().reindex(bands.names, fill_value=0)
+    ok &= list(dashboard.category_bar_figure['data'][0]['y']) == counts.tolist()
+    continents = pd.crosstab(data['Region'], expected).reindex(columns=bands.names, fill_value=0)
+    ok &= (dashboard.continent_inflation_periods_counts.to_numpy() == continents.to_numpy()).all()
+    # Map codes of the last year, feature by feature
+    year = dashboard.geo_store.years[-1]
+    values = data[data['Year'] == year].set_index('Area Code (ISO3)')['Value'].round(1)
+    codes = dashboard.map_feature_codes[(year, None)]
+    for iso3, code in zip(dashboard.map_feature_iso3, codes):
+        value = values.get(iso3)
+        expected_code = dashboard.NO_DATA_CODE if value is None or np.isnan(value) else \
+            bands.names.index(reference_categories(np.array([value]), bands)[0])
+        ok &= code == expected_code
+    return bool(ok)
+
+
+csv_categories = pd.read_csv('country_year_mean.csv', usecols=['Inflation_Category'])['Inflation_Category']
+matches = (np.asarray(data['Inflation_Category'], dtype=object) == csv_categories.to_numpy()).all()
+print(f"Default bands reproduce the CSV categories: {matches}")
+matches &= check(dashboard.bands)
+
+default, other = InflationBands(), InflationBands.with_bounds(OTHER_BOUNDS)
+dashboard.set_inflation_bands(other)
+other_ok = check(other)
+print(f"Bounds {OTHER_BOUNDS} agree with plain comparisons: {other_ok}")
+matches &= other_ok
+
+# Colors are built into the legend and the map once: other colors need a restart
+recolored = InflationBands([(name, '#000000', bound, included) for name, _, bound, included in other.bands])
+try:
+    dashboard.set_inflation_bands(recolored)
+    rejected = False
+except ValueError:
+    rejected = dashboard.bands is other
+print(f"Bands with other colors rejected: {rejected}")
+matches &= rejected
+
+# Alternate between two band sets whose figures are now in the render cache
+state = {'bands': other}
+
+
+def switch():
+    state['bands'] = default if state['bands'] is other else other
+    dashboard.set_inflation_bands(state['bands'])
+
+
+categorize_ms = timed(lambda: dashboard.bands.categorize(data['Value'].round(1)), args.repeat * 10)
+switch_ms = timed(switch, args.repeat)
+cold_ms = timed(lambda: dashboard.set_inflation_bands(InflationBands.with_bounds(
+    [0, 2, 3, 4, 10, 50, 100 + np.random.random()])), max(1, args.repeat // 4))
+dashboard.set_inflation_bands(default)
+matches &= check(default)
+
+print(f"\n{len(data):,} rows, {len(dashboard.map_feature_codes):,} map states")
+print(f"{'re-band the category column':<44} {categorize_ms:>8.2f} ms")
+print(f"{'set_inflation_bands, figures cached':<44} {switch_ms:>8.2f} ms")
+print(f"{'set_inflation_bands, new bounds':<44} {cold_ms:>8.2f} ms")
+print(f"{'import the app (restart)':<44} {import_ms:>8.0f} ms")
+sys.exit(0 if matches else 1)
@@ -0,0 +1,61 @@
+# Country trend view: series lookup and callback cost by number of countries.
+#
+# For 1, 10, 50 and all countries it times:
+#   - the series lookup: a row slice of the country x year matrix, against
+#     filtering country_year_mean and pivoting the rows (the frame-based way)
+#   - the trend callback end to end through /_dash-update-component, and the
+#     size of its response
+# and checks that both lookups return the same values.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_country_series.py [--repeat 50]
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from dash_session import load_dashboard, update_component_payload
+
+parser = argparse.ArgumentParser(description="Time the country trend view by number of countries.")
+parser.add_argument('--repeat', type=int, default=50)
+args = parser.parse_args()
+
+dashboard = load_dashboard(METRICS_ENABLED='0')
+series = dashboard.country_series
+frame = dashboard.country_year_mean
+client = dashboard.server.test_client()
+
+
+def timed(call, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def frame_lookup(codes):
+    rows = frame[frame['Area Code (ISO3)'].isin(codes)]
+    table = rows.pivot_table(index='Area Code (ISO3)', columns='Year', values='Value', aggfunc='mean', observed=True)
+    return table.reindex(index=codes, columns=series.years).to_numpy(dtype=float)
+
+
+def callback(codes):
+    payload = update_component_payload(dashboard.app, 'trend-graph.figure', {'country-dropdown.value': codes},
+                                       ['country-dropdown.value'])
+    return client.post('/_dash-update-component', data=json.dumps(payload), content_type='application/json')
+
+
+matches = True
+print(f"{'countries':>9} {'matrix slice':>13} {'frame filter':>13} {'callback':>10} {'response':>10}")
+for count in (1, 10, 50, len(series.iso3)):
+    codes = series.iso3[:: max(1, len(series.iso3) // count)][:count]
+    slice_ms, (_, _, values) = timed(lambda: series.series(codes), args.repeat)
+    frame_ms, expected = timed(lambda: frame_lookup(codes), max(1, args.repeat // 10))
+    matches &= np.allclose(values, expected, equal_nan=True)
+    callback_ms, response = timed(lambda: callback(codes), max(1, args.repeat // 5))
+    print(f"{count:>9} {slice_ms:>10.3f} ms {frame_ms:>10.2f} ms {callback_ms:>7.2f} ms {len(response.data):>10,}")
+
+print(f"\nSame values from both lookups: {matches}")
+sys.exit(0 if matches else 1)
@@ -0,0 +1,64 @@
+# Cold-start time and memory of loading country_year_mean: plain CSV, typed CSV and
+# the memory-mapped binary cache. Every mode runs in a fresh process.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_data_loader.py
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ['csv', 'typed_csv', 'binary_cache']
+RUNS = 5
+
+
+def rss_kib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(mode):
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import pandas as pd
+    import data_loader
+
+    rss_before = rss_kib()
+    start = time.perf_counter()
+    if mode == 'csv':
+        data = pd.read_csv('country_year_mean.csv')
+    elif mode == 'typed_csv':
+        data = data_loader.load_country_year_mean(use_cache=False)
+    else:
+        data = data_loader.load_country_year_mean()
+    elapsed = time.perf_counter() - start
+    return {
+        'load_ms': elapsed * 1000,
+        'rss_delta_kib': rss_kib() - rss_before,
+        'frame_bytes': int(data.memory_usage(deep=True).sum()),
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+        sys.exit(0)
+
+    # Make sure the binary cache exists before timing it
+    subprocess.run([sys.executable, __file__, 'binary_cache'], check=True, capture_output=True)
+
+    print(f"{'mode':<14} {'load p50':>9} {'RSS delta':>10} {'frame size':>11}")
+    for mode in MODES:
+        runs = [
+            json.loads(subprocess.run([sys.executable, __file__, mode], check=True,
+                                      capture_output=True, text=True).stdout)
+            for _ in range(RUNS)
+        ]
+        load = sorted(run['load_ms'] for run in runs)[RUNS // 2]
+        rss = sorted(run['rss_delta_kib'] for run in runs)[RUNS // 2]
+        print(f"{mode:<14} {load:>6.1f} ms {rss:>6,} KiB {runs[0]['frame_bytes']:>11,}")
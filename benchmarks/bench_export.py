@@ -0,0 +1,103 @@
+# Export API: correctness of the filters and memory of full-table exports.
+#
+# Checks a set of filtered CSV and JSON exports from the dashboard against the
+# same filters applied to country_year_mean with pandas. Then it builds
+# synthetic tables of 10x, 40x and 160x the real one (the rows repeated with
+# shifted years) and exports each in full, streamed through the Flask test
+# client. For each size it reports the peak memory allocated during the export
+# (tracemalloc), against building the whole file at once with to_csv/to_json.
+# Exits non-zero if a filter check fails. tests/test_export_api.py asserts that
+# the streamed peak does not grow with the table.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_export.py [--chunk-rows 1000]
+import argparse
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+import flask
+import numpy as np
+import pandas as pd
+
+from dash_session import load_dashboard
+
+parser = argparse.ArgumentParser(description="Check the export API and measure its memory on large tables.")
+parser.add_argument('--chunk-rows', type=int, default=1000)
+args = parser.parse_args()
+
+dashboard = load_dashboard(METRICS_ENABLED='0', RENDER_JOBS='0')
+from data_index import YearCategoryIndex  # noqa: E402
+from export_api import DataExport, _export_frame  # noqa: E402
+
+client = dashboard.server.test_client()
+clean = dashboard.data_index.clean
+
+# (query string, pandas filter of the cleaned rows)
+QUERIES = [
+    ('', lambda d: d),
+    ('year=2020', lambda d: d[d['Year'] == 2020]),
+    ('year_from=2005&year_to=2009&category=Deflation', lambda d: d[d['Year'].between(2005, 2009)
+                                                                   & (d['Inflation_Category'] == 'Deflation')]),
+    ('category=High+Inflation,Hyperinflation&region=Africa',
+     lambda d: d[d['Inflation_Category'].isin(['High Inflation', 'Hyperinflation']) & (d['Region'] == 'Africa')]),
+    ('iso3=USA&iso3=DEU&year_from=2020', lambda d: d[d['Area Code (ISO3)'].isin(['USA', 'DEU']) & (d['Year'] >= 2020)]),
+    ('year=1990', lambda d: d[d['Year'] == 1990]),
+]
+
+matches = True
+for query, select in QUERIES:
+    expected = _export_frame(select(clean)).reset_index(drop=True)
+    csv = pd.read_csv(io.BytesIO(client.get(f'/api/export.csv?{query}').data), keep_default_na=False, na_values=[''])
+    rows = json.loads(client.get(f'/api/export.json?{query}').data)
+    ok = len(csv) == len(rows) == len(expected)
+    ok &= bool(np.allclose(csv['Value'].astype(float), expected['Value']))
+    ok &= list(csv['Area Code (ISO3)']) == [row['Area Code (ISO3)'] for row in rows] == list(expected['Area Code (ISO3)'])
+    ok &= [row['Value'] for row in rows] == expected['Value'].tolist()
+    print(f"{query or '(all rows)':<56} {len(expected):>6} rows  {'ok' if ok else 'MISMATCH'}")
+    matches &= ok
+
+
+# Table of `copies` times the real rows, each copy shifted by 30 years
+def synthetic_table(copies):
+    frames = [clean.assign(Year=clean['Year'] + 30 * copy) for copy in range(copies)]
+    return pd.concat(frames, ignore_index=True)
+
+
+# Peak allocation of a call, and its result size
+def peak_memory(call):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    size = call()
+    return tracemalloc.get_traced_memory()[1] - before, size, time.perf_counter() - start
+
+
+def streamed(export_client, fmt):
+    response = export_client.get(f'/api/export.{fmt}', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+print(f"\nFull-table exports, chunks of {args.chunk_rows:,} rows (peak memory allocated during the export)")
+print(f"{'rows':>10} {'format':>6} {'size':>9} {'streamed':>10} {'time':>8} {'built at once':>14}")
+tracemalloc.start()
+for copies in (10, 40, 160):
+    table = YearCategoryIndex(synthetic_table(copies))
+    export_app = flask.Flask(__name__)
+    DataExport(export_app, table, chunk_rows=args.chunk_rows)
+    export_client = export_app.test_client()
+    for fmt, build in (('csv', lambda: len(table.clean.to_csv(index=False))),
+                       ('json', lambda: len(json.dumps(table.clean.astype(object).to_dict(orient='records'))))):
+        stream_peak, size, seconds = peak_memory(lambda: streamed(export_client, fmt))
+        build_peak, _, _ = peak_memory(build)
+        print(f"{len(table.clean):>10,} {fmt:>6} {size / 1e6:>6.1f} MB {stream_peak / 1e6:>7.2f} MB "
+              f"{seconds:>6.2f} s {build_peak / 1e6:>11.1f} MB")
+    del table, export_app, export_client
+tracemalloc.stop()
+
+print(f"\nFilters match pandas: {matches}")
+sys.exit(0 if matches else 1)
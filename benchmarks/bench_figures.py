@@ -0,0 +1,86 @@
+# Figure build and serialization time per figure.
+#
+# For every plotly figure the dashboard sends (the two bar plots, the plotly
+# choropleth, the trend figure of every country and the bar view component) it times:
+#   build    building the figure through plotly (go.Figure / px) against the
+#            figure layer (figures.py): a prebuilt plain figure is a lookup, the
+#            choropleth a copy of its skeleton with the values of the year
+#   encode   encoding it in a callback response as Dash does (plotly's
+#            to_json_plotly), with the json and orjson engines, as a go.Figure
+#            and as plain figure data
+# and checks that both forms encode to the same JSON. Dash's encoder hands plain
+# data to orjson directly; a go.Figure or a component inside the response makes
+# it convert every value first.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_figures.py [--repeat 50]
+import argparse
+import json
+import sys
+import time
+
+from dash import dcc
+from plotly.io.json import to_json_plotly
+
+from dash_session import load_dashboard
+
+parser = argparse.ArgumentParser(description="Time building and serializing the dashboard's figures.")
+parser.add_argument('--repeat', type=int, default=50)
+args = parser.parse_args()
+
+dashboard = load_dashboard(METRICS_ENABLED='0', RENDER_JOBS='0')
+from figures import orjson  # noqa: E402
+
+ENGINES = ['json'] + (['orjson'] if orjson is not None else [])
+year = dashboard.geo_store.years[-1]
+all_countries = dashboard.country_series.iso3
+
+# name: (plotly build, figure layer build)
+FIGURES = {
+    'category bar': (dashboard.create_category_bar_plot, lambda: dashboard.category_bar_figure),
+    'continent bar': (dashboard.update_stacked_barplot, lambda: dashboard.continent_bar_figure),
+    'choropleth': (lambda: dashboard.build_choropleth_figure(year, None),
+                   lambda: dashboard.create_choropleth_map(year, None)),
+    'trend, all countries': (None, lambda: dashboard.create_trend_figure(all_countries)),
+    # The folium engine's bar view: the continent bar inside a dcc.Graph component
+    'bar view (dcc.Graph)': (lambda: dcc.Graph(figure=dashboard.update_stacked_barplot()),
+                             lambda: dcc.Graph(figure=dashboard.continent_bar_figure)),
+}
+
+
+def timed(call, repeat=args.repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+# A callback response carrying the figure, encoded as Dash encodes it
+def encode(figure, engine):
+    return to_json_plotly({'multi': True, 'response': {'graph': {'figure': figure}}}, engine=engine)
+
+
+def cell(value):
+    return f"{value:>8.2f} ms" if value is not None else f"{'-':>11}"
+
+
+header = f"{'figure':<22} {'size':>8} {'build go':>11} {'build layer':>11}"
+for engine in ENGINES:
+    header += f" {'go ' + engine:>11} {'plain ' + engine:>12}"
+print(header)
+
+same = True
+for name, (build_go, build_layer) in FIGURES.items():
+    go_ms, go_figure = timed(build_go, max(1, args.repeat // 5)) if build_go else (None, None)
+    layer_ms, plain = timed(build_layer)
+    row = f"{name:<22} {len(encode(plain, ENGINES[-1])) / 1000:>5.1f} KB {cell(go_ms)} {cell(layer_ms)}"
+    for engine in ENGINES:
+        go_encode_ms = timed(lambda: encode(go_figure, engine))[0] if go_figure is not None else None
+        plain_encode_ms, encoded = timed(lambda: encode(plain, engine))
+        row += f" {cell(go_encode_ms)} {plain_encode_ms:>9.2f} ms"
+        if go_figure is not None:
+            same &= json.loads(encode(go_figure, engine)) == json.loads(encoded)
+    print(row)
+
+print(f"\nplotly figure and plain figure data encode to the same JSON: {same}")
+sys.exit(0 if same else 1)
@@ -0,0 +1,117 @@
+# Bytes on the wire for a typical session.
+#
+# Replays a session through the Flask test client, with the requests the
+# browser would send:
+#   first visit: page, layout, dependencies, initial callbacks, map geometry
+#                (plotly engine), then year, category and view changes
+#   repeat visit: page load again, with the browser cache from the first visit
+# for each encoding the client may accept. The geometry is fetched on the
+# repeat visit only as a revalidation (If-None-Match -> 304); browsers that
+# honour `immutable` do not send even that. Response sizes are the bytes sent
+# (compressed where the server compressed them), without HTTP headers.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_http_session.py [--engine folium|plotly]
+import argparse
+import json
+import os
+import sys
+
+from dash_session import ROOT, fired_callbacks, load_dashboard, update_component_payload
+
+sys.path.insert(0, ROOT)
+from http_cache import available_encodings  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Measure the bytes on the wire of a typical dashboard session.")
+parser.add_argument('--engine', choices=['folium', 'plotly'], default='folium')
+args = parser.parse_args()
+
+dashboard = load_dashboard(MAP_ENGINE=args.engine, METRICS_ENABLED='0', HTTP_COMPRESSION='1')
+app = dashboard.app
+client = dashboard.server.test_client()
+
+INITIAL_STATE = {
+    'year-dropdown.value': dashboard.geo_store.years[-1],
+    'category-dropdown.value': None,
+    'period-dropdown.value': None,
+    'active-plot.data': 'map',
+    'btn-map.n_clicks': 0,
+    'btn-bar.n_clicks': 0,
+    'btn-playback.n_clicks': 0,
+    'btn-trend.n_clicks': 0,
+    'country-dropdown.value': dashboard.DEFAULT_TREND_COUNTRIES,
+}
+
+# Interactions of the first visit: (label, changed props and their new values)
+INTERACTIONS = [
+    ('change year', {'year-dropdown.value': 2022}),
+    ('change year', {'year-dropdown.value': 2021}),
+    ('change category', {'category-dropdown.value': 'High Inflation'}),
+    ('change year', {'year-dropdown.value': 2020}),
+    ('click btn-bar', {'btn-bar.n_clicks': 1, 'active-plot.data': 'bar'}),
+    ('click btn-map', {'btn-map.n_clicks': 1, 'active-plot.data': 'map'}),
+]
+
+
+class Session:
+    def __init__(self, accept_encoding):
+        self.headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+        self.etags = {}
+        self.bytes = {}
+
+    def count(self, phase, response):
+        self.bytes[phase] = self.bytes.get(phase, 0) + len(response.data)
+
+    def get(self, phase, path, revalidate=False):
+        headers = dict(self.headers)
+        if revalidate and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        response = client.get(path, headers=headers)
+        if 'ETag' in response.headers:
+            self.etags[path] = response.headers['ETag']
+        self.count(phase, response)
+        return response
+
+    def post(self, phase, output, values, changed):
+        payload = update_component_payload(app, output, values, changed)
+        response = client.post('/_dash-update-component', data=json.dumps(payload),
+                               content_type='application/json', headers=self.headers)
+        self.count(phase, response)
+
+    # Page, layout, dependencies, then the server callbacks the renderer fires on load
+    def page_load(self, phase, revalidate=False):
+        self.get(phase, '/')
+        self.get(phase, '/_dash-layout')
+        dependencies = json.loads(client.get('/_dash-dependencies').data)
+        self.get(phase, '/_dash-dependencies')
+        if args.engine == 'plotly':
+            self.get(phase, dashboard.choropleth_geojson_url, revalidate)
+        for spec in dependencies:
+            if spec.get('clientside_function') or spec.get('prevent_initial_call'):
+                continue
+            self.post(phase, spec['output'], INITIAL_STATE, [])
+
+    def run(self):
+        self.page_load('first visit: page load')
+        state = dict(INITIAL_STATE)
+        for _, changes in INTERACTIONS:
+            state.update(changes)
+            server, _ = fired_callbacks(app, list(changes))
+            for output in server:
+                self.post('first visit: interactions', output, state, list(changes))
+        self.page_load('repeat visit: page load', revalidate=True)
+        return self.bytes
+
+
+# Import folium and wordcloud, and fill the render cache, before measuring
+Session(None).run()
+
+encodings = [None] + list(available_encodings())
+results = {encoding or 'identity': Session(encoding).run() for encoding in encodings}
+phases = list(results['identity'])
+
+print(f"MAP_ENGINE={args.engine}, geometry: {os.path.basename(dashboard.map_geometry_file)}")
+print(f"{'phase':<28}" + ''.join(f"{label:>14}" for label in results))
+for phase in phases + ['total']:
+    row = [sum(result.values()) if phase == 'total' else result[phase] for result in results.values()]
+    print(f"{phase:<28}" + ''.join(f"{value:>14,}" for value in row))
@@ -0,0 +1,55 @@
+# Bytes sent to the browser per map interaction, for the folium and plotly map engines.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_map_payload.py
+import json
+import subprocess
+import sys
+
+from dash_session import load_dashboard, update_component_payload
+
+CATEGORIES = [None, 'Deflation', 'Target Inflation', 'High Inflation', 'Hyperinflation']
+
+
+# Replay every year change, then every category change, and sum the map response bytes
+def measure(engine):
+    dashboard = load_dashboard(MAP_ENGINE=engine)
+    app = dashboard.app
+    output = 'choropleth-map.figure' if engine == 'plotly' else 'plot-area.children'
+    values = {'year-dropdown.value': 2024, 'category-dropdown.value': None, 'active-plot.data': 'map'}
+
+    client = app.server.test_client()
+    layout_bytes = len(client.get('/_dash-layout').data)
+    interaction_bytes = []
+    changes = [('year-dropdown.value', year) for year in range(2001, 2025)]
+    changes += [('category-dropdown.value', category) for category in CATEGORIES]
+    for prop, value in changes:
+        values[prop] = value
+        payload = update_component_payload(app, output, values, [prop])
+        response = client.post('/_dash-update-component', json=payload)
+        assert response.status_code == 200, response.data[:200]
+        interaction_bytes.append(len(response.data))
+
+    return {
+        'layout_bytes': layout_bytes,
+        'interactions': len(interaction_bytes),
+        'mean_bytes_per_interaction': sum(interaction_bytes) / len(interaction_bytes),
+        'total_bytes': layout_bytes + sum(interaction_bytes),
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+        sys.exit(0)
+
+    # Each engine is configured at import time, so measure each in its own process
+    results = {}
+    for engine in ('folium', 'plotly'):
+        output = subprocess.run([sys.executable, __file__, engine], capture_output=True, text=True, check=True)
+        results[engine] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    print(f"{'engine':<8} {'layout':>12} {'per interaction':>16} {'session total':>14}")
+    for engine, result in results.items():
+        print(f"{engine:<8} {result['layout_bytes']:>12,} {result['mean_bytes_per_interaction']:>16,.0f} {result['total_bytes']:>14,}")
+    print(f"({results['folium']['interactions']} interactions: every year, then {len(CATEGORIES)} category changes)")
@@ -0,0 +1,76 @@
+# Micro-benchmark: per-render cost of the map style function, before and after
+# the precomputed fill color lookup.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_map_style.py
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import Visual_Food_Inflation_app as dashboard  # noqa: E402
+
+country_year_mean = dashboard.country_year_mean
+category_colors = dashboard.category_colors
+CATEGORIES = [None] + list(category_colors)
+YEARS = range(2001, 2025)
+REPEATS = 3
+
+
+# The style function as it was before: two boolean-mask scans per feature
+def legacy_style(filtered_data, feature):
+    return category_colors.get(
+        filtered_data.loc[
+            filtered_data['Area Code (ISO3)'] == feature['properties']['combined_iso_a3'],
+            'Inflation_Category'
+        ].values[0] if not filtered_data.loc[
+            filtered_data['Area Code (ISO3)'] == feature['properties']['combined_iso_a3']
+        ].empty else None, '#808080'
+    )
+
+
+def legacy_render(features, year, category):
+    filtered_data = country_year_mean[country_year_mean['Year'] == year]
+    if category:
+        filtered_data = filtered_data[filtered_data['Inflation_Category'] == category]
+    return [legacy_style(filtered_data, feature) for feature in features]
+
+
+def lookup_render(features, year, category):
+    fill_colors = dashboard.map_fill_colors.get((year, category), {})
+    return [fill_colors.get(feature['properties']['combined_iso_a3'], dashboard.DEFAULT_FILL_COLOR)
+            for feature in features]
+
+
+def time_per_render(render, features):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for year in YEARS:
+            for category in CATEGORIES:
+                render(features, year, category)
+    return (time.perf_counter() - start) / (REPEATS * len(YEARS) * len(CATEGORIES))
+
+
+if __name__ == '__main__':
+    features = dashboard.geo_store.feature_collection(2024)['features']
+
+    # Both implementations must color every feature identically
+    for year in YEARS:
+        for category in CATEGORIES:
+            assert legacy_render(features, year, category) == lookup_render(features, year, category), (year, category)
+
+    start = time.perf_counter()
+    feature_codes = dashboard.build_map_feature_codes(country_year_mean, dashboard.map_feature_iso3)
+    dashboard.build_map_fill_colors(feature_codes, dashboard.map_feature_iso3)
+    build_time = time.perf_counter() - start
+
+    legacy = time_per_render(legacy_render, features)
+    lookup = time_per_render(lookup_render, features)
+    print(f"features per render:          {len(features)}")
+    print(f"lookup table build (once):    {build_time * 1000:8.2f} ms")
+    print(f"style cost per render before: {legacy * 1000:8.2f} ms")
+    print(f"style cost per render after:  {lookup * 1000:8.2f} ms")
+    print(f"speedup:                      {legacy / lookup:8.0f}x")
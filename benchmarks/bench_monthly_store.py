@@ -0,0 +1,103 @@
+# Monthly store check and timing.
+#
+# Builds a synthetic monthly table from country_year_mean.csv. Each country's
+# annual value gets a seasonal swing that averages out over the year, so the
+# store's yearly means must match the annual data. Then it times:
+#   - period lookups (year, quarter, month, 12-month rolling) in the store,
+#     against the same aggregation by scanning a long-format frame
+#   - the map state (category codes and values) and the word cloud callback of
+#     the dashboard, loaded with that monthly file, for each granularity
+# Exits non-zero if the yearly means do not match the annual data.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_monthly_store.py [--repeat 200]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dash_session import ROOT, load_dashboard
+
+sys.path.insert(0, ROOT)
+from monthly_store import MonthlyStore, write_monthly_table  # noqa: E402
+
+
+def synthetic_monthly_table(annual):
+    table = annual.pivot(index='Area Code (ISO3)', columns='Year', values='Value')
+    swing = np.sin(2 * np.pi * np.arange(12) / 12)
+    columns = {}
+    for year in table.columns:
+        amplitude = 0.3 * table[year].abs() + 0.5
+        for month in range(12):
+            columns[f"{year}-{month + 1:02d}"] = table[year] + amplitude * swing[month]
+    return pd.DataFrame(columns, index=table.index)
+
+
+def timed(call, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check and time the monthly store.")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    annual = pd.read_csv(os.path.join(ROOT, 'country_year_mean.csv'), usecols=['Area Code (ISO3)', 'Year', 'Value'])
+    table = synthetic_monthly_table(annual)
+    monthly_file = os.path.join(tempfile.mkdtemp(), 'monthly.csv')
+    write_monthly_table(table, monthly_file)
+
+    start = time.perf_counter()
+    store = MonthlyStore.load(monthly_file)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"Store: {len(store.iso3)} countries x {store.matrices['month'].shape[1]} months, loaded in {load_ms:.0f} ms")
+
+    expected = annual.pivot(index='Area Code (ISO3)', columns='Year', values='Value').reindex(store.iso3)
+    matches = np.allclose(store.matrices['year'], expected.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+    print(f"Yearly means match the annual data: {matches}")
+
+    # Long-format frame: what the callbacks would scan without the store
+    long = table.stack().rename('Value').reset_index()
+    long.columns = ['Area Code (ISO3)', 'Period', 'Value']
+    long['Year'] = long['Period'].str[:4].astype(int)
+    long['Month'] = long['Period'].str[5:].astype(int)
+
+    print(f"\n{'lookup (one year)':<22} {'store':>10} {'long-format scan':>18}")
+    lookups = [
+        ('year', lambda: store.values(2020), lambda: long[long['Year'] == 2020].groupby('Area Code (ISO3)')['Value'].mean()),
+        ('quarter', lambda: store.values(2020, 'Q2'),
+         lambda: long[(long['Year'] == 2020) & long['Month'].between(4, 6)].groupby('Area Code (ISO3)')['Value'].mean()),
+        ('month', lambda: store.values(2020, 'M05'), lambda: long[(long['Year'] == 2020) & (long['Month'] == 5)]['Value']),
+        ('12-month rolling', lambda: store.rolling(12)[:, (2020 - store.first_year) * 12 + 4],
+         lambda: long.sort_values(['Area Code (ISO3)', 'Period']).groupby('Area Code (ISO3)')['Value']
+         .rolling(12, min_periods=1).mean()),
+    ]
+    for label, from_store, from_long in lookups:
+        print(f"{label:<22} {timed(from_store, args.repeat):>7.3f} ms {timed(from_long, max(1, args.repeat // 20)):>15.3f} ms")
+
+    dashboard = load_dashboard(MONTHLY_DATA_FILE=monthly_file, METRICS_ENABLED='0')
+    # Import folium and wordcloud before timing
+    dashboard.render_map_html.uncached(2019, None)
+    dashboard.update_category_graph_top_years_and_range(None, 2019)
+
+    print(f"\n{'granularity':<22} {'map state':>10} {'word cloud cb':>14} {'folium map':>11}")
+    for label, period in [('year (annual data)', None), ('quarter', 'Q2'), ('month', 'M05')]:
+        state_ms = timed(lambda: (dashboard.map_state_codes(2020, None, period),
+                                  dashboard.map_state_values(2020, period)), args.repeat)
+        dashboard.cache.clear()
+        start = time.perf_counter()
+        dashboard.update_category_graph_top_years_and_range(None, 2020, period)
+        cloud_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        dashboard.render_map_html.uncached(2020, None, period)
+        map_ms = (time.perf_counter() - start) * 1000
+        print(f"{label:<22} {state_ms:>7.3f} ms {cloud_ms:>11.0f} ms {map_ms:>8.0f} ms")
+
+    sys.exit(0 if matches else 1)
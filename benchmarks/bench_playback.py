@@ -0,0 +1,70 @@
+# Year playback against stepping through the years with the dropdown.
+#
+# Stepping through the years with the year dropdown sends every server
+# callback that takes the year as input, once per year. Playback sends one
+# request for the frames of every year, then redraws the map in the browser.
+# For both, this replays the server requests through the Flask test client and
+# reports the requests, the response bytes and the server CPU time
+# (process time spent in the requests). The dropdown runs twice: with a cold
+# render cache, and again with every year cached.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_playback.py [--engine folium|plotly]
+import argparse
+import json
+import time
+
+from dash_session import load_dashboard, triggered_outputs, update_component_payload
+
+parser = argparse.ArgumentParser(description="Compare year playback with year dropdown changes.")
+parser.add_argument('--engine', choices=['folium', 'plotly'], default='folium')
+args = parser.parse_args()
+
+dashboard = load_dashboard(MAP_ENGINE=args.engine, METRICS_ENABLED='0')
+app = dashboard.app
+client = dashboard.server.test_client()
+years = dashboard.geo_store.years
+
+
+# Send the server callbacks for `requests` ([(output, values, changed)]): (requests, bytes, CPU ms)
+def replay(requests):
+    response_bytes = 0
+    start = time.process_time()
+    for output, values, changed in requests:
+        payload = update_component_payload(app, output, values, changed)
+        response = client.post('/_dash-update-component', data=json.dumps(payload),
+                               content_type='application/json')
+        response_bytes += len(response.data)
+    return len(requests), response_bytes, (time.process_time() - start) * 1000
+
+
+def dropdown_requests():
+    requests = []
+    for year in years:
+        values = {'year-dropdown.value': year, 'active-plot.data': 'map'}
+        requests.extend((output, values, ['year-dropdown.value'])
+                        for output in triggered_outputs(app, ['year-dropdown.value']))
+    return requests
+
+
+def playback_requests():
+    changed = ['btn-playback.n_clicks', 'active-plot.data']
+    values = {'btn-playback.n_clicks': 1, 'active-plot.data': 'playback'}
+    return [(output, values, changed) for output in triggered_outputs(app, changed)]
+
+
+# Import folium and wordcloud before timing
+dashboard.render_map_html.uncached(years[0], None)
+dashboard.update_category_graph_top_years_and_range(None, years[0])
+
+dashboard.cache.clear()
+results = [
+    (f'dropdown x{len(years)}, cold cache', replay(dropdown_requests())),
+    (f'dropdown x{len(years)}, warm cache', replay(dropdown_requests())),
+    (f'playback, {len(years)} years', replay(playback_requests())),
+]
+
+print(f"MAP_ENGINE={args.engine}")
+print(f"{'':<26} {'requests':>9} {'response bytes':>15} {'server CPU':>11}")
+for label, (count, response_bytes, cpu_ms) in results:
+    print(f"{label:<26} {count:>9} {response_bytes:>15,} {cpu_ms:>8.0f} ms")
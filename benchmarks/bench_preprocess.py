@@ -0,0 +1,122 @@
+# Preprocessing pipeline check and timing.
+#
+# Builds a synthetic monthly FAOSTAT download from country_year_mean.csv: twelve
+# monthly rows per country and year, whose mean is the annual value, mixed with
+# rows of another item that the pipeline must skip. Then it runs preprocess.py
+# in a temporary directory:
+#   1. cold run: every year computed; outputs must match the repository's files
+#   2. rerun on the same file: nothing recomputed, nothing written
+#   3. 2025 appended: only 2025 recomputed
+#   4. one 2010 value edited: only 2010 recomputed
+# Exits non-zero if an output or a recomputed year set is not as expected.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_preprocess.py [--chunksize 50000]
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dash_session import ROOT
+
+sys.path.insert(0, ROOT)
+import preprocess  # noqa: E402
+from geo_store import GEOMETRY_FILE, VALUES_FILE, read_values_table  # noqa: E402
+
+
+# FAOSTAT-style monthly rows for the annual rows of `annual`
+def monthly_rows(annual):
+    annual = annual.reset_index(drop=True)
+    rows = annual.loc[annual.index.repeat(len(preprocess.MONTHS)), ['Area Code (ISO3)', 'Area', 'Year', 'Value']]
+    rows.insert(2, 'Item', preprocess.ITEM)
+    rows.insert(3, 'Months', preprocess.MONTHS * len(annual))
+    other = rows.assign(Item='Consumer Prices, General Indices (2015 = 100)', Value=rows['Value'] + 100)
+    return pd.concat([rows, other]).sort_values(['Area', 'Item', 'Year'], kind='stable')
+
+
+def write_raw(path, annual):
+    monthly_rows(annual).to_csv(path, index=False)
+
+
+def timed_run(raw_path, workdir, chunksize):
+    start = time.perf_counter()
+    result = preprocess.run(
+        raw_path,
+        csv_file=os.path.join(workdir, 'country_year_mean.csv'),
+        values_file=os.path.join(workdir, 'values.csv'),
+        monthly_file=os.path.join(workdir, 'monthly.csv'),
+        countries_file=os.path.join(ROOT, preprocess.COUNTRIES_FILE),
+        geometry_file=os.path.join(ROOT, GEOMETRY_FILE),
+        state_dir=os.path.join(workdir, 'state'),
+        chunksize=chunksize,
+    )
+    return result, time.perf_counter() - start
+
+
+def compare_outputs(workdir):
+    problems = []
+    expected = pd.read_csv(os.path.join(ROOT, preprocess.CSV_FILE),
+                           usecols=lambda column: not column.startswith('Unnamed'))
+    actual = pd.read_csv(os.path.join(workdir, 'country_year_mean.csv'))
+    if list(actual.columns) != list(expected.columns) or len(actual) != len(expected):
+        return ["country_year_mean.csv: columns or row count differ"]
+    for column in expected.columns:
+        if column == 'Value':
+            if not np.allclose(actual[column], expected[column], rtol=1e-12, atol=0):
+                problems.append("country_year_mean.csv: Value differs")
+        elif not actual[column].equals(expected[column]):
+            problems.append(f"country_year_mean.csv: {column} differs")
+
+    expected_values = read_values_table(os.path.join(ROOT, VALUES_FILE))
+    actual_values = read_values_table(os.path.join(workdir, 'values.csv'))
+    if not np.allclose(actual_values, expected_values, rtol=1e-12, atol=0, equal_nan=True):
+        problems.append("values.csv differs")
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check and time the incremental preprocessing pipeline.")
+    parser.add_argument('--chunksize', type=int, default=preprocess.DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    annual = pd.read_csv(os.path.join(ROOT, preprocess.CSV_FILE), usecols=['Area Code (ISO3)', 'Area', 'Year', 'Value'])
+    workdir = tempfile.mkdtemp()
+    problems = []
+    try:
+        raw_path = os.path.join(workdir, 'faostat_monthly.csv')
+        write_raw(raw_path, annual)
+        print(f"Synthetic FAOSTAT file: {os.path.getsize(raw_path) / 1e6:.1f} MB, "
+              f"{len(annual) * len(preprocess.MONTHS) * 2:,} rows, chunks of {args.chunksize:,}")
+
+        latest = annual[annual['Year'] == annual['Year'].max()]
+        edited = annual.copy()
+        edited.loc[edited['Year'] == 2010, 'Value'] += 0.5
+        steps = [
+            ('cold run', annual, None),
+            ('rerun, same data', annual, []),
+            ('2025 appended', pd.concat([annual, latest.assign(Year=2025, Value=latest['Value'] + 1)]), [2025]),
+            ('2010 edited', pd.concat([edited, latest.assign(Year=2025, Value=latest['Value'] + 1)]), [2010]),
+        ]
+        print(f"{'step':<18} {'time':>8}  recomputed years / written files")
+        for label, data, expected_years in steps:
+            write_raw(raw_path, data)
+            result, elapsed = timed_run(raw_path, workdir, args.chunksize)
+            recomputed = result['changed_years']
+            summary = f"{len(recomputed)} years" if len(recomputed) > 3 else (', '.join(map(str, recomputed)) or '-')
+            written = ', '.join(os.path.basename(path) for path in result['written']) or '-'
+            print(f"{label:<18} {elapsed:>6.2f} s  {summary} / {written}")
+            if expected_years is not None and recomputed != expected_years:
+                problems.append(f"{label}: recomputed {recomputed}, expected {expected_years}")
+            if label == 'cold run':
+                problems.extend(compare_outputs(workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for problem in problems:
+        print(f"PROBLEM {problem}")
+    sys.exit(1 if problems else 0)
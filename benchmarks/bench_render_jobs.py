@@ -0,0 +1,165 @@
+# Scrubbing through the years, with and without render jobs.
+#
+# One browser session changes the year dropdown through every year, one change
+# every --interval ms. Each change sends the map and the word cloud requests
+# in parallel, as the Dash renderer does. With a cold render cache it reports,
+# for renders in the request threads (RENDER_JOBS=0) and for render jobs with
+# superseded jobs dropped:
+#   - renders actually run (render cache misses)
+#   - responses with an update (200) and without (204, superseded)
+#   - time from the first change until the last year's map and word cloud arrive
+#   - server CPU time
+# and then the job stats served at /jobs-stats.
+#
+# It then replays the same scrub over HTTP against gunicorn (gunicorn.conf.py,
+# --gunicorn-workers workers, the shared sqlite render cache in a fresh
+# directory) with 1 and 4 threads per worker, and reports the responses with
+# and without an update. Requests of the session land on any worker; the
+# shared generation store lets them supersede each other across workers.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_render_jobs.py [--interval 50] [--workers 2] [--gunicorn-workers 2]
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from dash_session import ROOT, fired_callbacks, load_dashboard, update_component_payload
+
+sys.path.insert(0, ROOT)
+from render_jobs import RenderJobs  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Scrub through the years with and without render jobs.")
+parser.add_argument('--interval', type=float, default=50, help="milliseconds between two year changes")
+parser.add_argument('--workers', type=int, default=2)
+parser.add_argument('--gunicorn-workers', type=int, default=2, help="gunicorn workers (0 skips the gunicorn run)")
+args = parser.parse_args()
+
+dashboard = load_dashboard(MAP_ENGINE='folium', METRICS_ENABLED='0')
+app = dashboard.app
+server_outputs, _ = fired_callbacks(app, ['year-dropdown.value'])
+years = list(reversed(dashboard.geo_store.years))
+
+
+def payload(year, output):
+    values = {'year-dropdown.value': year, 'active-plot.data': 'map', 'session-id.data': 'bench-session'}
+    return update_component_payload(app, output, values, ['year-dropdown.value'])
+
+
+def request(year, output, results):
+    client = dashboard.server.test_client()
+    response = client.post('/_dash-update-component', data=json.dumps(payload(year, output)),
+                           content_type='application/json')
+    results.append((year, response.status_code, time.perf_counter()))
+
+
+# Send every year change, one every --interval ms, each as parallel requests of send(year, output, results)
+def send_scrub(send):
+    results, threads = [], []
+    start = time.perf_counter()
+    for year in years:
+        for output in server_outputs:
+            thread = threading.Thread(target=send, args=(year, output, results))
+            thread.start()
+            threads.append(thread)
+        time.sleep(args.interval / 1000)
+    for thread in threads:
+        thread.join()
+    return results, start
+
+
+def scrub(render_jobs):
+    dashboard.render_jobs = render_jobs
+    dashboard.cache.clear()
+    misses = sum(dashboard.renders.misses.values())
+    cpu = time.process_time()
+    results, start = send_scrub(request)
+    return (
+        sum(dashboard.renders.misses.values()) - misses,
+        sum(status == 200 for _, status, _ in results),
+        sum(status == 204 for _, status, _ in results),
+        max(finished for year, _, finished in results if year == years[-1]) - start,
+        time.process_time() - cpu,
+    )
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def post(base, year, output, results):
+    request = urllib.request.Request(base + '/_dash-update-component', data=json.dumps(payload(year, output)).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    results.append((year, status, time.perf_counter()))
+
+
+# The scrub over HTTP against gunicorn with a cold shared render cache
+def scrub_gunicorn(workers, threads):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads),
+                   GUNICORN_BIND=f'127.0.0.1:{port}', RENDER_CACHE_BACKEND='sqlite', RENDER_CACHE_DIR=cache_dir,
+                   RENDER_JOBS=str(args.workers), WARM_RENDER_CACHE='0')
+        master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                   'Visual_Food_Inflation_app:server'],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f'http://127.0.0.1:{port}'
+            deadline = time.time() + 180
+            while True:
+                try:
+                    urllib.request.urlopen(base + '/', timeout=10).read()
+                    break
+                except OSError:
+                    if time.time() > deadline or master.poll() is not None:
+                        raise RuntimeError("gunicorn did not start")
+                    time.sleep(0.2)
+            results, start = send_scrub(lambda year, output, results: post(base, year, output, results))
+        finally:
+            master.terminate()
+            master.wait()
+    return (
+        sum(status == 200 for _, status, _ in results),
+        sum(status == 204 for _, status, _ in results),
+        sum(status >= 400 for _, status, _ in results),
+        max(finished for year, _, finished in results if year == years[-1]) - start,
+    )
+
+
+# Import folium and wordcloud before timing
+dashboard.render_map_html.uncached(years[0], None)
+dashboard.word_cloud_and_range(None, years[0])
+
+jobs = RenderJobs(args.workers)
+runs = [('request threads', scrub(None)), (f'render jobs ({args.workers} workers)', scrub(jobs))]
+
+print(f"{len(years)} year changes, one every {args.interval:.0f} ms, {len(server_outputs)} requests each")
+print(f"{'':<26} {'renders':>8} {'updated':>8} {'superseded':>11} {'last result':>12} {'server CPU':>11}")
+for label, (renders, updated, superseded, last, cpu) in runs:
+    print(f"{label:<26} {renders:>8} {updated:>8} {superseded:>11} {last:>10.1f} s {cpu:>9.1f} s")
+print(f"\n/jobs-stats: {json.dumps(jobs.stats())}")
+
+if args.gunicorn_workers:
+    print(f"\ngunicorn, {args.gunicorn_workers} workers, shared sqlite render cache and generations, over HTTP")
+    print(f"{'threads per worker':<26} {'updated':>8} {'superseded':>11} {'errors':>7} {'last result':>12}")
+    failed = False
+    for threads in (1, 4):
+        updated, superseded, errors, last = scrub_gunicorn(args.gunicorn_workers, threads)
+        print(f"{threads:<26} {updated:>8} {superseded:>11} {errors:>7} {last:>10.1f} s")
+        failed |= errors > 0 or (threads > 1 and superseded == 0)
+    sys.exit(1 if failed else 0)
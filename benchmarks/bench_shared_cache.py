@@ -0,0 +1,161 @@
+# Multi-process throughput of the render cache backends.
+#
+# Starts several processes (each with a few threads, like gunicorn workers with
+# threads) that all request the same keys at the same moment through a
+# RenderCache. Every render is slow and logged, and it reports the renders and
+# the wall time per backend:
+#   memory  every process renders every key itself
+#   sqlite  each key is rendered once, however many processes miss it
+# With sqlite it then has every process read the cached keys for --hit-seconds,
+# with the access time touched on every hit and only once a minute (the default),
+# and reports the hits per second and the rows each process wrote. The single
+# flight and lock recovery guarantees are tested in tests/test_render_cache.py.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_shared_cache.py [--processes 8] [--threads 2] [--keys 12]
+#                                           [--backends memory sqlite [redis]] [--hit-seconds 3]
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import flask
+from flask_caching import Cache
+
+from dash_session import ROOT
+
+sys.path.insert(0, ROOT)
+from render_cache import RenderCache, SQLiteCache, configure_backend  # noqa: E402
+
+RENDER_SECONDS = 0.2
+
+
+def make_renders(backend, directory, redis_url):
+    config, locks = configure_backend(backend, 256, directory, redis_url)
+    cache = Cache(flask.Flask(__name__), config=dict(config, CACHE_DEFAULT_TIMEOUT=300))
+    return RenderCache(cache, 'bench', locks=locks)
+
+
+# Slow render that appends one line per render to the shared log
+def slow_render(log_path, key, crash=False):
+    def render():
+        with open(log_path, 'a') as log:
+            log.write(f"{os.getpid()} {key}\n")
+        if crash:
+            os._exit(1)  # Die while holding the lock
+        time.sleep(RENDER_SECONDS)
+        return f"rendered {key}"
+    return render
+
+
+def worker(backend, directory, redis_url, log_path, keys, threads, start):
+    renders = make_renders(backend, directory, redis_url)
+    start.wait()
+    errors = []
+
+    def request_all(offset):
+        # Different threads walk the keys in a different order
+        for key in keys[offset:] + keys[:offset]:
+            if renders.get_or_render('map', (key,), slow_render(log_path, key)) != f"rendered {key}":
+                errors.append(key)
+
+    pool = [threading.Thread(target=request_all, args=(index * 3,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    sys.exit(1 if errors else 0)
+
+
+def read_log(log_path):
+    with open(log_path) as log:
+        return Counter(line.split()[1] for line in log if line.strip())
+
+
+def run_concurrent(backend, redis_url, processes, threads, keys):
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'renders.log')
+        open(log_path, 'w').close()
+        if backend == 'redis':
+            make_renders(backend, directory, redis_url).cache.clear()
+        start = multiprocessing.Event()
+        pool = [multiprocessing.Process(target=worker, args=(backend, directory, redis_url, log_path,
+                                                             keys, threads, start))
+                for _ in range(processes)]
+        for process in pool:
+            process.start()
+        began = time.perf_counter()
+        start.set()
+        for process in pool:
+            process.join()
+        elapsed = time.perf_counter() - began
+        renders = read_log(log_path)
+        failed = sum(process.exitcode != 0 for process in pool)
+        return renders, elapsed, failed
+
+
+# Read every key in a loop until the deadline; report the hits and the rows this process wrote
+def read_hits(path, keys, touch_interval, deadline, results):
+    cache = SQLiteCache(path, touch_interval=touch_interval)
+    db = cache._connection()
+    written = db.total_changes
+    hits = 0
+    while time.time() < deadline:
+        for key in keys:
+            hits += cache.get(key) is not None
+    results.put((hits, db.total_changes - written))
+
+
+def run_hits(processes, keys, touch_interval, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'renders.sqlite3')
+        cache = SQLiteCache(path)
+        for key in keys:
+            cache.set(key, f"rendered {key}" * 1000, timeout=0)
+        # Entries last read long ago, as in a cache that has served for a while
+        cache._connection().execute('UPDATE entries SET accessed = accessed - 3600')
+        results = multiprocessing.Queue()
+        deadline = time.time() + seconds
+        pool = [multiprocessing.Process(target=read_hits, args=(path, keys, touch_interval, deadline, results))
+                for _ in range(processes)]
+        for process in pool:
+            process.start()
+        counts = [results.get() for _ in pool]
+        for process in pool:
+            process.join()
+        hits = sum(count for count, _ in counts)
+        return hits / seconds, max(writes for _, writes in counts)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the render cache backends across processes.")
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=2, help="threads per process")
+    parser.add_argument('--keys', type=int, default=12, help="distinct keys requested by every thread")
+    parser.add_argument('--backends', nargs='+', default=['memory', 'sqlite'],
+                        choices=['memory', 'sqlite', 'redis'])
+    parser.add_argument('--hit-seconds', type=float, default=3, help="seconds of the sqlite hit phase")
+    parser.add_argument('--redis-url', default=os.environ.get('RENDER_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    args = parser.parse_args()
+    multiprocessing.set_start_method('fork')
+
+    keys = [f"key-{index}" for index in range(args.keys)]
+    requests = args.processes * args.threads * args.keys
+    print(f"{args.processes} processes x {args.threads} threads, {args.keys} keys, "
+          f"{requests} requests, {RENDER_SECONDS * 1000:.0f} ms per render")
+    print(f"{'backend':<8} {'renders':>8} {'per key':>8} {'wall':>8}")
+    for backend in args.backends:
+        renders, elapsed, _ = run_concurrent(backend, args.redis_url, args.processes, args.threads, keys)
+        per_key = f"{min(renders.values())}-{max(renders.values())}"
+        print(f"{backend:<8} {sum(renders.values()):>8} {per_key:>8} {elapsed:>6.2f} s")
+
+    if 'sqlite' in args.backends:
+        print(f"\nsqlite hits, {args.processes} processes reading the {args.keys} keys for {args.hit_seconds:.0f} s")
+        print(f"{'access time touched':<28} {'hits/s':>9} {'rows written per process':>25}")
+        for label, interval in (('on every hit', -1), ('once a minute (default)', 60)):
+            rate, writes = run_hits(args.processes, keys, interval, args.hit_seconds)
+            print(f"{label:<28} {rate:>9,.0f} {writes:>25,}")
@@ -0,0 +1,166 @@
+# Startup cost of the app: import time and memory.
+#
+# 1. Imports the app in fresh interpreters with LAZY_IMPORTS=1 and 0 and reports
+#    the import time, the RSS after import, whether folium/wordcloud/matplotlib
+#    were loaded, and the first map render and word cloud (where lazy imports
+#    pay their deferred cost).
+# 2. Starts gunicorn with and without --preload, sends a few requests, and
+#    reports RSS, PSS (shared pages split between the processes sharing them)
+#    and private memory for the master and every worker. Linux only (reads
+#    /proc/<pid>/smaps_rollup).
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_startup.py [--runs 3] [--workers 4] [--skip-gunicorn]
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from dash_session import ROOT, load_dashboard, update_component_payload
+
+HEAVY_MODULES = ['folium', 'wordcloud', 'matplotlib']
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import Visual_Food_Inflation_app as dashboard
+imported = time.perf_counter() - start
+rss = int(next(line.split()[1] for line in open('/proc/self/status') if line.startswith('VmRSS:')))
+loaded = {{name: name in sys.modules for name in {HEAVY_MODULES!r}}}
+start = time.perf_counter()
+dashboard.render_map_html.uncached(2020, None)
+first_map = time.perf_counter() - start
+start = time.perf_counter()
+dashboard.word_clouds.render({{'France': 3.0, 'Spain': 2.0}})
+first_word_cloud = time.perf_counter() - start
+print(json.dumps({{'import_s': imported, 'rss_kib': rss, 'loaded': loaded,
+                  'first_map_s': first_map, 'first_word_cloud_s': first_word_cloud}}))
+"""
+
+
+def probe_import(lazy):
+    env = dict(os.environ, LAZY_IMPORTS='1' if lazy else '0', MAP_ENGINE='folium', WARM_RENDER_CACHE='0')
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report_imports(runs):
+    print(f"{'LAZY_IMPORTS':<13} {'import':>9} {'RSS':>10} {'first map':>10} {'first cloud':>12}  heavy modules loaded")
+    for lazy in (True, False):
+        probes = [probe_import(lazy) for _ in range(runs)]
+        loaded = [name for name, flag in probes[0]['loaded'].items() if flag]
+        print(f"{'1' if lazy else '0':<13}"
+              f" {statistics.median(p['import_s'] for p in probes):>7.2f} s"
+              f" {statistics.median(p['rss_kib'] for p in probes) / 1024:>6.0f} MiB"
+              f" {statistics.median(p['first_map_s'] for p in probes) * 1000:>7.0f} ms"
+              f" {statistics.median(p['first_word_cloud_s'] for p in probes) * 1000:>9.0f} ms"
+              f"  {', '.join(loaded) or '-'}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# Memory of a process from smaps_rollup, in KiB
+def memory(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def request(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    headers = {'Content-Type': 'application/json'} if payload is not None else {}
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=60) as response:
+        return response.read()
+
+
+WORD_CLOUD_OUTPUT = '..wordcloud-graph.src...inflation-range.children..'
+
+
+# A word cloud callback request, as the browser sends it when the year changes; built from the
+# app's callback map so it follows the callback's current inputs and state
+def word_cloud_payload(app, year):
+    values = {'year-dropdown.value': year, 'category-dropdown.value': None,
+              'period-dropdown.value': None, 'session-id.data': 'bench-startup'}
+    return update_component_payload(app, WORD_CLOUD_OUTPUT, values, ['year-dropdown.value'])
+
+
+def measure_gunicorn(app, preload, workers):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0', GUNICORN_WORKERS=str(workers),
+               GUNICORN_BIND=f'127.0.0.1:{port}', MAP_ENGINE='folium', WARM_RENDER_CACHE='0')
+    env.pop('LAZY_IMPORTS', None)
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                               'Visual_Food_Inflation_app:server'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f'http://127.0.0.1:{port}'
+        deadline = time.time() + 120
+        while True:
+            try:
+                request(base + '/')
+                break
+            except OSError:
+                if time.time() > deadline or master.poll() is not None:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.2)
+        # Wait until every worker has booted, then let each of them serve some requests
+        while len(children(master.pid)) < workers:
+            time.sleep(0.2)
+        time.sleep(2)
+        for year in range(2001, 2025):
+            request(base + '/_dash-layout')
+            request(base + '/_dash-update-component', word_cloud_payload(app, year))
+        return memory(master.pid), [memory(pid) for pid in children(master.pid)]
+    finally:
+        master.terminate()
+        master.wait()
+
+
+def report_gunicorn(workers):
+    # The app's callback map, for the request payloads (imported here, not in the gunicorn processes)
+    app = load_dashboard().app
+    print(f"\ngunicorn, {workers} workers (MiB)")
+    print(f"{'mode':<11} {'process':<9} {'RSS':>7} {'PSS':>7} {'private':>8}")
+    for preload in (False, True):
+        mode = 'preload' if preload else 'no preload'
+        master, worker_memory = measure_gunicorn(app, preload, workers)
+        print(f"{mode:<11} {'master':<9} {master['rss'] / 1024:>7.0f} {master['pss'] / 1024:>7.0f} {master['private'] / 1024:>8.0f}")
+        for index, usage in enumerate(worker_memory):
+            print(f"{'':<11} {f'worker {index + 1}':<9} {usage['rss'] / 1024:>7.0f} {usage['pss'] / 1024:>7.0f} {usage['private'] / 1024:>8.0f}")
+        total_pss = master['pss'] + sum(usage['pss'] for usage in worker_memory)
+        print(f"{'':<11} {'total PSS':<9} {'':>7} {total_pss / 1024:>7.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report the app's import time and per-worker memory.")
+    parser.add_argument('--runs', type=int, default=3, help="imports per mode (the median is reported)")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--skip-gunicorn', action='store_true', help="only report the import time")
+    args = parser.parse_args()
+
+    report_imports(args.runs)
+    if not args.skip_gunicorn:
+        report_gunicorn(args.workers)
@@ -0,0 +1,59 @@
+# Server requests per interaction.
+#
+# Follows the callback graph the way the Dash renderer does: a changed prop fires
+# every callback that takes it as input, and the outputs of those callbacks fire
+# the next ones. Server callbacks cost one /_dash-update-component request each;
+# clientside callbacks run in the browser. Every server request is then replayed
+# through the Flask test client to measure the bytes it sends back.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_ui_requests.py [--engine folium|plotly]
+import argparse
+import json
+
+from dash_session import fired_callbacks, load_dashboard, update_component_payload
+
+parser = argparse.ArgumentParser(description="Count the server requests of each dashboard interaction.")
+parser.add_argument('--engine', choices=['folium', 'plotly'], default='folium')
+args = parser.parse_args()
+
+dashboard = load_dashboard(MAP_ENGINE=args.engine, METRICS_ENABLED='0')
+app = dashboard.app
+client = dashboard.server.test_client()
+
+# Interactions: label -> props the user changes
+INTERACTIONS = {
+    'click btn-bar': ['btn-bar.n_clicks'],
+    'click btn-map': ['btn-map.n_clicks'],
+    'click btn-playback': ['btn-playback.n_clicks'],
+    'click btn-trend': ['btn-trend.n_clicks'],
+    'change year': ['year-dropdown.value'],
+    'change category': ['category-dropdown.value'],
+    'change countries': ['country-dropdown.value'],
+}
+
+STATE = {
+    'year-dropdown.value': 2020,
+    'category-dropdown.value': 'High Inflation',
+    'active-plot.data': 'map',
+    'btn-map.n_clicks': 1,
+    'btn-bar.n_clicks': 1,
+    'btn-playback.n_clicks': 1,
+    'btn-trend.n_clicks': 1,
+    'country-dropdown.value': ['USA', 'DEU', 'IND', 'BRA', 'FRA'],
+}
+
+
+print(f"MAP_ENGINE={args.engine}")
+print(f"{'interaction':<18} {'server requests':>16} {'clientside':>11} {'response bytes':>15}")
+for label, props in INTERACTIONS.items():
+    server, clientside = fired_callbacks(app, props)
+    response_bytes = 0
+    for output in server:
+        payload = update_component_payload(app, output, STATE, props)
+        response = client.post('/_dash-update-component', data=json.dumps(payload),
+                               content_type='application/json')
+        response_bytes += len(response.data)
+    print(f"{label:<18} {len(server):>16} {len(clientside):>11} {response_bytes:>15,}")
+    for output in server:
+        print(f"    server: {output}")
@@ -0,0 +1,66 @@
+# Size and latency report for the word cloud across every (year, category) state.
+#
+# For each state the word cloud callback runs cold (empty render cache) and then
+# warm (memoized). The laid-out image is encoded in every supported format.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_word_cloud.py [--years 2001 2024]
+import argparse
+import statistics
+import time
+
+from dash_session import load_dashboard
+
+dashboard = load_dashboard()
+from word_cloud import IMAGE_FORMATS  # noqa: E402
+
+CATEGORIES = [None] + list(dashboard.category_colors)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=int, nargs=2, default=[2001, 2024], metavar=('FIRST', 'LAST'))
+    args = parser.parse_args()
+
+    # Keep the laid-out image of each render so it can be encoded in every format
+    renderer = dashboard.word_clouds
+    layout = renderer.layout
+    images = []
+    renderer.layout = lambda frequencies: images.append(layout(frequencies)) or images[-1]
+
+    cold, warm, layout_times = [], [], []
+    sizes = {image_format: [] for image_format in IMAGE_FORMATS}
+    encode_times = {image_format: [] for image_format in IMAGE_FORMATS}
+    states = 0
+    for year in range(args.years[0], args.years[1] + 1):
+        for category in CATEGORIES:
+            dashboard.cache.clear()
+            images.clear()
+            start = time.perf_counter()
+            src, _ = dashboard.update_category_graph_top_years_and_range(category, year)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            dashboard.update_category_graph_top_years_and_range(category, year)
+            warm.append(time.perf_counter() - start)
+            if src is None:
+                continue  # No data for this state
+            states += 1
+            for image_format in IMAGE_FORMATS:
+                start = time.perf_counter()
+                _, data = renderer.encode(images[-1], image_format)
+                encode_times[image_format].append(time.perf_counter() - start)
+                sizes[image_format].append(len(data))
+
+    print(f"{states} states with a word cloud ({len(cold)} requested)")
+    print(f"callback latency cold (render):  p50 {percentile(cold, 0.5) * 1000:7.1f} ms   p95 {percentile(cold, 0.95) * 1000:7.1f} ms")
+    print(f"callback latency warm (memo hit): p50 {percentile(warm, 0.5) * 1000:7.1f} ms   p95 {percentile(warm, 0.95) * 1000:7.1f} ms")
+    print(f"{'format':<8} {'mean bytes':>11} {'max bytes':>10} {'base64 mean':>12} {'encode p50':>11}")
+    for image_format in IMAGE_FORMATS:
+        mean_size = statistics.mean(sizes[image_format])
+        print(f"{image_format:<8} {mean_size:>11,.0f} {max(sizes[image_format]):>10,} {mean_size * 4 / 3:>12,.0f}"
+              f" {percentile(encode_times[image_format], 0.5) * 1000:>8.1f} ms")
@@ -0,0 +1,93 @@
+# Helpers to replay dashboard interactions against /_dash-update-component,
+# the same requests the Dash renderer sends from the browser.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Import the dashboard with the given environment settings (from the repository root)
+def load_dashboard(**environ):
+    os.environ.update({key: str(value) for key, value in environ.items()})
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import Visual_Food_Inflation_app as dashboard
+    return dashboard
+
+
+def _output_json(output):
+    return {'id': output.component_id, 'property': output.component_property}
+
+
+# Request body for one server callback; `values` maps 'id.property' to the input values
+def update_component_payload(app, output, values, changed):
+    spec = app.callback_map[output]
+    outputs = spec['output']
+    return _payload(output, [_output_json(o) for o in outputs] if isinstance(outputs, list) else _output_json(outputs),
+                    spec, values, changed)
+
+
+# Same as update_component_payload, for a spec of the /_dash-dependencies list
+def dependency_payload(spec, values, changed):
+    outputs = [dict(zip(('id', 'property'), prop.rsplit('.', 1))) for prop in _callback_outputs(spec['output'])]
+    return _payload(spec['output'], outputs if spec['output'].startswith('..') else outputs[0], spec, values, changed)
+
+
+def _payload(output, outputs, spec, values, changed):
+    return {
+        'output': output,
+        'outputs': outputs,
+        'inputs': [
+            {'id': i['id'], 'property': i['property'], 'value': values.get(f"{i['id']}.{i['property']}")}
+            for i in spec['inputs']
+        ],
+        'changedPropIds': list(changed),
+        'state': [
+            {'id': i['id'], 'property': i['property'], 'value': values.get(f"{i['id']}.{i['property']}")}
+            for i in spec.get('state', [])
+        ],
+    }
+
+
+# Server callbacks the renderer fires when the given props change
+def triggered_outputs(app, changed):
+    return [
+        output for output, spec in app.callback_map.items()
+        if 'callback' in spec and any(f"{i['id']}.{i['property']}" in changed for i in spec['inputs'])
+    ]
+
+
+def _callback_outputs(output):
+    if output.startswith('..'):
+        return output[2:-2].split('...')
+    return [output]
+
+
+# (server, clientside) callbacks fired by changing `props`, in firing order: a changed prop
+# fires every callback that takes it as input, and their outputs fire the next ones
+def fired_callbacks(app, props):
+    return _fired([(output, spec['inputs'], 'callback' in spec) for output, spec in app.callback_map.items()], props)
+
+
+# Same as fired_callbacks, from the /_dash-dependencies list the browser gets
+def fired_dependencies(dependencies, props):
+    return _fired([(spec['output'], spec['inputs'], not spec.get('clientside_function')) for spec in dependencies],
+                  props)
+
+
+def _fired(callbacks, props):
+    changed, server, clientside = set(props), [], []
+    pending = list(props)
+    while pending:
+        prop = pending.pop(0)
+        for output, inputs, is_server in callbacks:
+            if output in server or output in clientside:
+                continue
+            if any(f"{i['id']}.{i['property']}" == prop for i in inputs):
+                (server if is_server else clientside).append(output)
+                for produced in _callback_outputs(output):
+                    if produced not in changed:
+                        changed.add(produced)
+                        pending.append(produced)
+    return server, clientside
@@ -0,0 +1,271 @@
+# Load test: concurrent simulated users against a locally started app.
+#
+# Starts the app under gunicorn (gunicorn.conf.py) on a free local port for
+# every pair of a worker count in --workers and a number of users in --users,
+# each with its render cache in a fresh temporary directory (RENDER_CACHE_DIR).
+# Every level starts cold, or warmed at startup only with --warm, instead of
+# reusing the renders of earlier levels and runs. --url targets a running app
+# instead, with its cache as it is. Every simulated user is a thread with its
+# own HTTP connection and browser session id, replaying sessions the way the
+# Dash renderer does:
+#   page load    GET /, /_dash-layout, /_dash-dependencies, then the server
+#                callbacks fired on load
+#   interactions a random walk of year changes, category changes (or clearing
+#                the category) and btn-bar / btn-map clicks, each posting the
+#                server callbacks the change fires to /_dash-update-component
+# with --think seconds between interactions (0: every user sends its next
+# request as soon as the last one returned). Payloads, dropdown options and
+# initial values come from the app's own layout and dependencies.
+#
+# For each number of users in --users (1, 10, 100) it runs for --duration
+# seconds and reports the throughput, the error rate (HTTP errors and failed
+# connections) and p50/p99 latency per callback output. Responses with no
+# update (204, e.g. a render superseded by a newer one of the same session) are
+# counted apart, not as errors. The load generator runs on the same machine as
+# the workers and takes CPU from them.
+#
+# Usage (from the repository root):
+#   python benchmarks/load_test.py [--workers 1,2,4] [--users 1,10,100] [--duration 20]
+#                                  [--think 0] [--warm] [--url http://127.0.0.1:8050]
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+import numpy as np
+
+from dash_session import ROOT, dependency_payload, fired_dependencies
+
+parser = argparse.ArgumentParser(description="Replay concurrent dashboard sessions against a local app.")
+parser.add_argument('--workers', default='2', help="comma-separated gunicorn worker counts")
+parser.add_argument('--users', default='1,10,100', help="comma-separated numbers of concurrent users")
+parser.add_argument('--duration', type=float, default=20, help="seconds per number of users")
+parser.add_argument('--think', type=float, default=0, help="seconds between two interactions of a user")
+parser.add_argument('--interactions', type=int, default=10, help="interactions per session")
+parser.add_argument('--warm', action='store_true', help="pre-render every map at startup (WARM_RENDER_CACHE=1)")
+parser.add_argument('--engine', choices=['folium', 'plotly'], default='folium')
+parser.add_argument('--url', help="test this running app instead of starting gunicorn")
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+TIMEOUT = 120
+
+
+def free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Client:
+    def __init__(self, base):
+        url = urllib.parse.urlsplit(base)
+        self.prefix = url.path.rstrip('/')
+        # Kept alive between requests; request() closes it after an error and the next request reopens it
+        self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=TIMEOUT)
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'} if body is not None else {}
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            return response.status, data
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return None, b''
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, payload):
+        return self.request('POST', '/_dash-update-component', json.dumps(payload))
+
+
+# Every 'id.property' value of the layout's components, and the component of every id
+def layout_values(layout):
+    values, components = {}, {}
+    pending = [layout]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            props = node['props']
+            if isinstance(props.get('id'), str):
+                components[props['id']] = props
+                values.update({f"{props['id']}.{name}": value for name, value in props.items() if name != 'id'})
+            pending.extend(value for value in props.values() if isinstance(value, (list, dict)))
+    return values, components
+
+
+# What the app looks like to a browser: initial values, callbacks and dropdown options
+class AppModel:
+    def __init__(self, base):
+        client = Client(base)
+        _, layout = client.get('/_dash-layout')
+        _, dependencies = client.get('/_dash-dependencies')
+        self.dependencies = json.loads(dependencies)
+        self.initial, components = layout_values(json.loads(layout))
+        self.initial.setdefault('active-plot.data', 'map')
+        self.years = [option['value'] for option in components['year-dropdown']['options']]
+        self.categories = [option['value'] for option in components['category-dropdown']['options']]
+        self.on_load = [spec for spec in self.dependencies
+                        if not spec.get('clientside_function') and not spec.get('prevent_initial_call')]
+        self.specs = {spec['output']: spec for spec in self.dependencies}
+        # Server callbacks fired by each changed prop set, computed once
+        self._fired = {}
+
+    def fired(self, props):
+        key = tuple(sorted(props))
+        if key not in self._fired:
+            self._fired[key] = [self.specs[output] for output in fired_dependencies(self.dependencies, props)[0]]
+        return self._fired[key]
+
+
+# Short label of a callback output: its component ids
+def output_label(output):
+    return '+'.join(prop.rsplit('.', 1)[0] for prop in output.strip('.').split('...'))
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.no_update = defaultdict(int)
+
+    def record(self, label, seconds, status):
+        with self.lock:
+            if status is None or status >= 400:
+                self.errors[label] += 1
+            else:
+                self.latencies[label].append(seconds)
+                if status == 204:
+                    self.no_update[label] += 1
+
+
+def timed(recorder, label, call):
+    start = time.perf_counter()
+    status, _ = call()
+    recorder.record(label, time.perf_counter() - start, status)
+
+
+# One simulated user: sessions of a page load and a random walk of interactions until the deadline
+def run_user(base, model, user, deadline, recorder):
+    rng = random.Random(args.seed * 1000 + user)
+    client = Client(base)
+    session = 0
+    while time.time() < deadline:
+        session += 1
+        state = dict(model.initial, **{'session-id.data': f'load-{user}-{session}'})
+        for path in ('/', '/_dash-layout', '/_dash-dependencies'):
+            timed(recorder, f'GET {path}', lambda: client.get(path))
+        for spec in model.on_load:
+            timed(recorder, output_label(spec['output']),
+                  lambda: client.post(dependency_payload(spec, state, [])))
+
+        clicks = {'btn-map': 0, 'btn-bar': 0}
+        for _ in range(args.interactions):
+            if time.time() >= deadline:
+                return
+            time.sleep(args.think)
+            kind = rng.choices(['year', 'category', 'view'], weights=[2, 1, 1])[0]
+            if kind == 'year':
+                changes = {'year-dropdown.value': rng.choice(model.years)}
+            elif kind == 'category':
+                changes = {'category-dropdown.value': rng.choice(model.categories + [None])}
+            else:
+                # The clientside selectPlot callback turns the click into the active plot
+                plot = 'map' if state['active-plot.data'] == 'bar' else 'bar'
+                clicks[f'btn-{plot}'] += 1
+                changes = {f'btn-{plot}.n_clicks': clicks[f'btn-{plot}'], 'active-plot.data': plot}
+            state.update(changes)
+            for spec in model.fired(list(changes)):
+                timed(recorder, output_label(spec['output']),
+                      lambda: client.post(dependency_payload(spec, state, list(changes))))
+
+
+def run_level(base, model, users):
+    recorder = Recorder()
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=run_user, args=(base, model, user, deadline, recorder))
+               for user in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+
+def report(users, recorder, elapsed):
+    requests = sum(len(values) for values in recorder.latencies.values())
+    errors = sum(recorder.errors.values())
+    all_latencies = np.concatenate([values for values in recorder.latencies.values()] or [[]])
+    print(f"\n{users} users, {elapsed:.1f} s: {requests:,} requests, {requests / elapsed:.1f} req/s, "
+          f"errors {errors / max(1, requests + errors):.1%}, "
+          f"p50 {np.percentile(all_latencies, 50) * 1000 if requests else 0:.0f} ms, "
+          f"p99 {np.percentile(all_latencies, 99) * 1000 if requests else 0:.0f} ms")
+    print(f"  {'output':<42} {'count':>7} {'p50':>9} {'p99':>9} {'errors':>7} {'no update':>10}")
+    for label in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = np.array(recorder.latencies[label]) * 1000
+        p50, p99 = (np.percentile(values, 50), np.percentile(values, 99)) if len(values) else (0, 0)
+        print(f"  {label:<42} {len(values):>7,} {p50:>6.0f} ms {p99:>6.0f} ms "
+              f"{recorder.errors[label]:>7} {recorder.no_update[label]:>10}")
+
+
+def run(base, users):
+    report(users, *run_level(base, AppModel(base), users))
+
+
+def wait_until_up(base, process):
+    deadline = time.time() + 180
+    while True:
+        status, _ = Client(base).get('/')
+        if status == 200:
+            return
+        if time.time() > deadline or process.poll() is not None:
+            raise RuntimeError("gunicorn did not start")
+        time.sleep(0.2)
+
+
+user_levels = [int(value) for value in args.users.split(',')]
+
+if args.url:
+    print(f"Target: {args.url} (render cache as found)")
+    for users in user_levels:
+        run(args.url, users)
+    sys.exit(0)
+
+for workers in [int(value) for value in args.workers.split(',')]:
+    print(f"\n=== gunicorn, {workers} workers, MAP_ENGINE={args.engine}, new app and render cache per level "
+          f"({'maps pre-rendered at startup' if args.warm else 'cold'}), think time {args.think} s ===")
+    for users in user_levels:
+        # A new app and an empty render cache for every level
+        port = free_port()
+        cache_dir = tempfile.mkdtemp(prefix='load-test-renders-')
+        env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}',
+                   MAP_ENGINE=args.engine, WARM_RENDER_CACHE='1' if args.warm else '0', METRICS_ENABLED='0',
+                   RENDER_CACHE_DIR=cache_dir)
+        master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                   'Visual_Food_Inflation_app:server'],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f'http://127.0.0.1:{port}'
+            wait_until_up(base, master)
+            run(base, users)
+        finally:
+            master.terminate()
+            master.wait()
+            shutil.rmtree(cache_dir, ignore_errors=True)
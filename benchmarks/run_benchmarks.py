@@ -0,0 +1,161 @@
+# Benchmark suite for the dashboard callbacks and figure builders.
+#
+# Calls every function directly over the full grid of inputs (years 2001-2024 x
+# every category, including None) and records per function:
+#   - p50/p95 latency
+#   - peak traced memory of a call (tracemalloc, on a sample of the grid)
+#   - serialized response size (the JSON Dash would send)
+# Results are saved as JSON; --compare flags regressions against an earlier run.
+# Runs offline, without a browser.
+#
+# Usage (from the repository root):
+#   python benchmarks/run_benchmarks.py [--output results.json] [--compare baseline.json]
+#                                       [--warm] [--years 2020 2024] [--only update_map ...]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from dash_session import ROOT, load_dashboard
+
+dashboard = load_dashboard()
+from dash._utils import to_json  # noqa: E402
+
+CATEGORIES = [None] + list(dashboard.category_colors)
+METRICS = ['p50_ms', 'p95_ms', 'peak_memory_kib', 'mean_response_bytes']
+
+
+# Word cloud input for a grid state, as the word cloud callback builds it
+def word_cloud_frequencies(year, category):
+    rows = dashboard.data_index.slice(year=year, category=category)
+    return dict(zip(rows['Area'], rows['Value'])) or {'': 1}
+
+
+# Benchmarked functions: name -> call for a (year, category) grid state
+BENCHMARKS = {
+    'update_map': lambda year, category: dashboard.update_map(year, category),
+    'update_plot_area[map]': lambda year, category: dashboard.update_plot_area(year, category, 'map'),
+    'update_plot_area[bar]': lambda year, category: dashboard.update_plot_area(year, category, 'bar'),
+    'update_stacked_barplot': lambda year, category: dashboard.update_stacked_barplot(),
+    'create_category_bar_plot': lambda year, category: dashboard.create_category_bar_plot(),
+    'generate_word_cloud': lambda year, category: dashboard.generate_word_cloud(word_cloud_frequencies(year, category)),
+    'update_category_graph_top_years_and_range':
+        lambda year, category: dashboard.update_category_graph_top_years_and_range(category, year),
+    'default_insights': lambda year, category: dashboard.default_insights(),
+    'generate_insight_for_category':
+        lambda year, category: dashboard.generate_insight_for_category(category or 'Target Inflation'),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_benchmark(call, grid, warm, memory_samples):
+    latencies, sizes = [], []
+    for year, category in grid:
+        if warm:
+            call(year, category)
+        else:
+            dashboard.cache.clear()
+        start = time.perf_counter()
+        result = call(year, category)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(to_json(result)))
+
+    # Peak memory on an evenly spread sample of the grid (tracemalloc slows calls down)
+    step = max(1, len(grid) // memory_samples)
+    peaks = []
+    for year, category in grid[::step]:
+        if warm:
+            call(year, category)
+        else:
+            dashboard.cache.clear()
+        tracemalloc.start()
+        call(year, category)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        'calls': len(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'peak_memory_kib': max(peaks) / 1024,
+        'mean_response_bytes': sum(sizes) / len(sizes),
+        'max_response_bytes': max(sizes),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Metrics that got worse than the baseline by more than the threshold (a fraction)
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for name, metrics in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            before, after = previous.get(metric), metrics.get(metric)
+            if before and after is not None and after > before * (1 + threshold):
+                regressions.append((name, metric, before, after))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard callbacks and figure builders.")
+    parser.add_argument('--output', help="where to save the results (default benchmarks/results/<time>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="regression threshold (default 0.2 = +20%%)")
+    parser.add_argument('--warm', action='store_true', help="measure with a warm render cache instead of cold")
+    parser.add_argument('--years', type=int, nargs=2, default=[2001, 2024], metavar=('FIRST', 'LAST'))
+    parser.add_argument('--memory-samples', type=int, default=12, help="grid states traced for peak memory")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    args = parser.parse_args()
+
+    grid = [(year, category) for year in range(args.years[0], args.years[1] + 1) for category in CATEGORIES]
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'mode': 'warm' if args.warm else 'cold',
+        'grid': {'years': args.years, 'categories': len(CATEGORIES), 'states': len(grid)},
+        'settings': {name: os.environ.get(name) for name in ('MAP_ENGINE', 'WORDCLOUD_FORMAT')},
+        'benchmarks': {},
+    }
+
+    print(f"{'function':<44} {'p50':>9} {'p95':>9} {'peak mem':>10} {'response':>11}")
+    for name in args.only or BENCHMARKS:
+        metrics = run_benchmark(BENCHMARKS[name], grid, args.warm, args.memory_samples)
+        results['benchmarks'][name] = metrics
+        print(f"{name:<44} {metrics['p50_ms']:>6.1f} ms {metrics['p95_ms']:>6.1f} ms"
+              f" {metrics['peak_memory_kib']:>6,.0f} KiB {metrics['mean_response_bytes']:>11,.0f}")
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name} {metric}: {before:,.1f} -> {after:,.1f} ({after / before - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions above {args.threshold:.0%} against {args.compare}")
@@ -0,0 +1,72 @@
+# Row index over country_year_mean for the callbacks.
+#
+# Rows with a country and a value are kept once as the cleaned frame, and the
+# row positions of every year, every category and every (year, category) pair
+# are computed up front. Callbacks then take their slice by position instead of
+# scanning whole columns with boolean masks.
+#
+# CountrySeriesIndex keeps the same values as a dense country x year matrix
+# with a row per ISO3 code, so the series of any set of countries is a row
+# slice.
+import numpy as np
+
+
+class YearCategoryIndex:
+    def __init__(self, data):
+        self.rebuild(data)
+
+    def rebuild(self, data):
+        # Cleaned frame shared by every slice
+        self.clean = data.dropna(subset=['Area', 'Value']).reset_index(drop=True)
+
+        # (year, category) -> row positions in the cleaned frame, ascending;
+        # None stands for "any" on either side
+        positions = {(None, None): np.arange(len(self.clean))}
+        for year, rows in self.clean.groupby('Year').indices.items():
+            positions[(int(year), None)] = rows
+        self.years = sorted(year for year, _ in positions if year is not None)
+        for category, rows in self.clean.groupby('Inflation_Category', observed=True).indices.items():
+            positions[(None, category)] = rows
+        for (year, category), rows in self.clean.groupby(['Year', 'Inflation_Category'], observed=True).indices.items():
+            positions[(int(year), category)] = rows
+        self._positions = positions
+        self._empty = np.arange(0)
+
+    def positions(self, year=None, category=None):
+        return self._positions.get((year, category), self._empty)
+
+    # Rows of the cleaned frame for a year and/or category, in their original order
+    def slice(self, year=None, category=None):
+        if year is None and category is None:
+            return self.clean
+        return self.clean.iloc[self.positions(year, category)]
+
+
+class CountrySeriesIndex:
+    def __init__(self, data):
+        self.rebuild(data)
+
+    def rebuild(self, data):
+        clean = data.dropna(subset=['Area Code (ISO3)', 'Area', 'Value'])
+        table = clean.pivot_table(index='Area Code (ISO3)', columns='Year', values='Value', aggfunc='mean')
+        self.iso3 = list(table.index)
+        self.years = [int(year) for year in table.columns]
+        self.row_of = {code: row for row, code in enumerate(self.iso3)}
+        # One row per country, one column per year, NaN where the year has no value
+        self.matrix = table.to_numpy(dtype=float)
+        names = clean.drop_duplicates('Area Code (ISO3)').set_index('Area Code (ISO3)')['Area']
+        self.names = [str(name) for name in names.reindex(self.iso3)]
+
+    # Row positions of the given ISO3 codes, in their order; unknown codes are skipped
+    def rows(self, codes):
+        return np.array([self.row_of[code] for code in codes if code in self.row_of], dtype=np.intp)
+
+    # (ISO3 codes, names, country x year values) of the given countries
+    def series(self, codes):
+        rows = self.rows(codes)
+        return [self.iso3[row] for row in rows], [self.names[row] for row in rows], self.matrix[rows]
+
+    # Dropdown options sorted by country name
+    def options(self):
+        return sorted(({'label': name, 'value': code} for code, name in zip(self.iso3, self.names)),
+                      key=lambda option: option['label'])
@@ -0,0 +1,126 @@
+# Typed, fast-loading country_year_mean.
+#
+# The CSV carries leftover index columns and stores every text column as Python
+# strings. load_country_year_mean() drops the junk columns, stores text as
+# categoricals, Year as int16 and the rounded Inflation column as float32, and keeps a
+# binary copy next to the CSV: one .npy file per column (category codes for the
+# text columns), memory-mapped on load. The binary copy is rebuilt whenever the
+# CSV changes.
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+CSV_FILE = 'country_year_mean.csv'
+CACHE_DIR = os.path.join('.cache', 'country_year_mean')
+CACHE_FORMAT_VERSION = 1
+
+CATEGORICAL_COLUMNS = ['Area Code (ISO3)', 'Area', 'Country', 'Region', 'Inflation_Category']
+# Value stays float64: its extremes (above 100,000%) need more digits than float32 holds
+COLUMN_DTYPES = {'Year': 'int16', 'Value': 'float64', 'Inflation': 'float32'}
+COLUMN_DTYPES.update({column: 'category' for column in CATEGORICAL_COLUMNS})
+
+
+# Read the CSV with compact dtypes, without the leftover 'Unnamed: ...' index columns
+def read_csv_typed(csv_path=CSV_FILE):
+    data = pd.read_csv(
+        csv_path,
+        usecols=lambda column: not column.startswith('Unnamed'),
+        dtype=COLUMN_DTYPES,
+    )
+    return data
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_cache(data, csv_path=CSV_FILE, cache_dir=CACHE_DIR):
+    # Write into a temporary directory and swap it in, so readers never see a partial cache
+    staging_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    columns = []
+    for index, column in enumerate(data.columns):
+        values = data[column]
+        entry = {'name': column, 'file': f"{index}.npy"}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry['categories'] = values.cat.categories.tolist()
+            array = values.cat.codes.to_numpy()
+        else:
+            array = values.to_numpy()
+        entry['dtype'] = str(array.dtype)
+        np.save(os.path.join(staging_dir, entry['file']), array)
+        columns.append(entry)
+
+    meta = {
+        'format': CACHE_FORMAT_VERSION,
+        'rows': len(data),
+        'source': dict(_source_signature(csv_path), sha1=_file_sha1(csv_path)),
+        'columns': columns,
+    }
+    with open(os.path.join(staging_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(os.path.dirname(cache_dir) or '.', exist_ok=True)
+    os.replace(staging_dir, cache_dir)
+
+
+# The cached copy's metadata, or None if it is missing, outdated or from another format
+def _valid_cache_meta(csv_path, cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != CACHE_FORMAT_VERSION:
+        return None
+    source = meta['source']
+    signature = _source_signature(csv_path)
+    if source['size'] != signature['size']:
+        return None
+    # Same size but touched: only a content change invalidates the cache
+    if source['mtime_ns'] != signature['mtime_ns'] and source['sha1'] != _file_sha1(csv_path):
+        return None
+    return meta
+
+
+def read_cache(meta, cache_dir=CACHE_DIR):
+    columns = {}
+    for entry in meta['columns']:
+        array = np.load(os.path.join(cache_dir, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            columns[entry['name']] = pd.Categorical.from_codes(array, categories=entry['categories'])
+        else:
+            columns[entry['name']] = array
+    return pd.DataFrame(columns)
+
+
+# country_year_mean with compact dtypes, from the binary cache when it is up to date
+def load_country_year_mean(csv_path=CSV_FILE, cache_dir=CACHE_DIR, use_cache=True):
+    if not use_cache:
+        return read_csv_typed(csv_path)
+    meta = _valid_cache_meta(csv_path, cache_dir)
+    if meta is not None:
+        return read_cache(meta, cache_dir)
+    data = read_csv_typed(csv_path)
+    try:
+        write_cache(data, csv_path, cache_dir)
+    except OSError:
+        pass  # Read-only checkout: keep working from the CSV
+    return data
@@ -0,0 +1,121 @@
+# Read-only export routes: filtered slices of country_year_mean as CSV, JSON or Arrow IPC.
+#
+#   GET /api/export.csv?year_from=2010&year_to=2015&category=High+Inflation
+#   GET /api/export.json?region=Africa,Europe
+#   GET /api/export.arrow?iso3=USA&iso3=DEU
+#
+# Filters: `year` or a `year_from`/`year_to` range, and any number of values of
+# `category`, `region` and `iso3` (repeated or comma-separated). The rows are the
+# cleaned rows of the callbacks' YearCategoryIndex: the year and category filters
+# are lookups of its precomputed row positions, and only the selected rows are
+# tested for region and country. Responses are streamed in chunks of
+# `chunk_rows` rows, so a full-table export holds one chunk in memory, not the
+# whole file. Arrow IPC (stream format) needs the optional pyarrow package.
+import io
+import json
+
+import flask
+import numpy as np
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'json': 'application/json', 'arrow': 'application/vnd.apache.arrow.stream'}
+CHUNK_ROWS = 1000
+
+
+# Values of a query parameter, given repeatedly or comma-separated
+def _list_arg(args, name):
+    return [value.strip() for values in args.getlist(name) for value in values.split(',') if value.strip()]
+
+
+def _year_arg(args, name):
+    value = args.get(name, '')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        flask.abort(400, description=f"{name} must be a year, got {value!r}")
+
+
+# Inflation is kept as float32 in memory; export it as in the CSV, the value rounded to 1 decimal
+def _export_frame(frame):
+    return frame.assign(Inflation=frame['Value'].round(1)) if 'Inflation' in frame else frame
+
+
+class DataExport:
+    def __init__(self, server, index, url_prefix='/api', chunk_rows=CHUNK_ROWS):
+        self.index = index
+        self.chunk_rows = chunk_rows
+        server.add_url_rule(f"{url_prefix.rstrip('/')}/export.<any(csv, json, arrow):fmt>", 'data_export', self.serve)
+
+    # Positions in index.clean of the rows matching the filters, in their original order
+    def select(self, year_from=None, year_to=None, categories=(), regions=(), iso3=()):
+        index = self.index
+        years = [None] if year_from is None and year_to is None else [
+            year for year in index.years
+            if (year_from is None or year >= year_from) and (year_to is None or year <= year_to)
+        ]
+        parts = [index.positions(year, category) for year in years for category in categories or [None]]
+        if len(parts) == 1:
+            positions = parts[0]  # Already in order, and shared with the index (no copy of a full table)
+        else:
+            positions = np.sort(np.concatenate(parts)) if parts else np.arange(0)
+        for column, values in (('Region', regions), ('Area Code (ISO3)', iso3)):
+            if values:
+                positions = positions[index.clean[column].iloc[positions].isin(values).to_numpy()]
+        return positions
+
+    def serve(self, fmt):
+        args = flask.request.args
+        year = _year_arg(args, 'year')
+        year_from = year if year is not None else _year_arg(args, 'year_from')
+        year_to = year if year is not None else _year_arg(args, 'year_to')
+        if fmt == 'arrow' and pyarrow is None:
+            flask.abort(501, description="Arrow export needs the pyarrow package")
+
+        # The rows and positions of this request, even if the index is rebuilt while streaming
+        clean = self.index.clean
+        positions = self.select(year_from, year_to, _list_arg(args, 'category'),
+                                _list_arg(args, 'region'), _list_arg(args, 'iso3'))
+        chunks = getattr(self, f"{fmt}_chunks")(clean, positions)
+        response = flask.Response(chunks, mimetype=EXPORT_FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename="country_year_mean.{fmt}"'
+        return response
+
+    # Rows of `clean` at `positions`, chunk_rows at a time
+    def frames(self, clean, positions):
+        for start in range(0, len(positions), self.chunk_rows):
+            yield _export_frame(clean.iloc[positions[start:start + self.chunk_rows]])
+
+    def csv_chunks(self, clean, positions):
+        yield _export_frame(clean.iloc[:0]).to_csv(index=False)
+        for frame in self.frames(clean, positions):
+            yield frame.to_csv(index=False, header=False)
+
+    # One JSON array of row objects, written a chunk of rows at a time. Python floats keep every
+    # digit (to_json stops at 15 decimals); missing values become null.
+    def json_chunks(self, clean, positions):
+        yield '['
+        separator = ''
+        for frame in self.frames(clean, positions):
+            records = frame.astype(object).where(frame.notna(), None).to_dict(orient='records')
+            yield separator + json.dumps(records, ensure_ascii=False, separators=(',', ':'))[1:-1]
+            separator = ','
+        yield ']'
+
+    # Arrow IPC stream: the schema, then one record batch per chunk (categories as dictionaries)
+    def arrow_chunks(self, clean, positions):
+        schema = pyarrow.Schema.from_pandas(_export_frame(clean.iloc[:0]), preserve_index=False)
+        sink = io.BytesIO()
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            for frame in self.frames(clean, positions):
+                writer.write_batch(pyarrow.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False))
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+        yield sink.getvalue()
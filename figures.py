@@ -0,0 +1,42 @@
+# Figure layer: plotly figures built once and sent as plain JSON data.
+#
+# A go.Figure validates every property when it is built, and Dash encodes it
+# through to_plotly_json and a walk over every value each time it is sent. A
+# figure whose data does not change per request is built once and kept as
+# plain JSON data (dicts, lists, strings, numbers) by plain_figure(), decoded
+# from its serialized JSON. Dash then encodes plain values only. A figure that
+# changes per request (e.g. the choropleth of a year) is a FigureSkeleton: the
+# plotly figure is built once and every use copies it with new trace values,
+# without building or validating a go.Figure.
+#
+# Dash encodes the responses through plotly's to_json_plotly, which uses orjson
+# when it is installed; loads() decodes the figures with it too, and with the
+# json module otherwise.
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# A plotly figure as plain JSON data; numpy arrays become lists and NaN becomes None
+def plain_figure(figure):
+    return loads(figure.to_json())
+
+
+class FigureSkeleton:
+    def __init__(self, figure):
+        self.figure = plain_figure(figure)
+
+    # The figure with new values for properties of its traces: one dict per trace, in trace order.
+    # Everything else (layout, template, geometry URL) is shared with the skeleton, not copied.
+    def build(self, *trace_updates):
+        data = list(self.figure['data'])
+        for index, update in enumerate(trace_updates):
+            data[index] = dict(data[index], **update)
+        return dict(self.figure, data=data)
@@ -0,0 +1,252 @@
+# Offline compiler for the map geometry.
+#
+# Reads Inflation_data/geometry.geojson (the full Natural Earth export) and writes
+# Inflation_data/geometry.topojson, which the app loads instead when present:
+#   - properties are projected down to the fields the map uses
+#   - coordinates are quantized onto an integer grid and delta-encoded (TopoJSON)
+#   - rings are cut into arcs at junctions, so a border shared by two countries
+#     is stored once and simplified once, and neighbours stay aligned
+#   - arcs are simplified with Douglas-Peucker to a configurable tolerance
+#
+# Usage:
+#   python geo_compiler.py [--tolerance DEGREES] [--quantization N] [--report]
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+from geo_store import COMPILED_GEOMETRY_FILE, GEOMETRY_FILE, GeoStore
+
+# Feature properties used by the map (lookup key, tooltip, popup)
+MAP_PROPERTIES = ['combined_iso_a3', 'name', 'name_long']
+
+DEFAULT_TOLERANCE = 0.05  # Degrees
+DEFAULT_QUANTIZATION = 10000  # Grid steps across the bounding box
+
+
+def _polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    return geometry['coordinates']
+
+
+# Snap a ring onto the integer grid, dropping repeated points; returns it without the closing point
+def _quantize_ring(ring, translate, scale):
+    quantized = []
+    for x, y in ring:
+        point = (round((x - translate[0]) / scale[0]), round((y - translate[1]) / scale[1]))
+        if not quantized or quantized[-1] != point:
+            quantized.append(point)
+    if len(quantized) > 1 and quantized[0] == quantized[-1]:
+        quantized.pop()
+    return quantized
+
+
+# Points where the neighbouring points differ between occurrences: the ends of shared borders
+def _find_junctions(rings):
+    neighbours = {}
+    for ring in rings:
+        count = len(ring)
+        for index, point in enumerate(ring):
+            pair = frozenset((ring[index - 1], ring[(index + 1) % count]))
+            neighbours.setdefault(point, set()).add(pair)
+    return {point for point, pairs in neighbours.items() if len(pairs) > 1}
+
+
+# Cut a ring at its junctions into arcs (point lists sharing their end points)
+def _cut_ring(ring, junctions):
+    starts = [index for index, point in enumerate(ring) if point in junctions]
+    if not starts:
+        # No shared border: one closed arc, rotated to a canonical start so duplicates match
+        start = ring.index(min(ring))
+        rotated = ring[start:] + ring[:start]
+        return [rotated + [rotated[0]]]
+    rotated = ring[starts[0]:] + ring[:starts[0]] + [ring[starts[0]]]
+    offsets = [index - starts[0] for index in starts] + [len(ring)]
+    return [rotated[begin:end + 1] for begin, end in zip(offsets, offsets[1:])]
+
+
+def _segment_distance(point, start, end):
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+# Douglas-Peucker significance of every point: the largest tolerance at which it survives.
+# End points are always kept; a point is never more significant than the split that exposed it.
+def _significance(points):
+    significance = [0.0] * len(points)
+    significance[0] = significance[-1] = math.inf
+    stack = [(0, len(points) - 1, math.inf)]
+    while stack:
+        first, last, limit = stack.pop()
+        if last - first < 2:
+            continue
+        distance, split = max(
+            (_segment_distance(points[index], points[first], points[last]), index)
+            for index in range(first + 1, last)
+        )
+        significance[split] = min(distance, limit)
+        stack.append((first, split, significance[split]))
+        stack.append((split, last, significance[split]))
+    return significance
+
+
+def _simplify(points, tolerance, min_points):
+    significance = _significance(points)
+    keep = {index for index, value in enumerate(significance) if value > tolerance}
+    if len(keep) < min_points:
+        ranked = sorted(range(len(points)), key=lambda index: significance[index], reverse=True)
+        keep.update(ranked[:min_points])
+    return [points[index] for index in sorted(keep)]
+
+
+def _ring_area(ring):
+    return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))) / 2
+
+
+def compile_geometry(source, tolerance=DEFAULT_TOLERANCE, quantization=DEFAULT_QUANTIZATION):
+    features = source['features']
+
+    # Quantization grid over the bounding box of all coordinates
+    xs, ys = [], []
+    for feature in features:
+        for polygon in _polygons(feature['geometry']):
+            for ring in polygon:
+                xs.extend(x for x, _ in ring)
+                ys.extend(y for _, y in ring)
+    translate = [min(xs), min(ys)]
+    scale = [(max(xs) - min(xs)) / (quantization - 1), (max(ys) - min(ys)) / (quantization - 1)]
+
+    # Feature -> polygons -> rings of grid points
+    quantized = [
+        [[_quantize_ring(ring, translate, scale) for ring in polygon] for polygon in _polygons(feature['geometry'])]
+        for feature in features
+    ]
+    rings = [ring for polygons in quantized for polygon in polygons for ring in polygon if len(ring) >= 3]
+    junctions = _find_junctions(rings)
+
+    # The largest ring of each feature is protected, so no country disappears entirely
+    protected = set()
+    for polygons in quantized:
+        candidates = [ring for polygon in polygons for ring in polygon if len(ring) >= 3]
+        if candidates:
+            protected.add(id(max(candidates, key=_ring_area)))
+
+    # Deduplicate arcs; a reversed arc is referenced as ~index (TopoJSON convention)
+    arcs, arc_index, arc_min_points = [], {}, {}
+    ring_arcs = {}
+    for ring in rings:
+        references = []
+        ring_pieces = _cut_ring(ring, junctions)
+        for arc in ring_pieces:
+            key = tuple(arc)
+            if key in arc_index:
+                reference = arc_index[key]
+            elif key[::-1] in arc_index:
+                reference = ~arc_index[key[::-1]]
+            else:
+                reference = arc_index[key] = len(arcs)
+                arcs.append(arc)
+            references.append(reference)
+            if id(ring) in protected:
+                # Keep enough points that the protected ring cannot collapse
+                arc_position = reference if reference >= 0 else ~reference
+                needed = 4 if len(ring_pieces) == 1 else 3
+                arc_min_points[arc_position] = max(arc_min_points.get(arc_position, 2), needed)
+        ring_arcs[id(ring)] = references
+
+    grid_tolerance = tolerance / min(scale)
+    simplified = [
+        _simplify(arc, grid_tolerance, min(len(arc), arc_min_points.get(index, 2)))
+        for index, arc in enumerate(arcs)
+    ]
+
+    def ring_point_count(references):
+        return sum(len(simplified[r if r >= 0 else ~r]) - 1 for r in references)
+
+    def keep_ring(ring):
+        return id(ring) in protected or ring_point_count(ring_arcs[id(ring)]) >= 3
+
+    geometries = []
+    for feature, polygons in zip(features, quantized):
+        polygon_arcs = []
+        for polygon in polygons:
+            # Drop polygons whose outer ring collapsed below the tolerance, then their collapsed holes
+            if len(polygon[0]) < 3 or not keep_ring(polygon[0]):
+                continue
+            polygon_arcs.append([ring_arcs[id(ring)] for ring in polygon if len(ring) >= 3 and keep_ring(ring)])
+        properties = {name: feature['properties'].get(name) for name in MAP_PROPERTIES}
+        if len(polygon_arcs) == 1:
+            geometries.append({'type': 'Polygon', 'arcs': polygon_arcs[0], 'properties': properties})
+        else:
+            geometries.append({'type': 'MultiPolygon', 'arcs': polygon_arcs, 'properties': properties})
+
+    # Delta-encode the arcs; references to unused arcs are fine, the decoder only follows references
+    encoded_arcs = []
+    for arc in simplified:
+        encoded = [list(arc[0])]
+        encoded.extend([x1 - x0, y1 - y0] for (x0, y0), (x1, y1) in zip(arc, arc[1:]))
+        encoded_arcs.append(encoded)
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': scale, 'translate': translate},
+        'objects': {'countries': {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': encoded_arcs,
+    }
+
+
+def _feature_sizes(collection):
+    points = sum(len(ring) for feature in collection['features']
+                 for polygon in _polygons(feature['geometry']) for ring in polygon)
+    return points, len(json.dumps(collection, separators=(',', ':')))
+
+
+# Per year: map payload size and render time with the source and the compiled geometry
+def report(compiled_file=COMPILED_GEOMETRY_FILE):
+    import Visual_Food_Inflation_app as dashboard
+
+    stores = {'source': GeoStore.load(GEOMETRY_FILE), 'compiled': GeoStore.load(compiled_file)}
+    for label, store in stores.items():
+        points, size = _feature_sizes(store.feature_collection(store.years[-1]))
+        print(f"{label:>8}: {points:,} points, {size:,} bytes of GeoJSON per year")
+
+    print(f"{'year':>6} {'html source':>12} {'html compiled':>14} {'size':>7} {'render source':>14} {'render compiled':>16} {'time':>7}")
+    for year in stores['source'].years:
+        sizes, times = {}, {}
+        for label, store in stores.items():
+            dashboard.geo_store = store
+            start = time.perf_counter()
+            sizes[label] = len(dashboard.render_map_html.uncached(year, None))
+            times[label] = time.perf_counter() - start
+        print(f"{year:>6} {sizes['source']:>12,} {sizes['compiled']:>14,} {1 - sizes['compiled'] / sizes['source']:>7.0%}"
+              f" {times['source'] * 1000:>11.0f} ms {times['compiled'] * 1000:>13.0f} ms {1 - times['compiled'] / times['source']:>7.0%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile the map geometry into a compact TopoJSON asset.")
+    parser.add_argument('--source', default=GEOMETRY_FILE)
+    parser.add_argument('--output', default=COMPILED_GEOMETRY_FILE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"simplification tolerance in degrees (default {DEFAULT_TOLERANCE})")
+    parser.add_argument('--quantization', type=int, default=DEFAULT_QUANTIZATION,
+                        help=f"grid steps across the bounding box (default {DEFAULT_QUANTIZATION})")
+    parser.add_argument('--report', action='store_true', help="report size and render time per year")
+    args = parser.parse_args()
+
+    with open(args.source) as f:
+        source = json.load(f)
+    topology = compile_geometry(source, args.tolerance, args.quantization)
+    with open(args.output, 'w') as f:
+        json.dump(topology, f, separators=(',', ':'))
+    print(f"Wrote {args.output}: {os.path.getsize(args.source):,} -> {os.path.getsize(args.output):,} bytes")
+
+    if args.report:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        report(args.output)
@@ -0,0 +1,202 @@
+# Shared-geometry store for the map.
+#
+# The country polygons are the same for every year, so they are kept once in
+# Inflation_data/geometry.geojson. The per-year inflation values live in a
+# columnar table (Inflation_data/values.csv) with one row per feature and one
+# column per year. Both are loaded once and joined in memory, so building the
+# map for a year needs no disk I/O or JSON parsing.
+#
+# Convert the legacy per-year files and check the result:
+#   python geo_store.py convert [legacy_dir]
+#   python geo_store.py verify legacy_dir
+import csv
+import glob
+import json
+import math
+import os
+import re
+import sys
+
+import pandas as pd
+
+
+GEO_DIR = 'Inflation_data'
+GEOMETRY_FILE = os.path.join(GEO_DIR, 'geometry.geojson')
+VALUES_FILE = os.path.join(GEO_DIR, 'values.csv')
+# Projected, simplified and quantized geometry built by geo_compiler.py
+COMPILED_GEOMETRY_FILE = os.path.join(GEO_DIR, 'geometry.topojson')
+
+# Per-year property carried by each feature (everything else is shared)
+VALUE_PROPERTY = 'Value'
+
+
+class GeoStore:
+    def __init__(self, geometry, values):
+        # FeatureCollection holding the shared geometry and static properties
+        self.geometry = geometry
+        # DataFrame: one row per feature (in feature order), one column per year
+        self.values = values
+        self.feature_iso3 = [feature['properties']['combined_iso_a3'] for feature in geometry['features']]
+        self.years = [int(year) for year in values.columns]
+        self._collections = {year: self._join_year(year) for year in self.years}
+
+    # Load GeoJSON geometry, or TopoJSON geometry compiled by geo_compiler.py
+    @classmethod
+    def load(cls, geometry_file=GEOMETRY_FILE, values_file=VALUES_FILE):
+        with open(geometry_file) as f:
+            geometry = json.load(f)
+        if geometry.get('type') == 'Topology':
+            geometry = topojson_to_geojson(geometry)
+        values = read_values_table(values_file)
+        return cls(geometry, values)
+
+    def _join_year(self, year):
+        return self.join(self.year_values(year))
+
+    # FeatureCollection of the shared geometry with one value per feature (in feature order)
+    def join(self, values):
+        # Features share the geometry objects; only the properties are per year
+        features = []
+        for feature, value in zip(self.geometry['features'], values):
+            properties = dict(feature['properties'])
+            properties[VALUE_PROPERTY] = value
+            features.append({'type': 'Feature', 'properties': properties, 'geometry': feature['geometry']})
+        return {'type': 'FeatureCollection', 'features': features}
+
+    # Values of every feature for a year, in feature order (None where missing)
+    def year_values(self, year):
+        year_values = self.values[year]
+        return year_values.astype(object).where(year_values.notna(), None).tolist()
+
+    # GeoJSON FeatureCollection for a year, equivalent to the legacy inflation_{year}.geojson
+    def feature_collection(self, year):
+        if year not in self._collections:
+            raise KeyError(f"No map data for year {year}")
+        return self._collections[year]
+
+
+# Decode a quantized, delta-encoded TopoJSON topology into a GeoJSON FeatureCollection
+def topojson_to_geojson(topology, object_name='countries'):
+    scale = topology['transform']['scale']
+    translate = topology['transform']['translate']
+    # Round to the precision of the quantization grid; more digits would only add bytes
+    digits = [max(0, math.ceil(-math.log10(step)) + 1) for step in scale]
+
+    arcs = []
+    for encoded in topology['arcs']:
+        x = y = 0
+        points = []
+        for dx, dy in encoded:
+            x += dx
+            y += dy
+            points.append([round(x * scale[0] + translate[0], digits[0]), round(y * scale[1] + translate[1], digits[1])])
+        arcs.append(points)
+
+    def ring(references):
+        points = []
+        for reference in references:
+            arc = arcs[reference] if reference >= 0 else arcs[~reference][::-1]
+            points.extend(arc if not points else arc[1:])
+        return points
+
+    features = []
+    for geometry in topology['objects'][object_name]['geometries']:
+        if geometry['type'] == 'Polygon':
+            coordinates = [ring(references) for references in geometry['arcs']]
+        else:
+            coordinates = [[ring(references) for references in polygon] for polygon in geometry['arcs']]
+        features.append({
+            'type': 'Feature',
+            'properties': geometry.get('properties', {}),
+            'geometry': {'type': geometry['type'], 'coordinates': coordinates},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+# Read the year x feature value table written by write_values_table
+def read_values_table(values_file=VALUES_FILE):
+    values = pd.read_csv(values_file, index_col='feature', float_precision='round_trip')
+    values = values.drop(columns='combined_iso_a3')
+    values.columns = [int(year) for year in values.columns]
+    return values
+
+
+def write_values_table(values, feature_iso3, values_file=VALUES_FILE):
+    # repr() keeps every float exactly as it was in the source GeoJSON
+    with open(values_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['feature', 'combined_iso_a3'] + [str(year) for year in values.columns])
+        for feature, (iso3, row) in enumerate(zip(feature_iso3, values.itertuples(index=False))):
+            writer.writerow([feature, iso3] + ['' if pd.isna(value) else repr(float(value)) for value in row])
+
+
+def legacy_year_files(legacy_dir):
+    files = {}
+    for path in glob.glob(os.path.join(legacy_dir, 'inflation_*.geojson')):
+        match = re.search(r'inflation_(\d{4})\.geojson$', path)
+        if match:
+            files[int(match.group(1))] = path
+    return dict(sorted(files.items()))
+
+
+# Split the legacy per-year files into one geometry file and the value table
+def convert(legacy_dir=GEO_DIR, geometry_file=GEOMETRY_FILE, values_file=VALUES_FILE):
+    files = legacy_year_files(legacy_dir)
+    if not files:
+        raise FileNotFoundError(f"No inflation_YYYY.geojson files in {legacy_dir}")
+
+    geometry = None
+    values = {}
+    for year, path in files.items():
+        with open(path) as f:
+            collection = json.load(f)
+        shared = [
+            {
+                'type': 'Feature',
+                'properties': {k: v for k, v in feature['properties'].items() if k != VALUE_PROPERTY},
+                'geometry': feature['geometry'],
+            }
+            for feature in collection['features']
+        ]
+        if geometry is None:
+            geometry = {'type': 'FeatureCollection', 'features': shared}
+        elif shared != geometry['features']:
+            raise ValueError(f"{path} does not share the geometry of the other years")
+        values[year] = [feature['properties'].get(VALUE_PROPERTY) for feature in collection['features']]
+
+    feature_iso3 = [feature['properties']['combined_iso_a3'] for feature in geometry['features']]
+    with open(geometry_file, 'w') as f:
+        json.dump(geometry, f, separators=(',', ':'))
+    write_values_table(pd.DataFrame(values, dtype=float), feature_iso3, values_file)
+    return geometry_file, values_file
+
+
+# Check the store rebuilds every legacy file feature for feature
+def verify(legacy_dir, geometry_file=GEOMETRY_FILE, values_file=VALUES_FILE):
+    store = GeoStore.load(geometry_file, values_file)
+    files = legacy_year_files(legacy_dir)
+    if sorted(files) != store.years:
+        raise AssertionError(f"Years differ: legacy {sorted(files)}, store {store.years}")
+
+    for year, path in files.items():
+        with open(path) as f:
+            legacy = json.load(f)
+        rebuilt = store.feature_collection(year)
+        if len(legacy['features']) != len(rebuilt['features']):
+            raise AssertionError(f"{year}: feature count differs")
+        for index, (expected, actual) in enumerate(zip(legacy['features'], rebuilt['features'])):
+            if expected != actual:
+                raise AssertionError(f"{year}: feature {index} ({expected['properties'].get('name')}) differs")
+    return len(files)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'convert':
+        written = convert(sys.argv[2] if len(sys.argv) > 2 else GEO_DIR)
+        print("Wrote " + ", ".join(written))
+    elif command == 'verify' and len(sys.argv) > 2:
+        print(f"{verify(sys.argv[2])} years match feature for feature")
+    else:
+        print("Usage: python geo_store.py convert [legacy_dir] | verify legacy_dir")
+        sys.exit(2)
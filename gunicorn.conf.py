@@ -0,0 +1,34 @@
+# gunicorn settings for the dashboard:
+#   gunicorn -c gunicorn.conf.py Visual_Food_Inflation_app:server
+#
+# With preload_app the app module is imported once in the master: the data,
+# the map geometry, the lookup tables and the static figures are built there
+# and the forked workers share them copy-on-write instead of each building
+# their own copy.
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '8050'))
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+# Threads per worker: a worker keeps taking requests while others wait for their render jobs,
+# so a newer request of a browser session can supersede its older ones (see render_jobs.py)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # Import folium and wordcloud in the master as well, so the workers share them too
+    os.environ.setdefault('LAZY_IMPORTS', '0')
+
+if workers > 1:
+    # Share rendered maps and word clouds between the workers, so each is rendered once
+    os.environ.setdefault('RENDER_CACHE_BACKEND', 'sqlite')
+
+
+# Runs in the master after the app is loaded, before the workers are forked
+def when_ready(server):
+    if preload_app:
+        # Keep the garbage collector away from everything built at startup: collections in the
+        # workers would otherwise write to those objects and un-share the pages they live on
+        gc.freeze()
@@ -0,0 +1,110 @@
+# HTTP compression and content-hashed static files for the Flask server.
+#
+# enable_compression() compresses the JSON responses of the Dash endpoints
+# (callback results, layout, dependencies) with brotli when the `brotli`
+# package is installed and the client accepts it, and with gzip otherwise.
+# Map iframes and base64 word clouds are plain text inside that JSON, so they
+# shrink with it.
+#
+# HashedFiles serves immutable data (e.g. the map geometry) from URLs that
+# contain a hash of the content. The URL changes whenever the content does, so
+# responses can be cached for a year; revalidation (If-None-Match) gets a 304.
+# The compressed variants are built once when a file is added.
+import gzip
+import hashlib
+import os
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Dash endpoints whose responses are compressed
+COMPRESSED_PATHS = ('/_dash-update-component', '/_dash-layout', '/_dash-dependencies')
+# Responses smaller than this are sent as they are
+MIN_COMPRESS_SIZE = 500
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+# Encodings this server can produce, in order of preference
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+# Best encoding accepted by an Accept-Encoding header, or None for identity
+def choose_encoding(accept_encodings):
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+# Compress the responses of `paths` when the client accepts an available encoding
+def enable_compression(server, paths=COMPRESSED_PATHS, min_size=MIN_COMPRESS_SIZE, gzip_level=6, brotli_quality=5):
+    @server.after_request
+    def compress_response(response):
+        if not any(flask.request.path.endswith(path) for path in paths):
+            return response
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(flask.request.accept_encodings)
+        data = response.get_data()
+        if encoding is None or len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return compress_response
+
+
+class HashedFiles:
+    def __init__(self, server, url_prefix='/static-data'):
+        self.url_prefix = url_prefix.rstrip('/')
+        # Hashed file name -> (content hash, data, mimetype, {encoding: compressed data})
+        self.files = {}
+        self.urls = {}
+        server.add_url_rule(f"{self.url_prefix}/<path:filename>", 'hashed_file', self.serve)
+
+    # Serve `data` under a name with its content hash; returns the URL path
+    def add(self, name, data, mimetype):
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        stem, extension = os.path.splitext(name)
+        filename = f"{stem}.{digest}{extension}"
+        variants = {encoding: compress(data, encoding, gzip_level=9, brotli_quality=11)
+                    for encoding in available_encodings()}
+        self.files[filename] = (digest, data, mimetype, variants)
+        self.urls[name] = f"{self.url_prefix}/{filename}"
+        return self.urls[name]
+
+    def url(self, name):
+        return self.urls[name]
+
+    def serve(self, filename):
+        if filename not in self.files:
+            flask.abort(404)
+        digest, data, mimetype, variants = self.files[filename]
+        # Weak validator: the bytes differ per encoding, the content does not
+        if flask.request.if_none_match.contains_weak(digest):
+            response = flask.Response(status=304)
+        else:
+            encoding = choose_encoding(flask.request.accept_encodings)
+            response = flask.Response(variants[encoding] if encoding else data, mimetype=mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(digest, weak=True)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
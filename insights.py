@@ -0,0 +1,60 @@
+# Precomputed insight tables for the info panels.
+#
+# Every per-category and global aggregate shown in the "insights" accordions is
+# computed once from country_year_mean, so the callbacks only look them up.
+# Call rebuild() whenever the underlying data or the bands change.
+import pandas as pd
+
+from bands import InflationBands
+
+
+# Counts of the observed values, most frequent first. Categorical columns are counted as
+# plain values: categorical counts also list unobserved categories and order ties differently.
+def _value_counts(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return values.value_counts()
+
+
+class InsightsEngine:
+    # `bands`: the InflationBands of the category column (lowest, highest and high-inflation bands)
+    def __init__(self, data, bands=None, top_countries=3, top_years=3, top_global=5):
+        self.bands = bands or InflationBands()
+        self.top_countries = top_countries
+        self.top_years = top_years
+        self.top_global = top_global
+        self.version = 0
+        self.rebuild(data)
+
+    def rebuild(self, data):
+        # Per-category aggregates from a single pass over the category groups
+        category_stats = {}
+        for category, group in data.groupby('Inflation_Category', sort=False, observed=True):
+            country_counts = _value_counts(group['Area'])
+            year_counts = _value_counts(group['Year'])
+            category_stats[category] = {
+                'top_countries': list(country_counts.head(self.top_countries).items()),
+                'top_years': list(year_counts.head(self.top_years).items()),
+                'mean': group['Value'].mean(),
+                'min': group['Value'].min(),
+                'max': group['Value'].max(),
+                # Longer lists for the global panel
+                'top_countries_global': list(country_counts.head(self.top_global).items()),
+                'top_years_global': list(year_counts.head(self.top_global).items()),
+            }
+
+        high_inflation = data[data['Inflation_Category'].isin(self.bands.from_bound())]
+        empty = {'top_countries_global': [], 'top_years_global': []}
+        self.global_stats = {
+            'hyperinflationary_years': category_stats.get(self.bands.names[-1], empty)['top_years_global'],
+            'deflationary_years': category_stats.get(self.bands.names[0], empty)['top_years_global'],
+            'target_countries': category_stats.get('Target Inflation', empty)['top_countries_global'],
+            'high_inflation_regions': list(_value_counts(high_inflation['Region']).head(self.top_global).items()),
+            'high_inflation_countries': list(_value_counts(high_inflation['Area']).head(self.top_global).items()),
+        }
+        self.category_stats = category_stats
+        self.version += 1
+
+    # Aggregates for one category, or None if the category never occurs
+    def category(self, category):
+        return self.category_stats.get(category)
@@ -0,0 +1,137 @@
+# Per-callback instrumentation for the Dash app.
+#
+# instrument_callbacks() wraps every registered server callback and records its
+# wall time, serialized output size, errors, and the render cache hits and
+# misses that happened while it ran. CallbackMetrics.render() exposes them in
+# the Prometheus text format. When instrumentation is disabled nothing is
+# wrapped, so callbacks run exactly as registered.
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+
+
+# Upper bounds (seconds) of the callback duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Name of the callback running in the current request, for attributing cache lookups
+_current_callback = ContextVar('current_callback', default=None)
+
+
+class CallbackMetrics:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.prevented = defaultdict(int)
+        self.duration_sum = defaultdict(float)
+        self.duration_buckets = defaultdict(lambda: [0] * len(self.buckets))
+        self.output_bytes = defaultdict(int)
+        self.cache_hits = defaultdict(int)
+        self.cache_misses = defaultdict(int)
+        # Extra gauges/counters added by other components: name -> (type, help, function returning {labels: value})
+        self.collectors = {}
+
+    def observe(self, callback, seconds, output_bytes=0, error=False, prevented=False):
+        with self._lock:
+            self.calls[callback] += 1
+            self.duration_sum[callback] += seconds
+            buckets = self.duration_buckets[callback]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    buckets[index] += 1
+            self.output_bytes[callback] += output_bytes
+            if error:
+                self.errors[callback] += 1
+            if prevented:
+                self.prevented[callback] += 1
+
+    # Render cache observer: attributes a lookup to the callback that triggered it
+    def observe_cache(self, render_name, hit):
+        callback = _current_callback.get()
+        if callback is None:
+            return
+        with self._lock:
+            if hit:
+                self.cache_hits[callback] += 1
+            else:
+                self.cache_misses[callback] += 1
+
+    def add_collector(self, name, metric_type, help_text, collect):
+        self.collectors[name] = (metric_type, help_text, collect)
+
+    # Wrap one callback function (Dash's dispatch wrapper, which returns the JSON response)
+    def wrap(self, name, func):
+        @wraps(func)
+        def instrumented(*args, **kwargs):
+            token = _current_callback.set(name)
+            start = time.perf_counter()
+            try:
+                response = func(*args, **kwargs)
+            except PreventUpdate:
+                self.observe(name, time.perf_counter() - start, prevented=True)
+                raise
+            except Exception:
+                self.observe(name, time.perf_counter() - start, error=True)
+                raise
+            finally:
+                _current_callback.reset(token)
+            self.observe(name, time.perf_counter() - start, len(response) if isinstance(response, (str, bytes)) else 0)
+            return response
+        return instrumented
+
+    def render(self):
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            callbacks = sorted(self.calls)
+            metric('dash_callback_calls_total', 'counter', 'Server callback invocations.',
+                   [({'callback': c}, self.calls[c]) for c in callbacks])
+            metric('dash_callback_errors_total', 'counter', 'Server callback invocations that raised an error.',
+                   [({'callback': c}, self.errors[c]) for c in callbacks])
+            metric('dash_callback_prevented_total', 'counter', 'Server callback invocations that prevented the update.',
+                   [({'callback': c}, self.prevented[c]) for c in callbacks])
+            metric('dash_callback_output_bytes_total', 'counter', 'Serialized callback output bytes.',
+                   [({'callback': c}, self.output_bytes[c]) for c in callbacks])
+            metric('dash_callback_cache_hits_total', 'counter', 'Render cache hits during the callback.',
+                   [({'callback': c}, self.cache_hits[c]) for c in callbacks])
+            metric('dash_callback_cache_misses_total', 'counter', 'Render cache misses during the callback.',
+                   [({'callback': c}, self.cache_misses[c]) for c in callbacks])
+
+            lines.append("# HELP dash_callback_duration_seconds Server callback wall time.")
+            lines.append("# TYPE dash_callback_duration_seconds histogram")
+            for c in callbacks:
+                for bound, count in zip(self.buckets, self.duration_buckets[c]):
+                    lines.append(f'dash_callback_duration_seconds_bucket{{callback="{_escape(c)}",le="{bound}"}} {count}')
+                lines.append(f'dash_callback_duration_seconds_bucket{{callback="{_escape(c)}",le="+Inf"}} {self.calls[c]}')
+                lines.append(f'dash_callback_duration_seconds_sum{{callback="{_escape(c)}"}} {self.duration_sum[c]}')
+                lines.append(f'dash_callback_duration_seconds_count{{callback="{_escape(c)}"}} {self.calls[c]}')
+
+        for name, (metric_type, help_text, collect) in self.collectors.items():
+            metric(name, metric_type, help_text, collect())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Wrap every registered server callback of the app (clientside callbacks have no server function)
+def instrument_callbacks(app, metrics):
+    for spec in app.callback_map.values():
+        func = spec.get('callback')
+        if func is None or getattr(func, '_instrumented', False):
+            continue
+        spec['callback'] = metrics.wrap(func.__name__, func)
+        spec['callback']._instrumented = True
@@ -0,0 +1,111 @@
+# Monthly-resolution store for the map and the word cloud.
+#
+# Inflation_data/monthly.csv (written by preprocess.py) holds one row per
+# country and one column per month (YYYY-MM). It is loaded into a dense
+# country x month array, and the quarterly and yearly means are computed from
+# it once at load. Looking up a month, a quarter or a year is then a column
+# read, as fast as the annual data. Rolling means over any number of months
+# are computed with cumulative sums and kept per window.
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+
+MONTHLY_FILE = os.path.join('Inflation_data', 'monthly.csv')
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+# Period values within a year: None is the whole year, 'Q1'-'Q4' quarters, 'M01'-'M12' months
+QUARTERS = [f"Q{quarter}" for quarter in range(1, 5)]
+MONTHS = [f"M{month:02d}" for month in range(1, 13)]
+
+
+# Mean of consecutive blocks of `size` columns, ignoring missing months (NaN if a block has none)
+def _block_means(values, size):
+    blocks = values.reshape(values.shape[0], -1, size)
+    present = ~np.isnan(blocks)
+    counts = present.sum(axis=2)
+    sums = np.where(present, blocks, 0.0).sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+class MonthlyStore:
+    def __init__(self, iso3, first_year, monthly):
+        # monthly: float array, one row per country, one column per month from January of first_year
+        if monthly.shape[1] % 12:
+            raise ValueError("The monthly values must cover whole years")
+        self.iso3 = list(iso3)
+        self.row_of = {code: row for row, code in enumerate(self.iso3)}
+        self.first_year = first_year
+        self.years = list(range(first_year, first_year + monthly.shape[1] // 12))
+        self.matrices = {
+            'month': monthly,
+            'quarter': _block_means(monthly, 3),
+            'year': _block_means(monthly, 12),
+        }
+        self._rolling = {}
+
+    @classmethod
+    def load(cls, monthly_file=MONTHLY_FILE):
+        table = pd.read_csv(monthly_file, index_col='Area Code (ISO3)', dtype={'Area Code (ISO3)': str},
+                            keep_default_na=False, na_values=[''], float_precision='round_trip')
+        first_year = int(table.columns[0][:4])
+        last_year = int(table.columns[-1][:4])
+        # Pad to whole years, so every year has its twelve columns
+        columns = [f"{year}-{month:02d}" for year in range(first_year, last_year + 1) for month in range(1, 13)]
+        table = table.reindex(columns=columns)
+        return cls(table.index, first_year, table.to_numpy(dtype=float))
+
+    # Granularity and column of a period of a year, or None if the year is not covered
+    def locate(self, year, period=None):
+        if year not in self.years:
+            return None
+        offset = year - self.first_year
+        if period is None:
+            return 'year', offset
+        if period in QUARTERS:
+            return 'quarter', offset * 4 + QUARTERS.index(period)
+        if period in MONTHS:
+            return 'month', offset * 12 + MONTHS.index(period)
+        raise ValueError(f"Unknown period {period!r}")
+
+    # Values of every country (in store order) for a period of a year
+    def values(self, year, period=None):
+        location = self.locate(year, period)
+        if location is None:
+            return np.full(len(self.iso3), np.nan)
+        granularity, column = location
+        return self.matrices[granularity][:, column]
+
+    # Mean over the `window` months ending with each month (month-shaped, NaN where no month has data)
+    def rolling(self, window):
+        if window not in self._rolling:
+            monthly = self.matrices['month']
+            present = ~np.isnan(monthly)
+            sums = np.cumsum(np.where(present, monthly, 0.0), axis=1)
+            counts = np.cumsum(present, axis=1)
+            sums[:, window:] = sums[:, window:] - sums[:, :-window]
+            counts[:, window:] = counts[:, window:] - counts[:, :-window]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self._rolling[window] = np.where(counts > 0, sums / counts, np.nan)
+        return self._rolling[window]
+
+
+# Label of a period of a year, e.g. 2020, 'Q2 2020' or 'May 2020'
+def period_label(year, period=None):
+    if period is None:
+        return str(year)
+    if period in QUARTERS:
+        return f"{period} {year}"
+    return f"{MONTH_NAMES[MONTHS.index(period)]} {year}"
+
+
+# Write a country x month table (index: ISO3 codes, columns: 'YYYY-MM'), keeping every float exactly
+def write_monthly_table(table, monthly_file=MONTHLY_FILE):
+    with open(monthly_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Area Code (ISO3)'] + list(table.columns))
+        for iso3, row in zip(table.index, table.itertuples(index=False)):
+            writer.writerow([iso3] + ['' if pd.isna(value) else repr(float(value)) for value in row])
@@ -0,0 +1,240 @@
+# Preprocessing pipeline: FAOSTAT monthly food price inflation -> dashboard data.
+#
+# Streams the monthly FAOSTAT consumer price indices CSV in chunks and reduces it
+# to annual means per country, then assigns the rounded value and the inflation
+# category. It writes:
+#   country_year_mean.csv       one row per country and year
+#   Inflation_data/values.csv   the map's feature x year value table
+#   Inflation_data/monthly.csv  the country x month table of monthly_store.py
+# Country names and regions come from Inflation_data/countries.csv; countries
+# missing from it keep their FAOSTAT name and get no region.
+#
+# The run is incremental. Each year's monthly rows are hashed while streaming, and
+# the hashes are kept in a manifest next to an annual and a monthly partition per
+# year (.cache/preprocess/). A year is only recomputed when its hash changed (new 2025
+# data recomputes 2025 only). Unchanged years are read back from their partitions,
+# and an output file is only rewritten when its content changes.
+#
+# Usage:
+#   python preprocess.py FAOSTAT_CSV [--chunksize N] [--first-year 2001] [--force]
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from bands import InflationBands
+from geo_store import GEOMETRY_FILE, VALUES_FILE, write_values_table
+from monthly_store import MONTHLY_FILE, write_monthly_table
+
+
+CSV_FILE = 'country_year_mean.csv'
+COUNTRIES_FILE = os.path.join('Inflation_data', 'countries.csv')
+STATE_DIR = os.path.join('.cache', 'preprocess')
+PIPELINE_VERSION = 2
+
+# Monthly rows of the FAOSTAT download that make up the annual means
+ITEM = 'Food price inflation'
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+RAW_COLUMNS = ['Area Code (ISO3)', 'Area', 'Item', 'Months', 'Year', 'Value']
+# Columns whose content defines a year's hash
+HASHED_COLUMNS = ['Area Code (ISO3)', 'Area', 'Months', 'Value']
+SUM_LEVELS = ['Area Code (ISO3)', 'Area', 'Year', 'Month']
+FIRST_YEAR = 2001
+DEFAULT_CHUNKSIZE = 100_000
+
+OUTPUT_COLUMNS = ['Area Code (ISO3)', 'Area', 'Year', 'Value', 'Country', 'Inflation', 'Region', 'Inflation_Category']
+
+# Categories of the rounded annual value (see bands.py)
+BANDS = InflationBands()
+
+
+# Stream the monthly rows: per-year content hashes and per (country, year, month) sums and counts.
+# The hash of a year is the sum of its row hashes, so it does not depend on row order.
+def stream_monthly(raw_path, chunksize=DEFAULT_CHUNKSIZE, first_year=FIRST_YEAR):
+    year_hashes = {}
+    partial_sums = []
+    for chunk in pd.read_csv(raw_path, usecols=RAW_COLUMNS, chunksize=chunksize,
+                             dtype={'Area Code (ISO3)': str}, float_precision='round_trip'):
+        chunk = chunk[(chunk['Item'] == ITEM) & chunk['Months'].isin(MONTHS) & (chunk['Year'] >= first_year)]
+        chunk = chunk.dropna(subset=['Value'])
+        if chunk.empty:
+            continue
+
+        row_hashes = pd.util.hash_pandas_object(chunk[HASHED_COLUMNS], index=False).to_numpy()
+        years = chunk['Year'].to_numpy()
+        for year in np.unique(years):
+            selected = row_hashes[years == year]
+            digest, rows = year_hashes.get(int(year), (0, 0))
+            year_hashes[int(year)] = ((digest + int(selected.sum(dtype=np.uint64))) % 2**64, rows + len(selected))
+
+        chunk = chunk.assign(Month=chunk['Months'].map({name: index + 1 for index, name in enumerate(MONTHS)}))
+        partial_sums.append(chunk.groupby(SUM_LEVELS)['Value'].agg(['sum', 'count']))
+
+    if partial_sums:
+        sums = pd.concat(partial_sums).groupby(level=list(range(len(SUM_LEVELS)))).sum()
+    else:
+        sums = pd.DataFrame(columns=['sum', 'count'],
+                            index=pd.MultiIndex.from_arrays([[]] * len(SUM_LEVELS), names=SUM_LEVELS))
+    return {year: {'hash': f"{digest:016x}", 'rows': rows} for year, (digest, rows) in sorted(year_hashes.items())}, sums
+
+
+def read_countries(countries_file=COUNTRIES_FILE):
+    return pd.read_csv(countries_file, dtype=str, keep_default_na=False, na_values=[''])
+
+
+# Annual rows of one year from its (country, year, month) sums
+def build_year(sums, countries):
+    annual = sums.groupby(level=['Area Code (ISO3)', 'Area', 'Year']).sum().reset_index()
+    annual['Value'] = annual['sum'] / annual['count']
+    annual['Inflation'] = annual['Value'].round(1)
+    annual = annual.merge(countries, on='Area Code (ISO3)', how='left')
+    annual['Country'] = annual['Country'].fillna(annual['Area'])
+    annual['Inflation_Category'] = np.asarray(BANDS.categorize(annual['Inflation']))
+    return annual[OUTPUT_COLUMNS].sort_values(['Area Code (ISO3)', 'Year'], ignore_index=True)
+
+
+# Monthly means of one year from its (country, year, month) sums
+def build_year_monthly(sums):
+    monthly = sums.groupby(level=['Area Code (ISO3)', 'Year', 'Month']).sum().reset_index()
+    monthly['Value'] = monthly['sum'] / monthly['count']
+    return monthly[['Area Code (ISO3)', 'Year', 'Month', 'Value']]
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Hash of everything besides the monthly rows that shapes the output; a change recomputes every year
+def config_hash(countries_file=COUNTRIES_FILE):
+    bounds = [(name, bound, included) for name, _, bound, included in BANDS.bands]
+    settings = json.dumps([PIPELINE_VERSION, ITEM, MONTHS, bounds])
+    return hashlib.sha1((settings + _file_sha1(countries_file)).encode('utf-8')).hexdigest()
+
+
+# Write through a temporary file and replace `path` only if the content changed
+def _replace_if_changed(path, write):
+    staging_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    write(staging_path)
+    if os.path.exists(path) and _file_sha1(path) == _file_sha1(staging_path):
+        os.remove(staging_path)
+        return False
+    os.replace(staging_path, path)
+    return True
+
+
+def _read_partition(path):
+    return pd.read_csv(path, dtype={'Area Code (ISO3)': str}, float_precision='round_trip',
+                       keep_default_na=False, na_values=[''])
+
+
+def load_manifest(state_dir=STATE_DIR):
+    try:
+        with open(os.path.join(state_dir, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def feature_iso3_from_geometry(geometry_file=GEOMETRY_FILE):
+    with open(geometry_file) as f:
+        return [feature['properties']['combined_iso_a3'] for feature in json.load(f)['features']]
+
+
+def run(raw_path, csv_file=CSV_FILE, values_file=VALUES_FILE, countries_file=COUNTRIES_FILE,
+        geometry_file=GEOMETRY_FILE, state_dir=STATE_DIR, chunksize=DEFAULT_CHUNKSIZE,
+        first_year=FIRST_YEAR, force=False, monthly_file=MONTHLY_FILE):
+    year_hashes, sums = stream_monthly(raw_path, chunksize, first_year)
+    config = config_hash(countries_file)
+    manifest = load_manifest(state_dir)
+    if force or manifest.get('config') != config:
+        manifest = {}
+    previous = manifest.get('years', {})
+    partition_dir = os.path.join(state_dir, 'years')
+
+    def partition_path(year, kind='annual'):
+        return os.path.join(partition_dir, f"{year}.{kind}.csv")
+
+    changed = [
+        year for year, state in year_hashes.items()
+        if previous.get(str(year)) != state
+        or not os.path.exists(partition_path(year)) or not os.path.exists(partition_path(year, 'monthly'))
+    ]
+    removed = sorted(int(year) for year in previous if int(year) not in year_hashes)
+
+    # Recompute only the changed years
+    countries = read_countries(countries_file)
+    year_level = sums.index.get_level_values('Year')
+    for year in changed:
+        year_sums = sums[year_level == year]
+        annual = build_year(year_sums, countries)
+        monthly = build_year_monthly(year_sums)
+        _replace_if_changed(partition_path(year), lambda path: annual.to_csv(path, index=False))
+        _replace_if_changed(partition_path(year, 'monthly'), lambda path: monthly.to_csv(path, index=False))
+    for year in removed:
+        for kind in ('annual', 'monthly'):
+            os.remove(partition_path(year, kind))
+
+    written = []
+    outputs = [csv_file, values_file, monthly_file]
+    if changed or removed or not all(os.path.exists(path) for path in outputs):
+        data = pd.concat([_read_partition(partition_path(year)) for year in year_hashes], ignore_index=True)
+        data = data.sort_values(['Area Code (ISO3)', 'Year'], ignore_index=True)
+        if _replace_if_changed(csv_file, lambda path: data.to_csv(path, index=False)):
+            written.append(csv_file)
+
+        feature_iso3 = feature_iso3_from_geometry(geometry_file)
+        values = data.pivot(index='Area Code (ISO3)', columns='Year', values='Value')
+        values = values.reindex(index=feature_iso3, columns=list(year_hashes))
+        if _replace_if_changed(values_file, lambda path: write_values_table(values, feature_iso3, path)):
+            written.append(values_file)
+
+        monthly = pd.concat([_read_partition(partition_path(year, 'monthly')) for year in year_hashes],
+                            ignore_index=True)
+        monthly_table = monthly.pivot(index='Area Code (ISO3)', columns=['Year', 'Month'], values='Value')
+        monthly_table = monthly_table.reindex(
+            index=sorted(data['Area Code (ISO3)'].unique()),
+            columns=pd.MultiIndex.from_product([list(year_hashes), range(1, 13)]),
+        )
+        monthly_table.columns = [f"{year}-{month:02d}" for year, month in monthly_table.columns]
+        if _replace_if_changed(monthly_file, lambda path: write_monthly_table(monthly_table, path)):
+            written.append(monthly_file)
+
+    os.makedirs(state_dir, exist_ok=True)
+    manifest = {'config': config, 'years': {str(year): state for year, state in year_hashes.items()}}
+    with open(os.path.join(state_dir, 'manifest.json.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(os.path.join(state_dir, 'manifest.json.tmp'), os.path.join(state_dir, 'manifest.json'))
+    return {'years': list(year_hashes), 'changed_years': changed, 'removed_years': removed, 'written': written}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the dashboard data from the monthly FAOSTAT CSV.")
+    parser.add_argument('raw', help="FAOSTAT consumer price indices CSV (monthly, with ISO3 area codes)")
+    parser.add_argument('--csv', default=CSV_FILE)
+    parser.add_argument('--values', default=VALUES_FILE)
+    parser.add_argument('--monthly', default=MONTHLY_FILE)
+    parser.add_argument('--countries', default=COUNTRIES_FILE)
+    parser.add_argument('--geometry', default=GEOMETRY_FILE)
+    parser.add_argument('--state-dir', default=STATE_DIR)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="rows read per chunk")
+    parser.add_argument('--first-year', type=int, default=FIRST_YEAR)
+    parser.add_argument('--force', action='store_true', help="recompute every year")
+    args = parser.parse_args()
+
+    result = run(args.raw, args.csv, args.values, args.countries, args.geometry, args.state_dir,
+                 args.chunksize, args.first_year, args.force, args.monthly)
+    years = result['years']
+    print(f"{len(years)} years ({years[0]}-{years[-1]})" if years else "No monthly rows found")
+    print(f"Recomputed: {', '.join(map(str, result['changed_years'])) or 'none'}")
+    if result['removed_years']:
+        print(f"Removed: {', '.join(map(str, result['removed_years']))}")
+    print(f"Wrote: {', '.join(result['written']) or 'nothing (outputs unchanged)'}")
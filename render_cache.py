@@ -0,0 +1,323 @@
+# Render cache for the dashboard.
+#
+# Rendered outputs (map HTML, ...) are memoized through the app's flask_caching
+# Cache, keyed on the function name, its arguments and the version of the input
+# data. RenderCache keeps hit/miss counters per rendered output and makes sure
+# concurrent misses on the same key render only once ("single flight").
+#
+# Backends (see configure_backend):
+#   memory  LRUCache, a size-bounded, least-recently-used cache in each process
+#   sqlite  SQLiteCache, one file shared by every process on the machine,
+#           with flock() locks so only one worker renders a missing entry
+#   redis   flask_caching's RedisCache with Redis locks (needs the redis package)
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from time import time
+
+from flask_caching.backends.base import BaseCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: file locks fall back to locks within the process
+    fcntl = None
+
+
+class LRUCache(BaseCache):
+    # In-process cache that evicts the least recently used entry once it holds
+    # `threshold` items. Values are stored as-is (no pickling).
+
+    def __init__(self, threshold=256, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self._threshold = threshold
+        self._cache = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(threshold=config['CACHE_THRESHOLD'])
+        return cls(*args, **kwargs)
+
+    def _normalize_timeout(self, timeout):
+        timeout = super()._normalize_timeout(timeout)
+        if timeout > 0:
+            timeout = time() + timeout
+        return timeout
+
+    def get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires != 0 and expires <= time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires = self._normalize_timeout(timeout)
+        with self._lock:
+            self._cache[key] = (expires, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._threshold:
+                self._cache.popitem(last=False)
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if key in self._cache:
+                return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            return self._cache.pop(key, None) is not None
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+        return True
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class SQLiteCache(BaseCache):
+    # Cache shared by every process on the machine, stored in one SQLite file.
+    # Values are pickled. Once it holds more than `threshold` entries, the least
+    # recently used ones are deleted. A hit only records its access time when the
+    # recorded one is older than `touch_interval` seconds, so hits are reads and do
+    # not queue on SQLite's single writer lock.
+
+    def __init__(self, path, threshold=256, default_timeout=300, touch_interval=60):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self._threshold = threshold
+        self._touch_interval = touch_interval
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, expires REAL NOT NULL, accessed REAL NOT NULL, value BLOB NOT NULL)'
+        )
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(path=config['CACHE_SQLITE_PATH'], threshold=config['CACHE_THRESHOLD'])
+        return cls(*args, **kwargs)
+
+    # One connection per thread and process: SQLite connections must not cross a fork
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _normalize_timeout(self, timeout):
+        timeout = super()._normalize_timeout(timeout)
+        if timeout > 0:
+            timeout = time() + timeout
+        return timeout
+
+    def get(self, key):
+        db = self._connection()
+        row = db.execute('SELECT expires, accessed, value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        expires, accessed, value = row
+        now = time()
+        if expires != 0 and expires <= now:
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return None
+        if now - accessed > self._touch_interval:
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(value)
+
+    def _store(self, statement, key, value, timeout):
+        expires = self._normalize_timeout(timeout)
+        db = self._connection()
+        stored = db.execute(
+            statement, (key, expires, time(), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        ).rowcount > 0
+        db.execute(
+            'DELETE FROM entries WHERE key IN '
+            '(SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self._threshold,)
+        )
+        return stored
+
+    def set(self, key, value, timeout=None):
+        return self._store('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self._store('INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?)', key, value, timeout)
+
+    def delete(self, key):
+        return self._connection().execute('DELETE FROM entries WHERE key = ?', (key,)).rowcount > 0
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM entries')
+        return True
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+
+def _stripe(key, stripes):
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % stripes
+
+
+class ThreadLocks:
+    # Single-flight locks for the threads of one process. Keys share `stripes` locks.
+
+    def __init__(self, stripes=64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def lock(self, key):
+        return self._locks[_stripe(key, len(self._locks))]
+
+
+class FileLocks:
+    # Single-flight locks for every process on the machine: flock() on one of
+    # `stripes` lock files. The kernel releases a lock when its holder dies.
+
+    def __init__(self, directory, stripes=256):
+        self.directory = directory
+        self.stripes = stripes
+        self._thread_locks = ThreadLocks()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def lock(self, key):
+        if fcntl is None:
+            with self._thread_locks.lock(key):
+                yield
+            return
+        with open(os.path.join(self.directory, f"{_stripe(key, self.stripes)}.lock"), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RedisLocks:
+    # Single-flight locks for every process using the same Redis. A lock expires
+    # after `timeout` seconds, in case its holder dies while rendering.
+
+    def __init__(self, url, timeout=60):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.timeout = timeout
+
+    def lock(self, key):
+        return self.client.lock(f"lock:{key}", timeout=self.timeout)
+
+
+# flask_caching config and single-flight locks for a backend name
+def configure_backend(backend, threshold, directory, redis_url):
+    if backend == 'memory':
+        return {'CACHE_TYPE': 'render_cache.LRUCache', 'CACHE_THRESHOLD': threshold}, ThreadLocks()
+    if backend == 'sqlite':
+        config = {
+            'CACHE_TYPE': 'render_cache.SQLiteCache',
+            'CACHE_THRESHOLD': threshold,
+            'CACHE_SQLITE_PATH': os.path.join(directory, 'renders.sqlite3'),
+        }
+        return config, FileLocks(os.path.join(directory, 'locks'))
+    if backend == 'redis':
+        return {'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': redis_url}, RedisLocks(redis_url)
+    raise ValueError(f"Unknown render cache backend {backend!r}; expected 'memory', 'sqlite' or 'redis'")
+
+
+# Short content hash of the input files; changes whenever any input changes
+def data_fingerprint(*paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class RenderCache:
+    def __init__(self, cache, data_version, locks=None, artifacts=None):
+        self.cache = cache
+        self.data_version = data_version
+        self.locks = locks or ThreadLocks()
+        # Baked outputs (artifacts.ArtifactStore): when set, misses read them and nothing is rendered
+        self.artifacts = artifacts
+        self.hits = Counter()
+        self.misses = Counter()
+        self.artifact_reads = Counter()
+        # Functions called as observer(name, hit) on every lookup
+        self.observers = []
+
+    def key(self, name, args):
+        return f"render:{name}:{self.data_version}:{args!r}"
+
+    # Cached value for (name, args), calling render() on a miss.
+    # Entries never expire; the backend's size bound and the data version retire them.
+    def get_or_render(self, name, args, render):
+        key = self.key(name, args)
+        value = self.cache.get(key)
+        if value is None:
+            # Single flight: whoever holds the key's lock renders, the others wait and then read it
+            with self.locks.lock(key):
+                value = self.cache.get(key)
+                if value is None:
+                    value = self._load_or_render(name, args, render)
+                    self.cache.set(key, value, timeout=0)
+                    return value
+        self._count(name, hit=True)
+        return value
+
+    # The baked artifact in artifact mode (raises MissingArtifact if it was not baked), else a render
+    def _load_or_render(self, name, args, render):
+        if self.artifacts is not None:
+            value = self.artifacts.get(name, args)
+            self.artifact_reads[name] += 1
+            self._count(name, hit=True)
+            return value
+        self._count(name, hit=False)
+        return render()
+
+    def _count(self, name, hit):
+        (self.hits if hit else self.misses)[name] += 1
+        for observer in self.observers:
+            observer(name, hit)
+
+    # Memoize a render function on its positional arguments and the data version
+    def memoize(self, name):
+        def decorator(render):
+            @wraps(render)
+            def cached_render(*args):
+                return self.get_or_render(name, args, lambda: render(*args))
+            cached_render.uncached = render
+            return cached_render
+        return decorator
+
+    def stats(self):
+        backend = self.cache.cache
+        return {
+            'data_version': self.data_version,
+            'entries': len(backend) if hasattr(backend, '__len__') else None,
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+            'artifact_reads': dict(self.artifact_reads),
+        }
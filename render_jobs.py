@@ -0,0 +1,206 @@
+# Background execution of the heavy renders, with superseded jobs dropped.
+#
+# RenderJobs runs render jobs (folium map, word cloud) on a small pool of
+# threads instead of in the request thread, so at most `workers` renders run
+# at once in a process. Jobs are keyed by (session, name): a new job supersedes
+# the previous one of the same key. A superseded job that is still queued is
+# cancelled and never runs. A superseded job that is already running finishes
+# (its result still lands in the render cache), but its request stops waiting
+# and raises Superseded. So scrubbing through the years only renders the
+# states that were current when a worker became free, and only the last
+# request waits for its result.
+#
+# The newest generation of every (session, name) is kept in a generation store:
+#   LocalGenerations   a dict in the process; only requests handled by the same
+#                      process supersede each other
+#   SharedGenerations  a SQLite file shared by every process on the machine, so a
+#                      request handled by one gunicorn worker supersedes the jobs
+#                      of the same session waiting in the others (they poll it)
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Outcomes of a job, as counted in stats()
+OUTCOMES = ('completed', 'failed', 'cancelled', 'dropped')
+
+
+class Superseded(Exception):
+    pass
+
+
+class LocalGenerations:
+    # Newest job generation per (session, name), in this process only
+    shared = False
+
+    def __init__(self):
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def next(self, key):
+        with self._lock:
+            self._latest[key] = self._latest.get(key, 0) + 1
+            return self._latest[key]
+
+    def latest(self, key):
+        return self._latest.get(key)
+
+    # Forget the key once its newest job is done
+    def release(self, key, generation):
+        with self._lock:
+            if self._latest.get(key) == generation:
+                del self._latest[key]
+
+
+class SharedGenerations:
+    # Newest job generation per (session, name) in one SQLite file, shared by every process on the machine
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS generations ('
+            'session TEXT NOT NULL, name TEXT NOT NULL, generation INTEGER NOT NULL, PRIMARY KEY (session, name))'
+        )
+
+    # One connection per thread and process: SQLite connections must not cross a fork
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')  # Generations only matter while their requests wait
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def next(self, key):
+        return self._connection().execute(
+            'INSERT INTO generations VALUES (?, ?, 1) ON CONFLICT (session, name) '
+            'DO UPDATE SET generation = generation + 1 RETURNING generation', key
+        ).fetchone()[0]
+
+    def latest(self, key):
+        row = self._connection().execute(
+            'SELECT generation FROM generations WHERE session = ? AND name = ?', key
+        ).fetchone()
+        return row[0] if row else None
+
+    def release(self, key, generation):
+        self._connection().execute(
+            'DELETE FROM generations WHERE session = ? AND name = ? AND generation = ?', (*key, generation)
+        )
+
+
+class RenderJobs:
+    # `poll_interval`: seconds between two checks of a shared generation store while a request waits
+    def __init__(self, workers=2, generations=None, poll_interval=0.05):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render-job')
+        self._changed = threading.Condition()
+        self._notifications = 0  # Counts the notify_all calls, so a waiter sees those it did not wait for
+        self.generations = generations or LocalGenerations()
+        self._poll_interval = poll_interval if self.generations.shared else None
+        self.queued = 0
+        self.running = 0
+        self.outcomes = defaultdict(int)  # (name, outcome) -> jobs
+        self.latency_sum = defaultdict(float)  # name -> seconds from submission to result, finished jobs
+        self.wait_sum = defaultdict(float)  # name -> seconds spent queued, started jobs
+        self.started = defaultdict(int)
+
+    # Run function(*args) as a job of the session and return its result; raises Superseded
+    # if a newer job of the same session and name arrives first. Without a session, jobs
+    # never supersede each other. The generation store (a SQLite file when shared) is only
+    # read and written outside the Condition, so a slow store does not hold up the other threads.
+    def run(self, session, name, function, *args):
+        key = (session, name)
+        submitted = time.perf_counter()
+        generation = self.generations.next(key) if session is not None else None
+        with self._changed:
+            self.queued += 1
+            self._notify_all()  # Wake the request of the job this one supersedes
+
+        # Run in a copy of the request's context (callback metrics attribute cache lookups through it)
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self._execute, name, submitted, function, args)
+        future.add_done_callback(self._notify)
+
+        while True:
+            with self._changed:
+                seen = self._notifications
+            latest = self._is_latest(key, generation)
+            with self._changed:
+                if future.done() or not latest:
+                    break
+                if self._notifications == seen:
+                    self._changed.wait(self._poll_interval)
+
+        with self._changed:
+            if not future.done():
+                # Still queued: it never runs. Already running: finishes without a waiting request.
+                if future.cancel():
+                    self.queued -= 1
+                    self.outcomes[(name, 'cancelled')] += 1
+                else:
+                    self.outcomes[(name, 'dropped')] += 1
+                raise Superseded(name)
+        if session is not None:
+            self.generations.release(key, generation)
+
+        try:
+            result = future.result()
+        except Exception:
+            self._finish(name, submitted, 'failed')
+            raise
+        self._finish(name, submitted, 'completed')
+        return result
+
+    def _is_latest(self, key, generation):
+        return key[0] is None or self.generations.latest(key) == generation
+
+    def _execute(self, name, submitted, function, args):
+        with self._changed:
+            self.queued -= 1
+            self.running += 1
+            self.started[name] += 1
+            self.wait_sum[name] += time.perf_counter() - submitted
+        try:
+            return function(*args)
+        finally:
+            with self._changed:
+                self.running -= 1
+
+    def _notify(self, future):
+        with self._changed:
+            self._notify_all()
+
+    # Call with the Condition held
+    def _notify_all(self):
+        self._notifications += 1
+        self._changed.notify_all()
+
+    def _finish(self, name, submitted, outcome):
+        with self._changed:
+            self.outcomes[(name, outcome)] += 1
+            self.latency_sum[name] += time.perf_counter() - submitted
+
+    def stats(self):
+        with self._changed:
+            names = sorted({name for name, _ in self.outcomes} | set(self.started))
+            jobs = {}
+            for name in names:
+                counts = {outcome: self.outcomes.get((name, outcome), 0) for outcome in OUTCOMES}
+                finished = counts['completed'] + counts['failed']
+                started = self.started.get(name, 0)
+                jobs[name] = dict(
+                    counts,
+                    mean_latency_ms=round(self.latency_sum[name] / finished * 1000, 1) if finished else None,
+                    mean_wait_ms=round(self.wait_sum[name] / started * 1000, 1) if started else None,
+                )
+            return {'workers': self.workers, 'shared_generations': self.generations.shared,
+                    'queued': self.queued, 'running': self.running, 'jobs': jobs}
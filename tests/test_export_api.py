@@ -0,0 +1,64 @@
+# Export API: streamed full-table exports and the Arrow IPC stream.
+import io
+import os
+import tracemalloc
+
+import flask
+import pandas as pd
+import pytest
+
+from data_index import YearCategoryIndex
+from data_loader import read_csv_typed
+from export_api import DataExport, _export_frame
+
+CSV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'country_year_mean.csv')
+
+
+@pytest.fixture(scope='module')
+def data():
+    return read_csv_typed(CSV_FILE)
+
+
+# `copies` times the rows, each copy shifted by 30 years
+def export_client(data, copies):
+    table = pd.concat([data.assign(Year=data['Year'] + 30 * copy) for copy in range(copies)], ignore_index=True)
+    app = flask.Flask(__name__)
+    export = DataExport(app, YearCategoryIndex(table))
+    return app.test_client(), export
+
+
+# Peak memory allocated while streaming a full-table export, and the number of bytes streamed
+def streamed_peak(client, fmt):
+    tracemalloc.start()
+    try:
+        response = client.get(f'/api/export.{fmt}', buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return tracemalloc.get_traced_memory()[1], size
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'json'])
+def test_streamed_export_memory_does_not_grow_with_the_table(data, fmt):
+    small_client, _ = export_client(data, 2)
+    large_client, _ = export_client(data, 8)
+    small_peak, small_size = streamed_peak(small_client, fmt)
+    large_peak, large_size = streamed_peak(large_client, fmt)
+
+    assert large_size > 3.5 * small_size
+    # 4x the rows: a response built at once would peak about 4x higher
+    assert large_peak < 1.5 * small_peak
+
+
+def test_arrow_stream_has_every_row_and_the_export_schema(data):
+    pyarrow = pytest.importorskip('pyarrow')
+    client, export = export_client(data, 2)
+    response = client.get('/api/export.arrow?year_from=2010')
+    assert response.status_code == 200
+
+    table = pyarrow.ipc.open_stream(io.BytesIO(response.data)).read_all()
+    expected = _export_frame(export.index.clean.iloc[export.select(year_from=2010)])
+    assert table.num_rows == len(expected)
+    assert table.schema.names == list(expected.columns)
+    assert table.column('Value').to_pylist() == expected['Value'].tolist()
@@ -0,0 +1,87 @@
+# Single flight of the shared sqlite render cache across processes.
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+import flask
+import pytest
+from flask_caching import Cache
+
+from render_cache import RenderCache, configure_backend
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+RENDER_SECONDS = 0.1
+
+
+def make_renders(directory):
+    config, locks = configure_backend('sqlite', 256, directory, None)
+    cache = Cache(flask.Flask(__name__), config=dict(config, CACHE_DEFAULT_TIMEOUT=300))
+    return RenderCache(cache, 'test', locks=locks)
+
+
+# Slow render that logs one line per render; with crash=True the process dies holding the lock
+def slow_render(log_path, key, crash=False):
+    def render():
+        with open(log_path, 'a') as log:
+            log.write(f"{os.getpid()} {key}\n")
+        if crash:
+            os._exit(1)
+        time.sleep(RENDER_SECONDS)
+        return f"rendered {key}"
+    return render
+
+
+def request_all(directory, log_path, keys, offset, start):
+    renders = make_renders(directory)
+    start.wait()
+    # Every process walks the keys from another offset, so they collide on different keys
+    for key in keys[offset:] + keys[:offset]:
+        if renders.get_or_render('map', (key,), slow_render(log_path, key)) != f"rendered {key}":
+            os._exit(2)
+    os._exit(0)
+
+
+def read_log(log_path):
+    with open(log_path) as log:
+        return Counter(line.split()[1] for line in log if line.strip())
+
+
+def test_each_key_is_rendered_once_across_processes(tmp_path):
+    context = multiprocessing.get_context('fork')
+    log_path = tmp_path / 'renders.log'
+    log_path.touch()
+    keys = [f"key-{index}" for index in range(6)]
+    start = context.Event()
+    processes = [context.Process(target=request_all, args=(str(tmp_path), str(log_path), keys, index, start))
+                 for index in range(6)]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(60)
+
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    assert read_log(log_path) == Counter({key: 1 for key in keys})
+
+
+def crash_while_rendering(directory, log_path):
+    make_renders(directory).get_or_render('map', ('crash',), slow_render(log_path, 'crash', crash=True))
+
+
+def test_dead_lock_holder_does_not_block_the_next_process(tmp_path):
+    context = multiprocessing.get_context('fork')
+    log_path = tmp_path / 'renders.log'
+    log_path.touch()
+    holder = context.Process(target=crash_while_rendering, args=(str(tmp_path), str(log_path)))
+    holder.start()
+    holder.join(60)
+    assert holder.exitcode == 1
+
+    # The kernel released the holder's flock(): the next process renders without waiting for it
+    start = time.perf_counter()
+    value = make_renders(str(tmp_path)).get_or_render('map', ('crash',), slow_render(str(log_path), 'crash'))
+    assert value == 'rendered crash'
+    assert time.perf_counter() - start < 5
+    assert read_log(log_path)['crash'] == 2
@@ -0,0 +1,79 @@
+# Word cloud rendering for the dashboard.
+#
+# One WordCloud instance (font, canvas size, colors) is configured once and
+# reused for every render. Renders are memoized by the app on a stable hash of
+# the frequencies, and the image can be encoded as PNG, palette PNG or WebP.
+# The wordcloud package (and matplotlib, which it imports) is only loaded by
+# the first render, or by load().
+import base64
+import hashlib
+import io
+import json
+import threading
+
+from PIL import Image
+
+
+# Encoders by format name: (MIME type, function writing the image to a buffer)
+def _save_png(image, buffer):
+    image.save(buffer, format='PNG')
+
+
+def _save_palette_png(image, buffer):
+    # 256-color palette; word clouds use few colors, so this is visually lossless
+    image.convert('P', palette=Image.ADAPTIVE, colors=256).save(buffer, format='PNG', optimize=True)
+
+
+def _save_webp(image, buffer):
+    image.save(buffer, format='WEBP', quality=80, method=4)
+
+
+IMAGE_FORMATS = {
+    'png': ('image/png', _save_png),
+    'palette': ('image/png', _save_palette_png),
+    'webp': ('image/webp', _save_webp),
+}
+
+
+# Stable hash of a frequency dict: independent of key order and float noise
+def frequency_hash(frequencies):
+    items = sorted((str(word), round(float(value), 6)) for word, value in frequencies.items())
+    return hashlib.sha1(json.dumps(items).encode('utf-8')).hexdigest()
+
+
+class WordCloudRenderer:
+    def __init__(self, width=800, height=400, background_color='white', image_format='png'):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown word cloud format {image_format!r}; expected one of {sorted(IMAGE_FORMATS)}")
+        self.image_format = image_format
+        self._options = {'width': width, 'height': height, 'background_color': background_color}
+        self._word_cloud = None
+        # The layout state lives on the WordCloud instance, so renders take turns
+        self._lock = threading.Lock()
+
+    # Import wordcloud and configure the WordCloud instance, if not done yet
+    def load(self):
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        if self._word_cloud is None:
+            from wordcloud import WordCloud
+            self._word_cloud = WordCloud(**self._options)
+
+    # Lay out the words and draw them on the canvas
+    def layout(self, frequencies):
+        with self._lock:
+            self._load()
+            return self._word_cloud.generate_from_frequencies(frequencies).to_image()
+
+    def encode(self, image, image_format=None):
+        mime_type, save = IMAGE_FORMATS[image_format or self.image_format]
+        buffer = io.BytesIO()
+        save(image, buffer)
+        return mime_type, buffer.getvalue()
+
+    # Render the word cloud as a data URI for html.Img(src=...)
+    def render(self, frequencies):
+        mime_type, data = self.encode(self.layout(frequencies))
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"